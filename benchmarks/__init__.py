@@ -0,0 +1 @@
+# app/benchmarks/__init__.py
@@ -0,0 +1,246 @@
+# app/benchmarks/fakes.py
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+from langchain_core.messages import AIMessage
+
+from common_utils.tourism_constants import VN_TOURISM_CITIES, ATTRACTION_TYPES
+from coreAI.retrieval.search_filters import (
+    attraction_type_key,
+    location_matches,
+    normalize_attraction_type,
+    parse_price_bounds,
+    price_overlaps,
+    resolve_price_range
+)
+from dconfig import config_agents
+
+EMBEDDING_DIM = 64
+
+# Tọa độ gần đúng của các thành phố để sinh dữ liệu giả
+_CITY_COORDS = {
+    "Hà Nội": (21.03, 105.85), "Hồ Chí Minh": (10.78, 106.70), "Đà Nẵng": (16.05, 108.22),
+    "Nha Trang": (12.24, 109.19), "Hội An": (15.88, 108.33), "Huế": (16.46, 107.59),
+    "Hạ Long": (20.95, 107.08), "Sapa": (22.34, 103.84), "Đà Lạt": (11.94, 108.46),
+    "Phú Quốc": (10.29, 103.98), "Hải Phòng": (20.84, 106.69), "Cần Thơ": (10.03, 105.78),
+    "Vũng Tàu": (10.35, 107.08), "Phan Thiết": (10.93, 108.10), "Quy Nhơn": (13.78, 109.22),
+    "Ninh Bình": (20.25, 105.97), "Mai Châu": (20.66, 105.08), "Mù Cang Chải": (21.85, 104.09),
+    "Cao Bằng": (22.67, 106.26), "Hà Giang": (22.82, 104.98),
+}
+
+
+class LatencyRecorder:
+    """Ghi lại latency theo tên (node, tool, ...)"""
+
+    def __init__(self):
+        self._samples = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self._samples[name].append(seconds)
+
+    def timed(self, name: str, func):
+        def _wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+        return _wrapper
+
+    def percentiles(self, percents=(50, 95, 99)) -> dict:
+        with self._lock:
+            samples = {name: list(values) for name, values in self._samples.items()}
+        report = {}
+        for name, values in sorted(samples.items()):
+            array = np.array(values) * 1000
+            report[name] = {"count": len(values), **{f"p{p}_ms": round(float(np.percentile(array, p)), 3) for p in percents}}
+        return report
+
+
+def fake_embedding(text: str, latency: float = 0.0):
+    """Embedding giả lập: vector ngẫu nhiên cố định theo text"""
+    if latency:
+        time.sleep(latency)
+    seed = int.from_bytes(hashlib.md5(text.encode("utf-8")).digest()[:4], "little")
+    vector = np.random.default_rng(seed).standard_normal(EMBEDDING_DIM).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class FakeDestinationDAO:
+    """DestinationDAO in-memory với dữ liệu sinh ngẫu nhiên (cố định theo seed)"""
+
+    def __init__(self, destinations_per_city: int = 50, latency: float = 0.0, seed: int = 42):
+        self.latency = latency
+        rng = random.Random(seed)
+        types = list(ATTRACTION_TYPES)
+        now = datetime(2024, 1, 1)
+
+        self.destinations = []
+        self.events = []
+        for city in VN_TOURISM_CITIES:
+            lat, lon = _CITY_COORDS[city]
+            for i in range(destinations_per_city):
+                attraction_type = rng.choice(types)
+                self.destinations.append({
+                    "id": len(self.destinations) + 1,
+                    "name": f"{ATTRACTION_TYPES[attraction_type][0].title()} {city} {i}",
+                    "location": city,
+                    "attraction_type": attraction_type,
+                    "description": f"Điểm tham quan {ATTRACTION_TYPES[attraction_type][0]} nổi tiếng tại {city}. " * 5,
+                    "latitude": lat + rng.uniform(-0.2, 0.2),
+                    "longitude": lon + rng.uniform(-0.2, 0.2),
+                    "opening_hours": "07:00 - 17:30",
+                    "price_info": json.dumps({"adult": rng.choice([0, 50000, 150000, 600000])}),
+                    "rating": round(rng.uniform(3.0, 5.0), 1),
+                    "image_url": f"https://example.com/img/{len(self.destinations) + 1}.jpg",
+                    "thumbnail_url": f"https://example.com/thumb/{len(self.destinations) + 1}.jpg",
+                    "updated_at": now,
+                })
+            for month in range(1, 13, 3):
+                self.events.append({
+                    "id": len(self.events) + 1,
+                    "name": f"Lễ hội {city} tháng {month}",
+                    "location": city,
+                    "month": month,
+                    "description": f"Lễ hội truyền thống tại {city}",
+                    "updated_at": now,
+                })
+
+        self._by_id = {str(d["id"]): d for d in self.destinations}
+        self._vectors = np.stack([
+            fake_embedding(f"location: {d['location']} type: {ATTRACTION_TYPES[d['attraction_type']][0]}")
+            for d in self.destinations
+        ])
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def load_rows(self, since=None):
+        """Loader cho geo index / lexical index"""
+        return [d for d in self.destinations if since is None or d["updated_at"] >= since]
+
+    def search_destinations(self, query_vector, top_k=10, exclude_ids=None, filters=None):
+        self._wait()
+        scores = self._vectors @ np.asarray(query_vector, dtype=np.float32)
+        excluded = {str(i) for i in exclude_ids or []}
+        location = (filters or {}).get("location")
+        type_key = normalize_attraction_type((filters or {}).get("attraction_type"))
+        bounds = resolve_price_range((filters or {}).get("price_range"))
+        results = []
+        for row in np.argsort(-scores):
+            dest = self.destinations[row]
+            if str(dest["id"]) in excluded or (location and not location_matches(location, dest["location"])):
+                continue
+            if type_key and attraction_type_key(dest["attraction_type"]) != type_key:
+                continue
+            if not price_overlaps(*parse_price_bounds(dest["price_info"]), bounds):
+                continue
+            results.append(dest)
+            if len(results) >= top_k:
+                break
+        return results
+
+    def get_destination_by_id(self, destination_id):
+        self._wait()
+        return self._by_id.get(str(destination_id))
+
+    def get_nearby_destinations(self, destination_id, radius_km):
+        self._wait()
+        return []
+
+    def get_events_by_location(self, location, month=None):
+        self._wait()
+        return [e for e in self.events
+                if location_matches(location, e["location"]) and (month is None or e["month"] == month)]
+
+    def get_event_versions(self, event_ids):
+        wanted = {str(event_id) for event_id in event_ids}
+        return {str(e["id"]): e["updated_at"] for e in self.events if str(e["id"]) in wanted}
+
+
+class FakeChatModel:
+    """
+    Chat model giả lập: ngủ `latency` giây rồi trả lời theo kịch bản
+
+    Kịch bản của mỗi lượt lấy từ state["benchmark_script"] (route + tools), do bộ replay đặt vào.
+    """
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.0, seed: int = 7):
+        self.latency = latency
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt: str) -> str:
+        with self._lock:
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+        time.sleep(delay)
+        return f"[fake] {prompt[:80]}"
+
+
+class ScriptedNodes:
+    """Các node giả lập thay cho agent thật: routing theo kịch bản, tool thật trên DAO giả"""
+
+    def __init__(self, chat_model: FakeChatModel, recorder: LatencyRecorder, tools: dict):
+        self.chat_model = chat_model
+        self.recorder = recorder
+        self.tools = tools
+        self.scripts = {}
+        self._lock = threading.Lock()
+
+    def set_script(self, thread_id: str, script: dict):
+        with self._lock:
+            self.scripts[thread_id] = script
+
+    def _script(self, state) -> dict:
+        with self._lock:
+            return self.scripts.get(state["thread_id"], {})
+
+    def supervisor(self, state):
+        self.chat_model.invoke(state.get("human_message") or "")
+        route = self._script(state).get("route", config_agents.AGENT_OTHER)
+        return {"current_agent": config_agents.AGENT_SUPERVISOR, "next_agent": route}
+
+    def agent(self, agent_name: str):
+        def _node(state):
+            script = self._script(state)
+            for call in script.get("tools", []):
+                tool = self.tools[call["name"]]
+                start = time.perf_counter()
+                tool.invoke(call.get("args") or {})
+                self.recorder.record(f"tool:{call['name']}", time.perf_counter() - start)
+            ai_message = self.chat_model.invoke(state.get("human_message") or "")
+            return {
+                "messages": [AIMessage(content=ai_message)],
+                "ai_message": ai_message,
+                "current_agent": agent_name,
+                "next_agent": script.get("next_agent", "END"),
+            }
+        return _node
+
+    def human(self, state):
+        return {"current_agent": config_agents.AGENT_HUMAN, "next_agent": self._script(state).get("route")}
+
+    def build(self) -> dict:
+        """Map tên node -> hàm node (đã bọc đo latency)"""
+        nodes = {
+            config_agents.AGENT_SUPERVISOR: self.supervisor,
+            config_agents.AGENT_HUMAN: self.human,
+        }
+        for agent_name in (
+                config_agents.AGENT_HELLO, config_agents.AGENT_DESTINATION_INFO,
+                config_agents.AGENT_ITINERARY_PLANNING, config_agents.AGENT_BOOKING_SERVICE,
+                config_agents.AGENT_WEATHER_EMERGENCY, config_agents.AGENT_REVIEW_FEEDBACK,
+                config_agents.AGENT_FAQ, config_agents.AGENT_OTHER
+        ):
+            nodes[agent_name] = self.agent(agent_name)
+        return {name: self.recorder.timed(f"node:{name}", node) for name, node in nodes.items()}
@@ -0,0 +1,181 @@
+# app/benchmarks/replay_benchmark.py
+"""
+Benchmark replay hội thoại qua TourismAgentWorkflow với LLM/DAO/embedding giả lập
+
+Usage:
+    python -m benchmarks.replay_benchmark --corpus benchmarks/corpus/sample_conversations.jsonl --threads 8
+    python -m benchmarks.replay_benchmark --save-baseline benchmarks/baseline.json
+    python -m benchmarks.replay_benchmark --baseline benchmarks/baseline.json --tolerance 0.2
+"""
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fakes import FakeChatModel, FakeDestinationDAO, LatencyRecorder, ScriptedNodes, fake_embedding
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "corpus", "sample_conversations.jsonl")
+
+
+def load_corpus(path: str) -> list:
+    """Mỗi dòng: {"thread_id", "customer_location", "turns": [{"message", "route", "tools", "next_agent"}]}"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def build_workflow(args, recorder: LatencyRecorder):
+    """Tạo workflow với các thành phần giả lập"""
+    from coreAI.fast_router import fast_router_node
+    from coreAI.retrieval.embedding_cache import configure_embedding_cache
+    from coreAI.retrieval.geo_index import destination_geo_index
+    from coreAI.retrieval.lexical_index import destination_lexical_index
+    from coreAI.tools.destination_tools import (
+        retriever_destination_info_tool,
+        get_destination_details_tool,
+        get_nearby_attractions_tool,
+        get_events_and_festivals_tool
+    )
+    from coreAI.tourism_workflow import TourismAgentWorkflow
+    from database.dao.dao_provider import override_destination_dao
+    from database.review_aggregates import review_aggregator
+    from dconfig import config_agents
+    from langgraph.checkpoint.memory import MemorySaver
+
+    dao = FakeDestinationDAO(destinations_per_city=args.destinations_per_city, latency=args.dao_latency)
+    override_destination_dao(dao)
+    configure_embedding_cache(lambda text: fake_embedding(text, args.embedding_latency))
+    destination_geo_index.set_loader(dao.load_rows)
+    destination_lexical_index.set_loader(dao.load_rows)
+    review_aggregator.set_loader(lambda since=None: [])
+
+    tools = {
+        tool.name: tool for tool in (
+            retriever_destination_info_tool,
+            get_destination_details_tool,
+            get_nearby_attractions_tool,
+            get_events_and_festivals_tool
+        )
+    }
+    scripted = ScriptedNodes(FakeChatModel(latency=args.llm_latency, jitter=args.llm_jitter), recorder, tools)
+    nodes = scripted.build()
+    nodes[config_agents.AGENT_ROUTER] = recorder.timed(f"node:{config_agents.AGENT_ROUTER}", fast_router_node)
+    # Checkpoint trong RAM: không tạo/ghi file SQLite lâu dài khi chạy benchmark
+    return TourismAgentWorkflow(nodes=nodes, checkpointer=MemorySaver()), scripted
+
+
+def replay_conversation(workflow, scripted, conversation: dict, recorder: LatencyRecorder, suffix: str):
+    thread_id = f"{conversation['thread_id']}-{suffix}"
+    for turn in conversation["turns"]:
+        scripted.set_script(thread_id, turn)
+        start = time.perf_counter()
+        workflow.process(
+            message=turn["message"],
+            history=[HumanMessage(content=turn["message"])],
+            thread_id=thread_id,
+            customer=1,
+            customer_location=conversation.get("customer_location")
+        )
+        recorder.record("process", time.perf_counter() - start)
+    return thread_id
+
+
+def checkpoint_sizes(workflow, thread_ids: list) -> dict:
+    """Kích thước state cuối của từng thread (pickle)"""
+    sizes = []
+    for thread_id in thread_ids:
+        state = workflow.chain.get_state({"configurable": {"thread_id": thread_id}})
+        sizes.append(len(pickle.dumps(state.values)))
+    if not sizes:
+        return {}
+    return {"avg_bytes": sum(sizes) // len(sizes), "max_bytes": max(sizes), "total_bytes": sum(sizes)}
+
+
+def run(args) -> dict:
+    corpus = load_corpus(args.corpus)
+    recorder = LatencyRecorder()
+    workflow, scripted = build_workflow(args, recorder)
+
+    # Chạy corpus `repeat` lần, mỗi lần với thread_id riêng
+    jobs = [(conversation, str(i)) for i in range(args.repeat) for conversation in corpus]
+    turns = sum(len(conversation["turns"]) for conversation, _ in jobs)
+
+    tracemalloc.start()
+    memory_before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        thread_ids = list(executor.map(
+            lambda job: replay_conversation(workflow, scripted, job[0], recorder, job[1]), jobs
+        ))
+    elapsed = time.perf_counter() - start
+    memory_after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return {
+        "threads": args.threads,
+        "conversations": len(jobs),
+        "turns": turns,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_turns_per_s": round(turns / elapsed, 2) if elapsed else 0.0,
+        "memory_per_conversation_bytes": (memory_after - memory_before) // max(len(jobs), 1),
+        "checkpoint": checkpoint_sizes(workflow, thread_ids),
+        "latency": recorder.percentiles(),
+    }
+
+
+def compare_with_baseline(report: dict, baseline: dict, tolerance: float) -> list:
+    """Các chỉ số chậm hơn baseline quá `tolerance` (tỉ lệ)"""
+    regressions = []
+    for name, stats in baseline.get("latency", {}).items():
+        current = report["latency"].get(name)
+        if current and current["p95_ms"] > stats["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name} p95 {current['p95_ms']}ms > baseline {stats['p95_ms']}ms")
+    if report["throughput_turns_per_s"] < baseline.get("throughput_turns_per_s", 0) * (1 - tolerance):
+        regressions.append(
+            f"throughput {report['throughput_turns_per_s']}/s < baseline {baseline['throughput_turns_per_s']}/s"
+        )
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay benchmark cho TourismAgentWorkflow")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--llm-jitter", type=float, default=0.02)
+    parser.add_argument("--dao-latency", type=float, default=0.005)
+    parser.add_argument("--embedding-latency", type=float, default=0.01)
+    parser.add_argument("--destinations-per-city", type=int, default=50)
+    parser.add_argument("--baseline", help="File baseline JSON để so sánh (regression gate)")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--save-baseline", help="Lưu kết quả làm baseline")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print("REGRESSION:\n" + "\n".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+# app/common_utils/aho_corasick.py
+from collections import deque
+
+
+class AhoCorasick:
+    """
+    Automaton Aho-Corasick: tìm tất cả pattern trong text với một lần duyệt
+
+    Usage:
+        matcher = AhoCorasick()
+        matcher.add("xin chao", payload)
+        matcher.build()
+        matcher.find("alo xin chao") -> [(start, end, payload), ...]
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._patterns = [[]]
+        self._outputs = [[]]
+        self._built = False
+
+    def add(self, pattern: str, payload=None):
+        """Thêm pattern (phải gọi build() lại sau khi thêm)"""
+        if not pattern:
+            return
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._patterns.append([])
+                self._outputs.append([])
+            state = next_state
+        self._patterns[state].append((len(pattern), payload))
+        self._built = False
+
+    def build(self):
+        """Tính fail links theo BFS"""
+        self._outputs = [list(patterns) for patterns in self._patterns]
+        queue = deque()
+        for next_state in self._goto[0].values():
+            self._fail[next_state] = 0
+            queue.append(next_state)
+
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(ch, 0)
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+        self._built = True
+        return self
+
+    def find(self, text: str) -> list:
+        """Trả về list (start, end, payload) của mọi pattern xuất hiện trong text"""
+        if not self._built:
+            self.build()
+        matches = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for length, payload in self._outputs[state]:
+                matches.append((i - length + 1, i + 1, payload))
+        return matches
@@ -0,0 +1,291 @@
+# app/common_utils/metrics.py
+import bisect
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+import dconfig
+import dlog
+
+TRACE_EXPORT_FILE = getattr(dconfig.config_object, "TRACE_EXPORT_FILE", None)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(key: tuple, extra: dict = None) -> str:
+    items = list(key) + list((extra or {}).items())
+    if not items:
+        return ""
+    escaped = [(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in items]
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, {'le': bound})} {cumulative}")
+                cumulative += counts[-1]
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': '+Inf'})} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Registry metrics trong process, xuất theo định dạng Prometheus text"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        with self._lock:
+            return self._metrics.setdefault(name, Counter(name, documentation))
+
+    def histogram(self, name: str, documentation: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+        with self._lock:
+            return self._metrics.setdefault(name, Histogram(name, documentation, buckets))
+
+    def register_collector(self, name: str, documentation: str, collect):
+        """
+        Đăng ký gauge lấy giá trị lúc scrape
+
+        Args:
+            collect: Hàm trả về list (labels, value)
+        """
+        with self._lock:
+            self._collectors.append((name, documentation, collect))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines += metric.render()
+        for name, documentation, collect in collectors:
+            try:
+                samples = collect()
+            except Exception as e:
+                dlog.dlog_e(f"Metrics collector {name} error: {e}")
+                continue
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(_label_key(labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+NODE_LATENCY = registry.histogram("tourism_node_latency_seconds", "Latency của từng node trong graph")
+TOOL_LATENCY = registry.histogram("tourism_tool_latency_seconds", "Latency của từng tool")
+DAO_LATENCY = registry.histogram("tourism_dao_latency_seconds", "Latency của các lời gọi DAO")
+EMBEDDING_LATENCY = registry.histogram("tourism_embedding_latency_seconds", "Latency gọi embedding service")
+PROCESS_LATENCY = registry.histogram("tourism_process_latency_seconds", "Latency của một lượt hội thoại")
+ERRORS = registry.counter("tourism_errors_total", "Số lỗi theo thành phần")
+ROUTING_PATHS = registry.counter("tourism_routing_path_total", "Số lượt theo đường đi giữa các agent")
+LLM_TOKENS = registry.counter("tourism_llm_tokens_total", "Số token LLM theo loại")
+LLM_RETRIES = registry.counter("tourism_llm_retries_total", "Số lần retry khi gọi LLM")
+SINGLE_FLIGHT = registry.counter("tourism_single_flight_total", "Số lời gọi qua single-flight (executed/shared/cached)")
+
+
+# ----- Tracing -----
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_route_path = contextvars.ContextVar("route_path", default=None)
+_export_lock = threading.Lock()
+
+
+def _export_span(span: dict):
+    if not TRACE_EXPORT_FILE:
+        return
+    try:
+        with _export_lock:
+            with open(TRACE_EXPORT_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(span, ensure_ascii=False, default=str) + "\n")
+    except OSError as e:
+        dlog.dlog_e(f"Trace export error: {e}")
+
+
+@contextmanager
+def trace_span(name: str, histogram: Histogram = None, **attributes):
+    """
+    Span đo thời gian một thao tác, ghi vào histogram và export ra file (JSON lines kiểu OpenTelemetry)
+
+    Usage:
+        with trace_span("tool", TOOL_LATENCY, tool="get_destination_details"):
+            ...
+    """
+    parent = _current_span.get()
+    span = {
+        "trace_id": parent["trace_id"] if parent else uuid.uuid4().hex,
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_span_id": parent["span_id"] if parent else None,
+        "name": name,
+        "attributes": attributes,
+    }
+    token = _current_span.set(span)
+    start_ns = time.time_ns()
+    start = time.perf_counter()
+    status = "OK"
+    try:
+        yield span
+    except Exception:
+        status = "ERROR"
+        ERRORS.inc(component=name)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        _current_span.reset(token)
+        if histogram is not None:
+            histogram.observe(elapsed, **attributes)
+        span.update({"start_time_unix_nano": start_ns, "end_time_unix_nano": start_ns + int(elapsed * 1e9),
+                     "status": status})
+        _export_span(span)
+
+
+def traced(name: str, histogram: Histogram = None, **attributes):
+    """Decorator bọc hàm trong trace_span"""
+    def _decorator(func):
+        @functools.wraps(func)
+        def _wrapper(*args, **kwargs):
+            with trace_span(name, histogram, **attributes):
+                return func(*args, **kwargs)
+        return _wrapper
+    return _decorator
+
+
+def traced_node(node_name: str, node):
+    """Bọc node của graph: đo latency và ghi lại đường đi giữa các agent"""
+    @functools.wraps(node)
+    def _wrapper(state):
+        path = _route_path.get()
+        if path is not None:
+            path.append(node_name)
+        with trace_span("node", NODE_LATENCY, node=node_name):
+            return node(state)
+    return _wrapper
+
+
+@contextmanager
+def trace_turn(name: str = "workflow.process"):
+    """Span cho cả lượt hội thoại, cuối lượt tăng counter đường đi (ROUTER→SUPERVISOR→...)"""
+    path = []
+    token = _route_path.set(path)
+    try:
+        with trace_span(name, PROCESS_LATENCY) as span:
+            yield span
+            span["attributes"]["route_path"] = "→".join(path)
+    finally:
+        _route_path.reset(token)
+        if path:
+            ROUTING_PATHS.inc(path="→".join(path))
+
+
+class TracedProxy:
+    """Proxy đo latency mọi method của object (dùng cho DAO)"""
+
+    def __init__(self, target, component: str, histogram: Histogram = DAO_LATENCY):
+        self._target = target
+        self._component = component
+        self._histogram = histogram
+
+    def __getattr__(self, item):
+        attribute = getattr(self._target, item)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def _wrapper(*args, **kwargs):
+            with trace_span(f"{self._component}.{item}", self._histogram, method=f"{self._component}.{item}"):
+                return attribute(*args, **kwargs)
+        return _wrapper
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Callback LangChain đếm token và số lần retry của LLM"""
+
+    def on_llm_end(self, response, **kwargs):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if not usage:
+            for generations in response.generations:
+                for generation in generations:
+                    message = getattr(generation, "message", None)
+                    metadata = getattr(message, "usage_metadata", None) or {}
+                    usage = {
+                        "prompt_tokens": usage.get("prompt_tokens", 0) + metadata.get("input_tokens", 0),
+                        "completion_tokens": usage.get("completion_tokens", 0) + metadata.get("output_tokens", 0),
+                    }
+        for kind in ("prompt_tokens", "completion_tokens"):
+            if usage.get(kind):
+                LLM_TOKENS.inc(usage[kind], kind=kind)
+
+    def on_retry(self, retry_state, **kwargs):
+        LLM_RETRIES.inc()
+
+    def on_llm_error(self, error, **kwargs):
+        ERRORS.inc(component="llm")
+
+
+metrics_callback = MetricsCallbackHandler()
+
+
+def render_metrics() -> str:
+    return registry.render()
+
+
+if TRACE_EXPORT_FILE:
+    os.makedirs(os.path.dirname(os.path.abspath(TRACE_EXPORT_FILE)), exist_ok=True)
@@ -0,0 +1,155 @@
+# app/common_utils/single_flight.py
+import copy
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+from common_utils.metrics import SINGLE_FLIGHT
+
+# Theo tên, flight tạo sau thay flight cùng tên (vd. khi cấu hình lại embedding cache)
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _freeze(value):
+    """Chuyển tham số thành key hashable (list/dict/ndarray -> tuple)"""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_freeze(v) for v in value]
+        return tuple(sorted(items, key=repr)) if isinstance(value, (set, frozenset)) else tuple(items)
+    if hasattr(value, "tobytes"):
+        return value.tobytes()
+    return value
+
+
+def make_key(*args, **kwargs) -> tuple:
+    return _freeze(args), _freeze(kwargs)
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Gộp các lời gọi giống nhau đang chạy đồng thời thành một lời gọi duy nhất
+
+    Lời gọi đầu tiên (leader) thực thi, các lời gọi cùng key tới trong lúc đó chờ và nhận chung kết quả
+    (hoặc chung exception). Có thể giữ kết quả thêm `ttl` giây.
+    """
+
+    def __init__(self, name: str, ttl: float = 0.0, max_results: int = 1024, copy_results: bool = False):
+        self.name = name
+        self.ttl = ttl
+        self.max_results = max_results
+        self.copy_results = copy_results
+        self._calls = {}
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.executed = 0
+        self.shared = 0
+        self.cached = 0
+
+        with _flights_lock:
+            _flights[name] = self
+
+    def _output(self, result):
+        return copy.deepcopy(result) if self.copy_results else result
+
+    def do(self, key, fn, *args, **kwargs):
+        """Chạy fn(*args, **kwargs), hoặc dùng chung kết quả của lời gọi cùng key đang chạy"""
+        with self._lock:
+            if self.ttl:
+                entry = self._results.get(key)
+                if entry is not None:
+                    if entry[1] > time.monotonic():
+                        self._results.move_to_end(key)
+                        self.cached += 1
+                        SINGLE_FLIGHT.inc(flight=self.name, outcome="cached")
+                        return self._output(entry[0])
+                    del self._results[key]
+
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            SINGLE_FLIGHT.inc(flight=self.name, outcome="shared")
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return self._output(call.result)
+
+        SINGLE_FLIGHT.inc(flight=self.name, outcome="executed")
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+                if self.ttl and call.error is None:
+                    self._results[key] = (call.result, time.monotonic() + self.ttl)
+                    while len(self._results) > self.max_results:
+                        self._results.popitem(last=False)
+            call.event.set()
+        return self._output(call.result)
+
+    def forget(self, key=None):
+        """Bỏ kết quả đã giữ (một key hoặc tất cả)"""
+        with self._lock:
+            if key is None:
+                self._results.clear()
+            else:
+                self._results.pop(key, None)
+
+    def stats(self) -> dict:
+        total = self.executed + self.shared + self.cached
+        return {
+            "name": self.name,
+            "in_flight": len(self._calls),
+            "executed": self.executed,
+            "shared": self.shared,
+            "cached": self.cached,
+            "coalescing_ratio": (self.shared + self.cached) / total if total else 0.0,
+        }
+
+
+class CoalescingProxy:
+    """Proxy gộp các lời gọi giống nhau tới những method chỉ đọc của object (dùng cho DAO)"""
+
+    def __init__(self, target, name: str, methods, ttl: float = 0.0):
+        self._target = target
+        self._methods = set(methods)
+        self._flight = SingleFlight(name, ttl=ttl, copy_results=True)
+
+    def __getattr__(self, item):
+        attribute = getattr(self._target, item)
+        if item not in self._methods or not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def _wrapper(*args, **kwargs):
+            return self._flight.do((item, make_key(*args, **kwargs)), attribute, *args, **kwargs)
+        return _wrapper
+
+
+def flight_stats() -> list:
+    with _flights_lock:
+        return [flight.stats() for flight in _flights.values()]
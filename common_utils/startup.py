@@ -0,0 +1,135 @@
+# app/common_utils/startup.py
+import importlib
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import dconfig
+import dlog
+
+WARM_UP_WORKERS = int(getattr(dconfig.config_object, "WARM_UP_WORKERS", 8))
+# Bước bắt buộc bị lỗi: thử lại sau mỗi khoảng này, tới khi thành công mới báo ready
+WARM_UP_RETRY_INTERVAL = float(getattr(dconfig.config_object, "WARM_UP_RETRY_INTERVAL", 5.0))
+
+_process_started = time.monotonic()
+
+
+class StartupProfile:
+    """Thời gian từng bước khởi động (import, warm-up) để xem pod mới mất bao lâu mới nhận traffic"""
+
+    def __init__(self):
+        self._phases = []
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, status: str = "ok"):
+        with self._lock:
+            self._phases.append({"name": name, "seconds": round(seconds, 3), "status": status})
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.monotonic()
+        status = "ok"
+        try:
+            yield
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            self.record(name, time.monotonic() - start, status)
+
+    def report(self) -> dict:
+        with self._lock:
+            phases = sorted(self._phases, key=lambda p: -p["seconds"])
+        return {"since_process_start_s": round(time.monotonic() - _process_started, 3), "phases": phases}
+
+
+startup_profile = StartupProfile()
+
+
+def lazy_import(module_name: str):
+    """Import module lần đầu cần dùng, ghi thời gian import vào startup profile"""
+    if module_name in sys.modules:
+        # import_module vẫn chờ nếu module đang được thread khác import dở
+        return importlib.import_module(module_name)
+    with startup_profile.phase(f"import {module_name}"):
+        return importlib.import_module(module_name)
+
+
+class WarmUp:
+    """
+    Các bước warm-up chạy song song khi khởi động (kết nối pool, nạp prompt, mồi cache, ...)
+
+    Service chỉ báo ready sau khi warm-up xong. Bước tùy chọn bị lỗi không chặn ready, chỉ ghi lại trong status;
+    bước bắt buộc (required=True, vd. kết nối MySQL) bị lỗi thì được thử lại định kỳ và chưa báo ready.
+    """
+
+    def __init__(self, workers: int = WARM_UP_WORKERS, retry_interval: float = WARM_UP_RETRY_INTERVAL):
+        self.workers = workers
+        self.retry_interval = retry_interval
+        self._tasks = []
+        self._required = set()
+        self._results = {}
+        self._ready = threading.Event()
+        self._started = False
+        self._lock = threading.Lock()
+
+    def register(self, name: str, func, required: bool = False):
+        self._tasks.append((name, func))
+        if required:
+            self._required.add(name)
+
+    def _run_task(self, name, func):
+        start = time.monotonic()
+        try:
+            func()
+            status = "ok"
+        except Exception as e:
+            dlog.dlog_e(f"Warm-up {name} error: {e}")
+            status = f"error: {e}"
+        elapsed = time.monotonic() - start
+        startup_profile.record(f"warm_up {name}", elapsed, "ok" if status == "ok" else "error")
+        self._results[name] = {"status": status, "seconds": round(elapsed, 3), "required": name in self._required}
+        return status == "ok"
+
+    def _run_tasks(self, tasks) -> list:
+        """Chạy song song các bước, trả về các bước bắt buộc bị lỗi"""
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="warm-up") as executor:
+            futures = [(name, func, executor.submit(self._run_task, name, func)) for name, func in tasks]
+        return [(name, func) for name, func, future in futures if name in self._required and not future.result()]
+
+    def run(self):
+        """Chạy tất cả các bước (chặn tới khi các bước bắt buộc đều thành công)"""
+        start = time.monotonic()
+        failed = self._run_tasks(self._tasks)
+        while failed:
+            dlog.dlog_e(f"Warm-up required steps failed, retry in {self.retry_interval}s: {[n for n, _ in failed]}")
+            time.sleep(self.retry_interval)
+            failed = self._run_tasks(failed)
+        startup_profile.record("warm_up total", time.monotonic() - start)
+        self._ready.set()
+        dlog.dlog_i(f"Warm-up done in {time.monotonic() - start:.2f}s: {self._results}")
+
+    def start(self):
+        """Chạy warm-up ở thread nền để server nhận health check ngay"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self.run, name="warm-up", daemon=True).start()
+
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def status(self) -> dict:
+        return {
+            "ready": self.is_ready(),
+            "tasks": {name: self._results.get(name, {"status": "pending"}) for name, _ in self._tasks},
+        }
+
+
+warm_up = WarmUp()
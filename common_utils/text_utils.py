@@ -0,0 +1,20 @@
+# app/common_utils/text_utils.py
+import re
+import unicodedata
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def fold_diacritics(text: str) -> str:
+    """Bỏ dấu tiếng Việt: 'Đà Nẵng' -> 'Da Nang'"""
+    text = text.replace("đ", "d").replace("Đ", "D")
+    decomposed = unicodedata.normalize("NFD", text)
+    return "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+
+
+def normalize_text(text: str) -> str:
+    """Chuẩn hóa text làm key: bỏ dấu, chữ thường, gộp khoảng trắng"""
+    if not text:
+        return ""
+    text = fold_diacritics(unicodedata.normalize("NFC", text)).lower()
+    return _WHITESPACE_RE.sub(" ", text).strip()
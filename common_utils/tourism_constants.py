@@ -8,6 +8,49 @@ VN_TOURISM_CITIES = [
     "Ninh Bình", "Mai Châu", "Mù Cang Chải", "Cao Bằng", "Hà Giang"
 ]
 
+# Vùng khí hậu (key TRAVEL_SEASONS) và tọa độ trung tâm của từng tỉnh/thành
+CITY_GEO = {
+    "Hà Nội": {"region": "north", "lat": 21.0285, "lon": 105.8542},
+    "Hồ Chí Minh": {"region": "south", "lat": 10.7769, "lon": 106.7009},
+    "Đà Nẵng": {"region": "central", "lat": 16.0544, "lon": 108.2022},
+    "Nha Trang": {"region": "central", "lat": 12.2388, "lon": 109.1967},
+    "Hội An": {"region": "central", "lat": 15.8801, "lon": 108.3380},
+    "Huế": {"region": "central", "lat": 16.4637, "lon": 107.5909},
+    "Hạ Long": {"region": "north", "lat": 20.9599, "lon": 107.0425},
+    "Sapa": {"region": "north", "lat": 22.3364, "lon": 103.8438},
+    "Đà Lạt": {"region": "south", "lat": 11.9404, "lon": 108.4583},
+    "Phú Quốc": {"region": "south", "lat": 10.2899, "lon": 103.9840},
+    "Hải Phòng": {"region": "north", "lat": 20.8449, "lon": 106.6881},
+    "Cần Thơ": {"region": "south", "lat": 10.0452, "lon": 105.7469},
+    "Vũng Tàu": {"region": "south", "lat": 10.3460, "lon": 107.0843},
+    "Phan Thiết": {"region": "south", "lat": 10.9289, "lon": 108.1021},
+    "Quy Nhơn": {"region": "central", "lat": 13.7820, "lon": 109.2197},
+    "Ninh Bình": {"region": "north", "lat": 20.2506, "lon": 105.9745},
+    "Mai Châu": {"region": "north", "lat": 20.6633, "lon": 105.0835},
+    "Mù Cang Chải": {"region": "north", "lat": 21.8528, "lon": 104.0883},
+    "Cao Bằng": {"region": "north", "lat": 22.6657, "lon": 106.2577},
+    "Hà Giang": {"region": "north", "lat": 22.8233, "lon": 104.9836}
+}
+
+# Tên gọi khác / tỉnh của các điểm trong VN_TOURISM_CITIES, dùng khi lọc theo địa điểm
+CITY_ALIASES = {
+    "Hà Nội": ["Hanoi"],
+    "Hồ Chí Minh": ["TP HCM", "TPHCM", "HCM", "HCMC", "Sài Gòn", "Saigon"],
+    "Đà Nẵng": ["Danang"],
+    "Nha Trang": ["Khánh Hòa"],
+    "Hội An": ["Quảng Nam"],
+    "Huế": ["Thừa Thiên Huế"],
+    "Hạ Long": ["Quảng Ninh", "Halong"],
+    "Sapa": ["Sa Pa", "Lào Cai"],
+    "Đà Lạt": ["Lâm Đồng", "Dalat"],
+    "Phú Quốc": ["Kiên Giang"],
+    "Vũng Tàu": ["Bà Rịa"],
+    "Phan Thiết": ["Bình Thuận", "Mũi Né"],
+    "Quy Nhơn": ["Bình Định"],
+    "Mai Châu": ["Hòa Bình"],
+    "Mù Cang Chải": ["Yên Bái"],
+}
+
 # Loại điểm tham quan
 ATTRACTION_TYPES = {
     "beach": ["bãi biển", "biển", "beach", "seaside"],
@@ -0,0 +1,303 @@
+# app/coreAI/admission.py
+import asyncio
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+
+import dconfig
+import dlog
+from common_utils.metrics import registry
+
+_config = dconfig.config_object
+
+# Số lượt hội thoại chạy đồng thời tối đa (LLM-heavy)
+MAX_CONCURRENT_TURNS = int(getattr(_config, "MAX_CONCURRENT_TURNS", 32))
+# Số lượt được xếp hàng chờ, vượt quá thì từ chối ngay
+MAX_QUEUED_TURNS = int(getattr(_config, "MAX_QUEUED_TURNS", 64))
+TURN_QUEUE_TIMEOUT = float(getattr(_config, "TURN_QUEUE_TIMEOUT", 15.0))
+# Số tin nhắn chờ tối đa trên cùng một thread_id (gửi trùng từ Zalo/Messenger)
+MAX_PENDING_PER_THREAD = int(getattr(_config, "MAX_PENDING_PER_THREAD", 3))
+
+ADMISSION_WAIT = registry.histogram("tourism_admission_wait_seconds", "Thời gian chờ trước khi lượt hội thoại được chạy")
+ADMISSION_SHED = registry.counter("tourism_admission_shed_total", "Số lượt bị từ chối do quá tải")
+
+OVERLOADED_MESSAGE = "Hệ thống đang quá tải, bạn vui lòng gửi lại tin nhắn sau ít phút nhé."
+
+
+class OverloadedError(Exception):
+    """Lượt hội thoại bị từ chối do quá tải"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _ThreadQueue:
+    __slots__ = ("next_ticket", "serving")
+
+    def __init__(self):
+        self.next_ticket = 0
+        self.serving = 0
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class TurnAdmission:
+    """
+    Điều phối lượt hội thoại:
+    - Các lượt cùng thread_id chạy lần lượt theo thứ tự đến (tránh ghi đè checkpoint)
+    - Giới hạn số lượt chạy đồng thời toàn process, hàng chờ có giới hạn, quá tải thì từ chối ngay
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_TURNS, max_queued=MAX_QUEUED_TURNS,
+                 queue_timeout=TURN_QUEUE_TIMEOUT, max_pending_per_thread=MAX_PENDING_PER_THREAD):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.max_pending_per_thread = max_pending_per_thread
+
+        self._cond = threading.Condition()
+        # (loop, future) của các lượt async đang chờ, được đánh thức cùng lúc với notify_all
+        self._async_waiters = []
+        self._threads = {}
+        self._active = 0
+        self._waiting = 0
+        # Vé FIFO cho hàng chờ toàn cục
+        self._next_ticket = 0
+        self._serving = 0
+        self._abandoned = set()
+
+        self.admitted = 0
+        self.shed = 0
+
+    # Các method có hậu tố _locked phải được gọi khi đang giữ self._cond
+
+    def _notify_locked(self):
+        self._cond.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            if not future.done():
+                loop.call_soon_threadsafe(_wake, future)
+
+    def _wait_locked(self, claim, deadline: float) -> bool:
+        """Chờ (chặn thread) tới khi claim() thành công, False nếu hết hạn"""
+        while not claim():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._cond.wait(remaining)
+        return True
+
+    async def _await(self, claim, deadline: float) -> bool:
+        """Chờ trên event loop tới khi claim() thành công (claim chạy khi đang giữ lock), False nếu hết hạn"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if claim():
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                future = loop.create_future()
+                self._async_waiters.append((loop, future))
+            try:
+                await asyncio.wait_for(future, remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    # ----- Thứ tự theo thread_id -----
+
+    def _take_thread_ticket_locked(self, thread_id: str):
+        queue = self._threads.get(thread_id)
+        if queue is None:
+            queue = self._threads[thread_id] = _ThreadQueue()
+        if queue.next_ticket - queue.serving >= self.max_pending_per_thread:
+            raise self._reject("thread_queue_full")
+        ticket = queue.next_ticket
+        queue.next_ticket += 1
+        return queue, ticket
+
+    def _abandon_thread_ticket_locked(self, thread_id: str, queue: _ThreadQueue, ticket: int):
+        if queue.serving == ticket:
+            # Vừa tới lượt thì bỏ: nhường ngay cho vé sau
+            self._leave_thread_locked(thread_id)
+        else:
+            # Lượt đang chạy sẽ bỏ qua vé này khi kết thúc
+            self._abandoned.add((thread_id, ticket))
+
+    def _leave_thread_locked(self, thread_id: str):
+        queue = self._threads[thread_id]
+        queue.serving += 1
+        while (thread_id, queue.serving) in self._abandoned:
+            self._abandoned.discard((thread_id, queue.serving))
+            queue.serving += 1
+        if queue.serving == queue.next_ticket:
+            del self._threads[thread_id]
+        self._notify_locked()
+
+    def _leave_thread(self, thread_id: str):
+        with self._cond:
+            self._leave_thread_locked(thread_id)
+
+    # ----- Giới hạn toàn cục -----
+
+    def _take_slot_ticket_locked(self):
+        """Lấy slot ngay nếu còn, None; không thì xếp hàng và trả về vé"""
+        if self._active < self.max_concurrent and self._serving == self._next_ticket:
+            self._active += 1
+            return None
+        if self._waiting >= self.max_queued:
+            raise self._reject("queue_full")
+        ticket = self._next_ticket
+        self._next_ticket += 1
+        self._waiting += 1
+        return ticket
+
+    def _claim_slot_locked(self, ticket: int) -> bool:
+        if self._serving != ticket or self._active >= self.max_concurrent:
+            return False
+        self._serving += 1
+        self._skip_abandoned_slots()
+        self._active += 1
+        self._waiting -= 1
+        self._notify_locked()
+        return True
+
+    def _abandon_slot_ticket_locked(self, ticket: int):
+        self._waiting -= 1
+        self._abandoned.add((None, ticket))
+        self._skip_abandoned_slots()
+        self._notify_locked()
+
+    def _skip_abandoned_slots(self):
+        while (None, self._serving) in self._abandoned:
+            self._abandoned.discard((None, self._serving))
+            self._serving += 1
+
+    def _release_slot(self):
+        with self._cond:
+            self._active -= 1
+            self._notify_locked()
+
+    def _reject(self, reason: str) -> OverloadedError:
+        self.shed += 1
+        ADMISSION_SHED.inc(reason=reason)
+        return OverloadedError(reason, retry_after=max(self.queue_timeout / 3, 1.0))
+
+    def _admitted(self, start: float):
+        self.admitted += 1
+        ADMISSION_WAIT.observe(time.monotonic() - start)
+
+    # ----- API -----
+
+    def acquire(self, thread_id: str):
+        """Chờ tới lượt của thread và có slot trống; raise OverloadedError nếu quá tải"""
+        start = time.monotonic()
+        deadline = start + self.queue_timeout
+        with self._cond:
+            queue, ticket = self._take_thread_ticket_locked(thread_id)
+            if not self._wait_locked(lambda: queue.serving == ticket, deadline):
+                self._abandon_thread_ticket_locked(thread_id, queue, ticket)
+                raise self._reject("thread_wait_timeout")
+            try:
+                slot_ticket = self._take_slot_ticket_locked()
+                if slot_ticket is not None and not self._wait_locked(
+                        lambda: self._claim_slot_locked(slot_ticket), deadline):
+                    self._abandon_slot_ticket_locked(slot_ticket)
+                    raise self._reject("queue_timeout")
+            except OverloadedError:
+                self._leave_thread_locked(thread_id)
+                raise
+        self._admitted(start)
+
+    async def aacquire(self, thread_id: str):
+        """Bản async của acquire: chờ trên event loop, không chiếm thread nào"""
+        start = time.monotonic()
+        deadline = start + self.queue_timeout
+        with self._cond:
+            queue, ticket = self._take_thread_ticket_locked(thread_id)
+        try:
+            ready = await self._await(lambda: queue.serving == ticket, deadline)
+        except BaseException:
+            # Bị hủy khi đang chờ
+            with self._cond:
+                self._abandon_thread_ticket_locked(thread_id, queue, ticket)
+            raise
+        if not ready:
+            with self._cond:
+                self._abandon_thread_ticket_locked(thread_id, queue, ticket)
+                raise self._reject("thread_wait_timeout")
+
+        try:
+            with self._cond:
+                slot_ticket = self._take_slot_ticket_locked()
+            if slot_ticket is not None:
+                try:
+                    claimed = await self._await(lambda: self._claim_slot_locked(slot_ticket), deadline)
+                except BaseException:
+                    with self._cond:
+                        self._abandon_slot_ticket_locked(slot_ticket)
+                    raise
+                if not claimed:
+                    with self._cond:
+                        self._abandon_slot_ticket_locked(slot_ticket)
+                        raise self._reject("queue_timeout")
+        except BaseException:
+            self._leave_thread(thread_id)
+            raise
+        self._admitted(start)
+
+    def release(self, thread_id: str):
+        self._release_slot()
+        self._leave_thread(thread_id)
+
+    @contextmanager
+    def turn(self, thread_id: str):
+        self.acquire(thread_id)
+        try:
+            yield
+        finally:
+            self.release(thread_id)
+
+    @asynccontextmanager
+    async def aturn(self, thread_id: str):
+        """Bản async: chờ trên event loop, không chiếm thread của executor mặc định (nơi LangGraph chạy node sync)"""
+        await self.aacquire(thread_id)
+        try:
+            yield
+        finally:
+            self.release(thread_id)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "active": self._active,
+                "waiting": self._waiting,
+                "threads": len(self._threads),
+                "admitted": self.admitted,
+                "shed": self.shed,
+            }
+
+
+def overloaded_response(error: OverloadedError) -> dict:
+    """Response trả về khi từ chối lượt hội thoại (cùng dạng với state cuối của workflow)"""
+    dlog.dlog_e(f"Turn rejected: {error.reason}")
+    return {
+        "ai_message": OVERLOADED_MESSAGE,
+        "next_agent": "END",
+        "overloaded": True,
+        "retry_after": error.retry_after,
+    }
+
+
+turn_admission = TurnAdmission()
+
+registry.register_collector(
+    "tourism_admission",
+    "Trạng thái hàng chờ lượt hội thoại",
+    lambda: [({"stat": key}, value) for key, value in turn_admission.stats().items()]
+)
@@ -6,6 +6,9 @@ from pydantic import BaseModel, Field
 import dlog
 from common_utils.datetime_utils import get_current_date_info
 from coreAI.agents.agent_base import BaseAgent
+from coreAI.agents.agent_registry import agent_registry
+from coreAI.agents.tool_executor import bounded_tools
+from coreAI.history_policy import history_policy
 from coreAI.tools.destination_tools import (
     retriever_destination_info_tool,
     get_destination_details_tool,
@@ -14,6 +17,13 @@ from coreAI.tools.destination_tools import (
 )
 from dconfig import config_agents, config_prompts_path
 
+DESTINATION_INFO_TOOLS = bounded_tools([
+    retriever_destination_info_tool,
+    get_destination_details_tool,
+    get_nearby_attractions_tool,
+    get_events_and_festivals_tool
+])
+
 
 class DestinationInfoResponse(BaseModel):
     """Response cho agent thông tin điểm đến"""
@@ -38,31 +48,18 @@ class DestinationInfoAgent(BaseAgent):
     def invoke(self, state):
         dlog.dlog_i("--- DESTINATION_INFO Agent ---")
         current_time, day_of_week = get_current_date_info()
-        config: RunnableConfig = {"configurable": {"thread_id": state["thread_id"]}}
+        config: RunnableConfig = {"configurable": {"thread_id": state["thread_id"], "customer": state.get("customer")}}
 
         customer_location = state.get("customer_location", "Hà Nội, Việt Nam")
 
         input_data = {
-            "messages": state["messages"],
+            "messages": history_policy.apply(state),
             "current_time": current_time,
             "day_of_week": day_of_week,
             "customer_location": customer_location
         }
 
-        # Setup agent với tools
-        self.setup_agent(
-            system_prompt_path=config_prompts_path.DESTINATION_INFO_PROMPT,
-            tools=[
-                retriever_destination_info_tool,
-                get_destination_details_tool,
-                get_nearby_attractions_tool,
-                get_events_and_festivals_tool
-            ],
-            variables=input_data,
-            response_class=DestinationInfoResponse
-        )
-
-        # Invoke agent
+        # Invoke agent (đã setup sẵn trong agent_registry)
         response = self.agent.invoke(input=input_data, config=config)
 
         # Update state
@@ -78,5 +75,11 @@ class DestinationInfoAgent(BaseAgent):
 
 def destination_info_node(state):
     """Node cho agent thông tin điểm đến"""
-    agent = DestinationInfoAgent()
+    agent = agent_registry.get_agent(
+        agent_class=DestinationInfoAgent,
+        agent_name=config_agents.AGENT_DESTINATION_INFO,
+        system_prompt_path=config_prompts_path.DESTINATION_INFO_PROMPT,
+        tools=DESTINATION_INFO_TOOLS,
+        response_class=DestinationInfoResponse
+    )
     return agent.invoke(state)
\ No newline at end of file
@@ -0,0 +1,90 @@
+# app/coreAI/agents/agent_registry.py
+import inspect
+import threading
+
+import dlog
+from coreAI.prompt_registry import prompt_registry
+
+# Các biến thay đổi theo từng lượt hội thoại, được điền khi invoke thay vì khi build agent
+TURN_VARIABLES = ("current_time", "day_of_week", "customer_location")
+
+
+def _accepts_system_prompt(agent) -> bool:
+    """setup_agent của agent có nhận prompt đã render sẵn (tham số system_prompt) hay không"""
+    try:
+        return "system_prompt" in inspect.signature(agent.setup_agent).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+class AgentRegistry:
+    """Registry dùng chung trong process, lưu các agent đã được setup sẵn"""
+
+    def __init__(self):
+        self._agents = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(agent_name, system_prompt_path, tools, response_class):
+        """Key của agent: tên agent, prompt, bộ tools và response class"""
+        tool_names = tuple(sorted(getattr(t, "name", str(t)) for t in tools))
+        response_name = f"{response_class.__module__}.{response_class.__qualname__}" if response_class else None
+        return agent_name, system_prompt_path, tool_names, response_name
+
+    def get_agent(self, agent_class, agent_name, system_prompt_path, tools, response_class=None):
+        """
+        Lấy agent đã build sẵn, build lần đầu nếu chưa có
+
+        Args:
+            agent_class: Class agent (kế thừa BaseAgent)
+            agent_name: Tên agent trong config_agents
+            system_prompt_path: Đường dẫn prompt
+            tools: Danh sách tools
+            response_class: Schema structured output
+
+        Returns:
+            Instance agent đã setup
+        """
+        key = self.make_key(agent_name, system_prompt_path, tools, response_class)
+        agent = self._agents.get(key)
+        if agent is not None:
+            return agent
+
+        with self._lock:
+            agent = self._agents.get(key)
+            if agent is None:
+                dlog.dlog_i(f"Build agent {agent_name}")
+                agent = agent_class()
+                # Render prompt đã compile sẵn một lần, không đọc lại YAML khi build agent.
+                # Giữ nguyên placeholder để prompt vẫn là template, giá trị thật truyền vào lúc invoke
+                prompt = prompt_registry.get(system_prompt_path)
+                variables = set(TURN_VARIABLES) | (prompt.variables if prompt is not None else set())
+                placeholders = {name: "{" + name + "}" for name in variables}
+                agent.system_prompt = prompt_registry.render(system_prompt_path, **placeholders)
+                agent.prompt_static_prefix = prompt.static_prefix
+                setup_kwargs = {
+                    "system_prompt_path": system_prompt_path,
+                    "tools": list(tools),
+                    "variables": placeholders,
+                    "response_class": response_class
+                }
+                # BaseAgent.setup_agent chỉ nhận system_prompt_path, agent hỗ trợ thì truyền luôn prompt đã render
+                if _accepts_system_prompt(agent):
+                    setup_kwargs["system_prompt"] = agent.system_prompt
+                agent.setup_agent(**setup_kwargs)
+                self._agents[key] = agent
+        return agent
+
+    def clear(self):
+        """Bỏ toàn bộ agent đã build (khi đổi prompt/config), lượt đang chạy vẫn giữ agent cũ"""
+        with self._lock:
+            self._agents = {}
+
+    def __len__(self):
+        return len(self._agents)
+
+
+agent_registry = AgentRegistry()
+
+# prompts.yaml thay đổi: build lại agent ở lần dùng tiếp theo
+prompt_registry.on_reload(lambda version: agent_registry.clear())
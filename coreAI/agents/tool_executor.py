@@ -0,0 +1,147 @@
+# app/coreAI/agents/tool_executor.py
+import contextvars
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import StructuredTool
+
+import dconfig
+import dlog
+from common_utils.metrics import registry
+
+_config = dconfig.config_object
+
+# Số tool chạy đồng thời tối đa trong toàn process
+TOOL_MAX_CONCURRENCY = int(getattr(_config, "TOOL_MAX_CONCURRENCY", 16))
+TOOL_CALL_TIMEOUT = float(getattr(_config, "TOOL_CALL_TIMEOUT", 10.0))
+# Số lời gọi đã quá timeout mà vẫn đang chạy tối đa cho mỗi tool, vượt quá thì từ chối ngay lời gọi mới
+TOOL_MAX_HUNG_PER_TOOL = int(getattr(_config, "TOOL_MAX_HUNG_PER_TOOL", max(TOOL_MAX_CONCURRENCY // 4, 1)))
+
+# Timeout riêng theo tool (giây)
+TOOL_TIMEOUTS = {
+    "retriever_destination_info": 8.0,
+    "get_destination_details": 5.0,
+    "get_nearby_attractions": 5.0,
+    "get_events_and_festivals": 5.0,
+    "plan_itinerary_route": 5.0,
+    "create_booking": 10.0,
+}
+# Tool có idempotency key: quá timeout thì kết quả vẫn có thể được ghi, báo đang xử lý thay vì báo lỗi
+IDEMPOTENT_TOOLS = {"create_booking"}
+
+TOOL_ABANDONED = registry.counter("tourism_tool_abandoned_total", "Số lời gọi tool quá timeout hoặc bị từ chối")
+
+_pool = ThreadPoolExecutor(max_workers=TOOL_MAX_CONCURRENCY, thread_name_prefix="tool")
+# Slot của pool, chỉ trả lại khi tool thực sự chạy xong (future.cancel() không dừng được tool đang chạy)
+_slots = threading.BoundedSemaphore(TOOL_MAX_CONCURRENCY)
+_hung = Counter()
+_hung_lock = threading.Lock()
+
+
+def _timeout_for(tool_name: str, timeout=None) -> float:
+    return timeout if timeout is not None else TOOL_TIMEOUTS.get(tool_name, TOOL_CALL_TIMEOUT)
+
+
+def _timeout_output(tool_name: str, timeout: float) -> str:
+    dlog.dlog_e(f"Tool {tool_name} timeout after {timeout}s")
+    if tool_name in IDEMPOTENT_TOOLS:
+        return json.dumps({
+            "status": "pending",
+            "message": f"Yêu cầu {tool_name} vẫn đang được xử lý và có thể đã thành công",
+            "suggestion": "Gọi lại với đúng thông tin cũ để lấy kết quả, không tạo thêm yêu cầu mới"
+        }, ensure_ascii=False)
+    return json.dumps({
+        "error": f"Tool {tool_name} quá thời gian phản hồi",
+        "suggestion": "Thử lại hoặc trả lời với thông tin hiện có"
+    }, ensure_ascii=False)
+
+
+def _shed_output(tool_name: str) -> str:
+    dlog.dlog_e(f"Tool {tool_name} shed: {_hung[tool_name]} calls still running after timeout")
+    TOOL_ABANDONED.inc(tool=tool_name, outcome="shed")
+    return json.dumps({
+        "error": f"Tool {tool_name} đang quá tải",
+        "suggestion": "Trả lời với thông tin hiện có"
+    }, ensure_ascii=False)
+
+
+def _track_hung(tool_name: str, future):
+    """Đếm lời gọi quá timeout cho tới khi tool thực sự chạy xong"""
+    def _done(_):
+        with _hung_lock:
+            _hung[tool_name] -= 1
+
+    with _hung_lock:
+        _hung[tool_name] += 1
+    TOOL_ABANDONED.inc(tool=tool_name, outcome="timeout")
+    future.add_done_callback(_done)
+
+
+def hung_calls() -> dict:
+    """Số lời gọi quá timeout vẫn đang giữ slot, theo tool"""
+    with _hung_lock:
+        return {name: count for name, count in _hung.items() if count}
+
+
+def invoke_tool(tool, args: dict, timeout=None, config: RunnableConfig = None):
+    """
+    Chạy một tool trong pool dùng chung, có timeout
+
+    Args:
+        config: Chỉ phần configurable (thread_id, customer, ...) được chuyển cho tool, callbacks đã chạy ở bản bọc
+    """
+    timeout = _timeout_for(tool.name, timeout)
+    with _hung_lock:
+        if _hung[tool.name] >= TOOL_MAX_HUNG_PER_TOOL:
+            return _shed_output(tool.name)
+
+    deadline = time.monotonic() + timeout
+    if not _slots.acquire(timeout=timeout):
+        TOOL_ABANDONED.inc(tool=tool.name, outcome="no_slot")
+        return _timeout_output(tool.name, timeout)
+    try:
+        tool_config = {"configurable": dict((config or {}).get("configurable") or {})}
+        future = _pool.submit(contextvars.copy_context().run, tool.invoke, args, tool_config)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+
+    try:
+        return future.result(timeout=max(deadline - time.monotonic(), 0.0))
+    except FutureTimeoutError:
+        _track_hung(tool.name, future)
+        return _timeout_output(tool.name, timeout)
+
+
+registry.register_collector(
+    "tourism_tool_hung_calls",
+    "Số lời gọi tool quá timeout vẫn đang chạy",
+    lambda: [({"tool": name}, count) for name, count in hung_calls().items()]
+)
+
+
+def bounded_tool(tool, timeout=None):
+    """
+    Bọc tool để mỗi lần gọi đi qua pool dùng chung (giới hạn concurrency toàn process) và có timeout
+
+    Tool node của agent chạy các tool call song song, bản bọc giữ nguyên tên/schema của tool gốc
+    và chuyển tiếp config["configurable"] (vd. customer cho create_booking/create_review).
+    """
+    def _run(config: RunnableConfig = None, **kwargs):
+        return invoke_tool(tool, kwargs, timeout, config=config)
+
+    return StructuredTool.from_function(
+        func=_run,
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema
+    )
+
+
+def bounded_tools(tools: list, timeout=None) -> list:
+    return [bounded_tool(tool, timeout) for tool in tools]
@@ -0,0 +1,267 @@
+# app/coreAI/answer_cache.py
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+
+import numpy as np
+
+import dconfig
+import dlog
+from common_utils.text_utils import normalize_text
+from dconfig import config_agents
+
+_config = dconfig.config_object
+
+ANSWER_CACHE_ENABLED = str(getattr(_config, "ANSWER_CACHE_ENABLED", "true")).lower() == "true"
+ANSWER_CACHE_SIMILARITY = float(getattr(_config, "ANSWER_CACHE_SIMILARITY", 0.92))
+ANSWER_CACHE_TTL = float(getattr(_config, "ANSWER_CACHE_TTL", 6 * 3600))
+ANSWER_CACHE_BUCKET_SIZE = int(getattr(_config, "ANSWER_CACHE_BUCKET_SIZE", 512))
+
+# Chỉ cache câu trả lời của các agent này, và chỉ ở lượt không phụ thuộc ngữ cảnh (xem is_context_free)
+CACHEABLE_AGENTS = (config_agents.AGENT_DESTINATION_INFO, config_agents.AGENT_FAQ)
+
+# {event_id: updated_at} các sự kiện tool trả về trong lượt hiện tại (None = không theo dõi)
+_cited_events = contextvars.ContextVar("cited_events", default=None)
+
+
+def cited_destination_ids(destination_details) -> list:
+    """Lấy các ID điểm đến được nhắc tới trong destination_details"""
+    if not destination_details:
+        return []
+    ids = []
+    items = destination_details if isinstance(destination_details, list) else [destination_details]
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        if item.get("id") is not None:
+            ids.append(str(item["id"]))
+        for value in item.values():
+            if isinstance(value, (list, dict)):
+                ids.extend(cited_destination_ids(value))
+    return ids
+
+
+def is_context_free(state) -> bool:
+    """
+    Lượt đầu của thread: chưa có câu trả lời trước, summary hay slot ghim
+
+    Câu hỏi nối tiếp ("xem thêm", "giá vé bao nhiêu?", "còn chỗ nào khác không") phụ thuộc history và
+    cursor phân trang của thread, không được tra hay lưu answer cache. Thread chưa có câu trả lời nào
+    thì cũng chưa có cursor/exclude_ids từ lượt trước.
+    """
+    from coreAI.history_policy import history_policy
+
+    return not history_policy.has_context(state)
+
+
+@contextmanager
+def track_citations():
+    """Theo dõi các sự kiện được tool trả về trong một lượt, yield dict {event_id: updated_at}"""
+    events = {}
+    token = _cited_events.set(events)
+    try:
+        yield events
+    finally:
+        _cited_events.reset(token)
+
+
+def cite_events(events):
+    """Ghi nhận các sự kiện (bản ghi events_festivals) mà câu trả lời của lượt hiện tại có thể trích dẫn"""
+    cited = _cited_events.get()
+    if cited is None:
+        return
+    for event in events or []:
+        if isinstance(event, dict) and event.get("id") is not None:
+            cited[str(event["id"])] = event.get("updated_at")
+
+
+def event_versions(event_ids) -> dict:
+    """updated_at hiện tại của các sự kiện (đọc MySQL 1 lần), sự kiện đã xóa không có trong kết quả"""
+    from database.dao.dao_provider import get_destination_dao
+
+    return get_destination_dao().get_event_versions(event_ids)
+
+
+def destination_version(destination_id):
+    """updated_at hiện tại của điểm đến (lấy từ geo index)"""
+    from coreAI.retrieval.geo_index import destination_geo_index
+
+    return destination_geo_index.updated_at(destination_id)
+
+
+class _Entry:
+    __slots__ = ("question", "ai_message", "destination_details", "versions", "event_versions", "expires_at",
+                 "latency")
+
+    def __init__(self, question, ai_message, destination_details, versions, event_versions, expires_at, latency):
+        self.question = question
+        self.ai_message = ai_message
+        self.destination_details = destination_details
+        self.versions = versions
+        self.event_versions = event_versions
+        self.expires_at = expires_at
+        self.latency = latency
+
+
+class _Bucket:
+    """Các câu trả lời cùng agent/vị trí/ngôn ngữ/ngày, vector đã chuẩn hóa để tính cosine bằng 1 phép nhân"""
+
+    def __init__(self):
+        self.entries = []
+        self.vectors = None
+
+    def add(self, vector, entry):
+        self.entries.append(entry)
+        row = vector[np.newaxis, :]
+        self.vectors = row if self.vectors is None else np.vstack([self.vectors, row])
+        if len(self.entries) > ANSWER_CACHE_BUCKET_SIZE:
+            self.remove(0)
+
+    def remove(self, index):
+        del self.entries[index]
+        self.vectors = np.delete(self.vectors, index, axis=0) if self.entries else None
+
+    def discard(self, entry) -> bool:
+        """Xóa entry (theo identity, vị trí có thể đã đổi), trả về False nếu entry không còn"""
+        for index, current in enumerate(self.entries):
+            if current is entry:
+                self.remove(index)
+                return True
+        return False
+
+
+class SemanticAnswerCache:
+    """
+    Cache câu trả lời cuối (ai_message + destination_details) theo ngữ nghĩa câu hỏi
+
+    Bucket theo (agent, customer_location, customer_language, ngày). Tra cứu bằng cosine similarity
+    với ngưỡng ANSWER_CACHE_SIMILARITY. Entry hết hạn theo TTL hoặc khi điểm đến được trích dẫn
+    có updated_at mới hơn (vector_sync chạy ở process khác, thay đổi được thấy qua geo index).
+    Sự kiện/lễ hội không có trong geo index: updated_at của các sự kiện tool trả về trong lượt
+    (xem track_citations) được kiểm tra lại bằng một truy vấn MySQL khi cache hit.
+    """
+
+    def __init__(self, embed_fn=None, version_fn=destination_version, event_version_fn=event_versions,
+                 similarity=ANSWER_CACHE_SIMILARITY, ttl=ANSWER_CACHE_TTL):
+        self._embed_fn = embed_fn
+        self._version_fn = version_fn
+        self._event_version_fn = event_version_fn
+        self.similarity = similarity
+        self.ttl = ttl
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+
+    @staticmethod
+    def bucket_key(agent, customer_location, customer_language):
+        return agent, normalize_text(customer_location or ""), customer_language or "vi", date.today().isoformat()
+
+    def _embed(self, question: str):
+        if self._embed_fn is None:
+            from coreAI.retrieval.embedding_cache import cached_embedding
+            self._embed_fn = cached_embedding
+        vector = np.asarray(self._embed_fn(" ".join(question.lower().split())), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _is_valid(self, entry) -> bool:
+        if entry.expires_at < time.monotonic():
+            return False
+        for destination_id, version in entry.versions.items():
+            if self._version_fn(destination_id) != version:
+                return False
+        if entry.event_versions:
+            try:
+                current = self._event_version_fn(list(entry.event_versions))
+            except Exception as e:
+                dlog.dlog_e(f"Answer cache event version error: {e}")
+                return False
+            if any(current.get(event_id) != version for event_id, version in entry.event_versions.items()):
+                return False
+        return True
+
+    def lookup(self, question: str, customer_location=None, customer_language=None, agents=CACHEABLE_AGENTS):
+        """
+        Tìm câu trả lời đã cache cho câu hỏi tương tự
+
+        Returns:
+            (agent, entry) hoặc None
+        """
+        keys = [self.bucket_key(agent, customer_location, customer_language) for agent in agents]
+        with self._lock:
+            if not any(key in self._buckets for key in keys):
+                self.misses += 1
+                return None
+
+        vector = self._embed(question)
+        best = None
+        with self._lock:
+            for key in keys:
+                bucket = self._buckets.get(key)
+                if bucket is None or bucket.vectors is None:
+                    continue
+                scores = bucket.vectors @ vector
+                index = int(np.argmax(scores))
+                if scores[index] >= self.similarity and (best is None or scores[index] > best[0]):
+                    best = (float(scores[index]), key, bucket.entries[index])
+
+        if best is not None:
+            # Kiểm tra version ngoài lock: có thể phải refresh geo index / đọc version sự kiện (MySQL)
+            score, key, entry = best
+            if self._is_valid(entry):
+                with self._lock:
+                    self.hits += 1
+                    self.saved_seconds += entry.latency
+                dlog.dlog_i(f"Answer cache hit ({score:.3f}): '{question}' ~ '{entry.question}'")
+                return key[0], entry
+            with self._lock:
+                bucket = self._buckets.get(key)
+                if bucket is not None and bucket.discard(entry):
+                    self.invalidations += 1
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def store(self, question: str, agent, ai_message, destination_details=None, customer_location=None,
+              customer_language=None, latency=0.0, event_versions=None):
+        """
+        Lưu câu trả lời cuối của một lượt
+
+        Args:
+            event_versions: {event_id: updated_at} các sự kiện câu trả lời dựa vào (xem track_citations)
+        """
+        if agent not in CACHEABLE_AGENTS or not ai_message:
+            return
+        versions = {dest_id: self._version_fn(dest_id) for dest_id in cited_destination_ids(destination_details)}
+        entry = _Entry(question, ai_message, destination_details, versions, dict(event_versions or {}),
+                       time.monotonic() + self.ttl, latency)
+        vector = self._embed(question)
+
+        key = self.bucket_key(agent, customer_location, customer_language)
+        with self._lock:
+            # Bỏ các bucket của ngày cũ
+            today = key[3]
+            for old_key in [k for k in self._buckets if k[3] != today]:
+                del self._buckets[old_key]
+            self._buckets.setdefault(key, _Bucket()).add(vector, entry)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": sum(len(b.entries) for b in self._buckets.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
+
+
+answer_cache = SemanticAnswerCache()
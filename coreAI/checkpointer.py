@@ -0,0 +1,460 @@
+# app/coreAI/checkpointer.py
+import asyncio
+import atexit
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+from langgraph.checkpoint.memory import MemorySaver
+
+import dconfig
+import dlog
+from common_utils.metrics import registry
+
+_config = dconfig.config_object
+
+# "sqlite": dùng chung giữa các worker trong pod, "memory": chỉ trong process (dev/test)
+CHECKPOINT_BACKEND = str(getattr(_config, "CHECKPOINT_BACKEND", "sqlite")).lower()
+CHECKPOINT_DB_PATH = getattr(
+    _config, "CHECKPOINT_DB_PATH",
+    os.path.join(getattr(_config, "DATA_DIR", "data"), "checkpoints.sqlite")
+)
+# Số checkpoint mới nhất giữ lại cho mỗi thread (mỗi lượt hội thoại sinh vài checkpoint)
+CHECKPOINT_KEEP_LATEST = int(getattr(_config, "CHECKPOINT_KEEP_LATEST", 4))
+# Thread không hoạt động quá thời gian này thì bị xóa
+CHECKPOINT_TTL = float(getattr(_config, "CHECKPOINT_TTL", 7 * 24 * 3600))
+CHECKPOINT_SWEEP_INTERVAL = float(getattr(_config, "CHECKPOINT_SWEEP_INTERVAL", 600))
+# Pending writes được gom lại, ghi cùng checkpoint kế tiếp hoặc khi đủ batch / hết interval
+CHECKPOINT_WRITE_BATCH = int(getattr(_config, "CHECKPOINT_WRITE_BATCH", 64))
+CHECKPOINT_FLUSH_INTERVAL = float(getattr(_config, "CHECKPOINT_FLUSH_INTERVAL", 0.5))
+# Payload nhỏ hơn ngưỡng này không nén
+CHECKPOINT_COMPRESS_MIN_BYTES = int(getattr(_config, "CHECKPOINT_COMPRESS_MIN_BYTES", 256))
+CHECKPOINT_COMPRESS_LEVEL = int(getattr(_config, "CHECKPOINT_COMPRESS_LEVEL", 6))
+
+_COMPRESSED_SUFFIX = "+zlib"
+_SIZE_BUCKETS = (512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+CHECKPOINT_SIZE = registry.histogram(
+    "tourism_checkpoint_size_bytes", "Kích thước checkpoint sau khi nén", buckets=_SIZE_BUCKETS
+)
+CHECKPOINT_BYTES = registry.counter("tourism_checkpoint_bytes_total", "Tổng số byte checkpoint trước/sau khi nén")
+CHECKPOINT_EVICTED = registry.counter("tourism_checkpoint_evicted_total", "Số checkpoint/thread bị xóa")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB NOT NULL,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_threads_updated_at ON threads (updated_at);
+"""
+
+
+def _thread_config(thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> RunnableConfig:
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+
+
+class SQLiteCheckpointer(BaseCheckpointSaver[str]):
+    """
+    Checkpointer lưu trên SQLite (WAL), dùng chung giữa các uvicorn worker trên cùng pod
+
+    - Checkpoint lưu nguyên khối (cả channel_values), serialize bằng serde của LangGraph rồi nén zlib
+    - Mỗi thread chỉ giữ CHECKPOINT_KEEP_LATEST checkpoint mới nhất, thread không hoạt động quá TTL bị xóa
+    - Pending writes được gom batch và ghi trong cùng transaction với checkpoint kế tiếp; write đặc biệt
+      (lỗi, interrupt, ...) được ghi ngay vì lượt có thể dừng ở đó và resume ở worker khác
+
+    Do chỉ giữ K checkpoint gần nhất nên lịch sử (get_state_history) bị cắt ngắn; state không dùng DeltaChannel.
+    """
+
+    def __init__(self, path: str = CHECKPOINT_DB_PATH, keep_latest: int = CHECKPOINT_KEEP_LATEST,
+                 ttl: float = CHECKPOINT_TTL, sweep_interval: float = CHECKPOINT_SWEEP_INTERVAL,
+                 write_batch: int = CHECKPOINT_WRITE_BATCH, flush_interval: float = CHECKPOINT_FLUSH_INTERVAL,
+                 serde=None):
+        super().__init__(serde=serde)
+        self.path = path
+        self.keep_latest = max(keep_latest, 1)
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self.write_batch = write_batch
+        self.flush_interval = flush_interval
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._pending_writes = []
+        self._touched = {}
+        self._last_sweep = time.monotonic()
+        self._maintainer = None
+
+        self._connection().executescript(_SCHEMA)
+
+    # ----- Kết nối -----
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    # ----- Serialize -----
+
+    def _dumps(self, value) -> tuple:
+        type_, data = self.serde.dumps_typed(value)
+        raw_size = len(data)
+        if raw_size >= CHECKPOINT_COMPRESS_MIN_BYTES:
+            compressed = zlib.compress(data, CHECKPOINT_COMPRESS_LEVEL)
+            if len(compressed) < raw_size:
+                type_, data = type_ + _COMPRESSED_SUFFIX, compressed
+        CHECKPOINT_BYTES.inc(raw_size, stage="raw")
+        CHECKPOINT_BYTES.inc(len(data), stage="stored")
+        return type_, data
+
+    def _loads(self, type_: str, data: bytes):
+        if type_.endswith(_COMPRESSED_SUFFIX):
+            type_, data = type_[:-len(_COMPRESSED_SUFFIX)], zlib.decompress(data)
+        return self.serde.loads_typed((type_, data))
+
+    # ----- Đọc -----
+
+    def _row_to_tuple(self, conn, row) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row
+        writes = conn.execute(
+            "SELECT task_id, idx, channel, type, value, task_path FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id)
+        ).fetchall()
+        writes.sort(key=lambda w: writes_sort_key(w[5], w[0], w[1]))
+        return CheckpointTuple(
+            config=_thread_config(thread_id, checkpoint_ns, checkpoint_id),
+            checkpoint=self._loads(type_, checkpoint),
+            metadata=self._loads(metadata_type, metadata),
+            pending_writes=[(task_id, channel, self._loads(w_type, value))
+                            for task_id, _, channel, w_type, value, _ in writes],
+            parent_config=_thread_config(thread_id, checkpoint_ns, parent_id) if parent_id else None,
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        self.flush()
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        conn = self._connection()
+        query = "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+        params = [thread_id, checkpoint_ns]
+        if checkpoint_id:
+            query += " AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        row = conn.execute(query, params).fetchone()
+        return self._row_to_tuple(conn, row) if row else None
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[dict] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        self.flush()
+        query = "SELECT * FROM checkpoints WHERE 1 = 1"
+        params = []
+        if config:
+            query += " AND thread_id = ?"
+            params.append(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                query += " AND checkpoint_ns = ?"
+                params.append(checkpoint_ns)
+            checkpoint_id = get_checkpoint_id(config)
+            if checkpoint_id:
+                query += " AND checkpoint_id = ?"
+                params.append(checkpoint_id)
+        if before and get_checkpoint_id(before):
+            query += " AND checkpoint_id < ?"
+            params.append(get_checkpoint_id(before))
+        query += " ORDER BY checkpoint_id DESC"
+
+        conn = self._connection()
+        for row in conn.execute(query, params).fetchall():
+            if filter:
+                metadata = self._loads(row[6], row[7])
+                if not all(metadata.get(k) == v for k, v in filter.items()):
+                    continue
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+            yield self._row_to_tuple(conn, row)
+
+    # ----- Ghi -----
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, data = self._dumps(checkpoint)
+        metadata_type, metadata_data = self._dumps(get_checkpoint_metadata(config, metadata))
+        CHECKPOINT_SIZE.observe(len(data) + len(metadata_data))
+
+        with self._write_lock:
+            with self._transaction() as conn:
+                self._flush_locked(conn)
+                conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                     type_, data, metadata_type, metadata_data)
+                )
+                self._prune(conn, thread_id, checkpoint_ns)
+                self._touch(conn, thread_id)
+        self._maybe_sweep()
+        return _thread_config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple], task_id: str, task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, data = self._dumps(value)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id,
+                         WRITES_IDX_MAP.get(channel, idx), channel, type_, data, task_path))
+
+        with self._write_lock:
+            self._pending_writes.extend(rows)
+            durable = any(row[4] < 0 for row in rows)
+            if not durable and len(self._pending_writes) < self.write_batch:
+                return
+            with self._transaction() as conn:
+                self._flush_locked(conn)
+
+    def flush(self):
+        """Ghi các pending writes đang gom vào DB"""
+        if not self._pending_writes:
+            return
+        with self._write_lock:
+            with self._transaction() as conn:
+                self._flush_locked(conn)
+
+    def _flush_locked(self, conn):
+        if not self._pending_writes:
+            return
+        rows, self._pending_writes = self._pending_writes, []
+        # Write thường (idx >= 0) đã có thì giữ nguyên, write đặc biệt (lỗi, interrupt, ...) thì ghi đè
+        conn.executemany("INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         [row for row in rows if row[4] >= 0])
+        conn.executemany("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         [row for row in rows if row[4] < 0])
+        for thread_id in {row[0] for row in rows}:
+            self._touch(conn, thread_id)
+
+    def _touch(self, conn, thread_id: str):
+        now = time.time()
+        # Ghi updated_at tối đa mỗi phút một lần cho mỗi thread
+        if now - self._touched.get(thread_id, 0) < 60:
+            return
+        self._touched[thread_id] = now
+        conn.execute("INSERT OR REPLACE INTO threads (thread_id, updated_at) VALUES (?, ?)", (thread_id, now))
+
+    def _prune(self, conn, thread_id: str, checkpoint_ns: str):
+        """Chỉ giữ keep_latest checkpoint mới nhất (checkpoint_id là uuid6, tăng dần theo thời gian)"""
+        row = conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.keep_latest - 1)
+        ).fetchone()
+        if row is None:
+            return
+        params = (thread_id, checkpoint_ns, row[0])
+        deleted = conn.execute(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?", params
+        ).rowcount
+        conn.execute("DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?", params)
+        if deleted:
+            CHECKPOINT_EVICTED.inc(deleted, reason="keep_latest")
+
+    # ----- Xóa -----
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._write_lock:
+            with self._transaction() as conn:
+                self._flush_locked(conn)
+                self._delete_threads(conn, [thread_id])
+
+    def _delete_threads(self, conn, thread_ids: list):
+        for table in ("checkpoints", "writes", "threads"):
+            conn.executemany(f"DELETE FROM {table} WHERE thread_id = ?", [(t,) for t in thread_ids])
+        for thread_id in thread_ids:
+            self._touched.pop(thread_id, None)
+
+    def sweep(self) -> int:
+        """Xóa các thread không hoạt động quá TTL, trả về số thread bị xóa"""
+        if self.ttl <= 0:
+            return 0
+        cutoff = time.time() - self.ttl
+        with self._write_lock:
+            with self._transaction() as conn:
+                thread_ids = [row[0] for row in conn.execute(
+                    "SELECT thread_id FROM threads WHERE updated_at < ?", (cutoff,)
+                ).fetchall()]
+                if thread_ids:
+                    self._delete_threads(conn, thread_ids)
+        if thread_ids:
+            CHECKPOINT_EVICTED.inc(len(thread_ids), reason="ttl")
+            dlog.dlog_i(f"Checkpoint sweep: removed {len(thread_ids)} idle threads")
+        return len(thread_ids)
+
+    def _maybe_sweep(self):
+        if time.monotonic() - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = time.monotonic()
+        try:
+            self.sweep()
+        except sqlite3.Error as e:
+            dlog.dlog_e(f"Checkpoint sweep error: {e}")
+
+    # ----- Thread nền: flush định kỳ + dọn TTL -----
+
+    def _maintain(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                dlog.dlog_e(f"Checkpoint flush error: {e}")
+            self._maybe_sweep()
+
+    def start_maintenance(self):
+        if self._maintainer is None and self.flush_interval > 0:
+            self._maintainer = threading.Thread(target=self._maintain, name="checkpoint-maintainer", daemon=True)
+            self._maintainer.start()
+
+    def stats(self) -> dict:
+        conn = self._connection()
+        return {
+            "threads": conn.execute("SELECT COUNT(*) FROM threads").fetchone()[0],
+            "checkpoints": conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0],
+            "writes": conn.execute("SELECT COUNT(*) FROM writes").fetchone()[0],
+            "pending_writes": len(self._pending_writes),
+            "db_bytes": sum(os.path.getsize(p) for p in (self.path, self.path + "-wal") if os.path.exists(p)),
+        }
+
+    # ----- Async: chạy bản sync ở thread pool để không chặn event loop (BEGIN IMMEDIATE có thể chờ lock) -----
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[dict] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None
+                    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[tuple], task_id: str,
+                          task_path: str = "") -> None:
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: Any = None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, rollback khi lỗi"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer():
+    """Checkpointer dùng chung trong process theo CHECKPOINT_BACKEND (lỗi mở SQLite thì dùng MemorySaver)"""
+    global _checkpointer
+    with _checkpointer_lock:
+        if _checkpointer is not None:
+            return _checkpointer
+        if CHECKPOINT_BACKEND == "sqlite":
+            try:
+                saver = SQLiteCheckpointer()
+                saver.start_maintenance()
+                atexit.register(saver.flush)
+                registry.register_collector(
+                    "tourism_checkpoint_store",
+                    "Trạng thái kho checkpoint",
+                    lambda: [({"stat": key}, value) for key, value in saver.stats().items()]
+                )
+                dlog.dlog_i(f"Checkpointer: SQLite {saver.path}")
+                _checkpointer = saver
+                return saver
+            except (sqlite3.Error, OSError) as e:
+                dlog.dlog_e(f"Open checkpoint DB {CHECKPOINT_DB_PATH} error: {e}, fallback to MemorySaver")
+        _checkpointer = MemorySaver()
+        return _checkpointer
@@ -0,0 +1,254 @@
+# app/coreAI/fast_router.py
+import re
+import threading
+import unicodedata
+
+from langchain_core.messages import AIMessage
+
+import dconfig
+import dlog
+from common_utils.aho_corasick import AhoCorasick
+from common_utils.text_utils import normalize_text
+from common_utils.tourism_constants import (
+    ATTRACTION_TYPES,
+    ACTIVITY_TYPES,
+    EMERGENCY_CONTACTS,
+    SERVICE_TYPES
+)
+from coreAI.answer_cache import answer_cache, is_context_free, ANSWER_CACHE_ENABLED
+from dconfig import config_agents
+
+FAST_ROUTER_ENABLED = str(getattr(dconfig.config_object, "FAST_ROUTER_ENABLED", "true")).lower() == "true"
+
+# Ngưỡng confidence để route thẳng, các intent khác luôn qua SUPERVISOR
+INTENT_THRESHOLDS = {
+    config_agents.AGENT_HELLO: 0.9,
+    config_agents.AGENT_WEATHER_EMERGENCY: 0.75,
+    config_agents.AGENT_FAQ: 0.8,
+}
+
+# Từ chào hỏi (phải chiếm gần hết câu mới được coi là HELLO)
+GREETING_LEXICON = [
+    "xin chào", "chào", "chào bạn", "chào shop", "chào ad", "alo", "a lô", "hello", "hi", "hey",
+    "good morning", "chào buổi sáng", "chào buổi tối"
+]
+# Từ đệm đi kèm lời chào (đã bỏ dấu)
+GREETING_FILLERS = {"a", "oi", "ban", "em", "anh", "chi", "shop", "ad", "nhe", "nha"}
+
+EMERGENCY_LEXICON = [
+    "cấp cứu", "khẩn cấp", "cứu hộ", "cứu thương", "công an", "cảnh sát", "cứu hỏa", "tai nạn",
+    "số điện thoại khẩn cấp", "bệnh viện gần nhất", "emergency", "ambulance", "police"
+]
+# Số khẩn cấp chỉ chắc chắn khi đi kèm ngữ cảnh gọi điện ("gọi 115", "số 113"),
+# đứng một mình thì dễ là giá/số lượng ("Giá phòng 115 nghìn")
+EMERGENCY_NUMBER_PREFIXES = ["gọi", "gọi số", "số", "đường dây nóng", "hotline", "call", "dial"]
+WEATHER_LEXICON = [
+    "thời tiết", "dự báo", "nhiệt độ", "mưa bão", "bão", "lũ", "sạt lở", "weather", "forecast"
+]
+FAQ_LEXICON = [
+    "visa", "thị thực", "hộ chiếu", "passport", "đổi tiền", "tỷ giá", "sim điện thoại", "sim 4g",
+    "hành lý", "tiền tip", "ổ cắm điện", "điện áp", "phí hoàn hủy", "chính sách hoàn tiền"
+]
+ITINERARY_LEXICON = ["lịch trình", "kế hoạch", "plan", "itinerary"]
+BOOKING_LEXICON = ["đặt", "book", "booking", "đặt phòng", "đặt vé", "đặt tour"]
+
+# Bản bỏ dấu trùng với cụm thông dụng khác: "mưa bão" -> "mua bao" (mua bao nhiêu)
+AMBIGUOUS_FOLDED = {"mua bao"}
+
+_WORD_RE = re.compile(r"\w+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _lower_text(text: str) -> str:
+    """Chữ thường, giữ dấu, gộp khoảng trắng"""
+    if not text:
+        return ""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", text).lower()).strip()
+
+
+def _keep_folded(pattern: str) -> bool:
+    """
+    Pattern có được so khớp ở dạng bỏ dấu không
+
+    Từ đơn có dấu bị bỏ vì bỏ dấu xong trùng từ khác: "bão"/"bao", "lũ"/"lu", "chào"/"cháo", "đặt"/"đất".
+    """
+    folded = normalize_text(pattern)
+    if folded == _lower_text(pattern):
+        return True
+    return " " in folded and folded not in AMBIGUOUS_FOLDED
+
+
+def _build_lexicon():
+    """(pattern, intent, weight) từ lexicon và các bảng trong tourism_constants"""
+    entries = []
+    entries += [(word, config_agents.AGENT_HELLO, 1.0) for word in GREETING_LEXICON]
+    entries += [(word, config_agents.AGENT_WEATHER_EMERGENCY, 0.9) for word in EMERGENCY_LEXICON]
+    entries += [(word, config_agents.AGENT_WEATHER_EMERGENCY, 0.8) for word in WEATHER_LEXICON]
+    # Tên/số đứng riêng chỉ là tín hiệu yếu (dưới ngưỡng), các tên khẩn cấp thật đã có trong EMERGENCY_LEXICON
+    for contact in EMERGENCY_CONTACTS.values():
+        entries.append((contact["name"], config_agents.AGENT_WEATHER_EMERGENCY, 0.6))
+        entries.append((contact["number"], config_agents.AGENT_WEATHER_EMERGENCY, 0.3))
+        entries += [(f"{prefix} {contact['number']}", config_agents.AGENT_WEATHER_EMERGENCY, 0.9)
+                    for prefix in EMERGENCY_NUMBER_PREFIXES]
+    entries += [(word, config_agents.AGENT_FAQ, 0.85) for word in FAQ_LEXICON]
+
+    # Tín hiệu của các intent cần LLM, dùng để giảm confidence khi câu bị lẫn
+    for names in ATTRACTION_TYPES.values():
+        entries += [(name, config_agents.AGENT_DESTINATION_INFO, 0.5) for name in names]
+    for names in ACTIVITY_TYPES.values():
+        entries += [(name, config_agents.AGENT_DESTINATION_INFO, 0.4) for name in names]
+    entries += [(word, config_agents.AGENT_ITINERARY_PLANNING, 0.8) for word in ITINERARY_LEXICON]
+    entries += [(word, config_agents.AGENT_BOOKING_SERVICE, 0.6) for word in BOOKING_LEXICON]
+    entries += [(name, config_agents.AGENT_BOOKING_SERVICE, 0.5) for name in SERVICE_TYPES.values()]
+    return entries
+
+
+class FastRouter:
+    """
+    Router theo luật đặt trước SUPERVISOR
+
+    Các câu rõ ràng (chào hỏi, khẩn cấp, FAQ) được route thẳng, không tốn một lượt LLM.
+    Câu mơ hồ trả về None để SUPERVISOR xử lý.
+    """
+
+    def __init__(self, thresholds=None):
+        self.thresholds = dict(INTENT_THRESHOLDS if thresholds is None else thresholds)
+        # Câu có dấu khớp với pattern có dấu; câu gõ không dấu khớp với pattern bỏ dấu không bị nhập nhằng
+        lexicon = _build_lexicon()
+        self._matcher = self._build_matcher((_lower_text(p), intent, w) for p, intent, w in lexicon)
+        self._folded_matcher = self._build_matcher(
+            (normalize_text(p), intent, w) for p, intent, w in lexicon if _keep_folded(p)
+        )
+
+        self._lock = threading.Lock()
+        self._total = 0
+        self._fallbacks = 0
+        self._hits = {intent: 0 for intent in self.thresholds}
+
+    @staticmethod
+    def _build_matcher(entries):
+        # Bỏ trùng pattern, giữ weight lớn nhất
+        patterns = {}
+        for pattern, intent, weight in entries:
+            if pattern:
+                patterns[(pattern, intent)] = max(weight, patterns.get((pattern, intent), 0.0))
+
+        matcher = AhoCorasick()
+        for (pattern, intent), weight in patterns.items():
+            matcher.add(pattern, (intent, weight))
+        return matcher.build()
+
+    @staticmethod
+    def _is_word_match(text, start, end):
+        before_ok = start == 0 or not text[start - 1].isalnum()
+        after_ok = end == len(text) or not text[end].isalnum()
+        return before_ok and after_ok
+
+    def score(self, message: str) -> dict:
+        """Confidence theo từng intent (0..1)"""
+        text = _lower_text(message)
+        if not text:
+            return {}
+        folded = normalize_text(text)
+        matcher = self._folded_matcher if folded == text else self._matcher
+
+        intent_scores = {}
+        greeting_spans = []
+        for start, end, (intent, weight) in matcher.find(text):
+            if not self._is_word_match(text, start, end):
+                continue
+            # Gộp các tín hiệu độc lập: 1 - Π(1 - w)
+            intent_scores[intent] = 1 - (1 - intent_scores.get(intent, 0.0)) * (1 - weight)
+            if intent == config_agents.AGENT_HELLO:
+                greeting_spans.append((start, end))
+
+        # HELLO chỉ chắc chắn khi lời chào (và từ đệm) phủ gần hết câu
+        if config_agents.AGENT_HELLO in intent_scores:
+            words = list(_WORD_RE.finditer(text))
+            covered = sum(
+                1 for w in words
+                if normalize_text(w.group()) in GREETING_FILLERS
+                or any(s <= w.start() and w.end() <= e for s, e in greeting_spans)
+            )
+            intent_scores[config_agents.AGENT_HELLO] *= covered / len(words) if words else 0.0
+
+        confidences = {}
+        for intent, value in intent_scores.items():
+            others = 1.0
+            for other, other_value in intent_scores.items():
+                if other != intent:
+                    others *= 1 - other_value
+            confidences[intent] = value * others
+        return confidences
+
+    def route(self, message: str):
+        """
+        Route câu hỏi nếu đủ chắc chắn
+
+        Returns:
+            (agent, confidence) hoặc (None, confidence) nếu cần SUPERVISOR
+        """
+        confidences = self.score(message)
+        agent, confidence = None, 0.0
+        if confidences:
+            best = max(confidences, key=confidences.get)
+            confidence = confidences[best]
+            if best in self.thresholds and confidence >= self.thresholds[best]:
+                agent = best
+
+        with self._lock:
+            self._total += 1
+            if agent is None:
+                self._fallbacks += 1
+            else:
+                self._hits[agent] += 1
+        return agent, confidence
+
+    def stats(self):
+        """Tỉ lệ route thẳng theo intent"""
+        with self._lock:
+            total = self._total
+            return {
+                "total": total,
+                "fallbacks": self._fallbacks,
+                "hits": dict(self._hits),
+                "hit_rate": (total - self._fallbacks) / total if total else 0.0,
+            }
+
+
+fast_router = FastRouter()
+
+
+def fast_router_node(state):
+    """Node ROUTER: trả lời từ answer cache hoặc route thẳng câu rõ ràng, còn lại chuyển SUPERVISOR"""
+    cacheable = ANSWER_CACHE_ENABLED and is_context_free(state)
+    if cacheable:
+        cached = answer_cache.lookup(
+            state.get("human_message") or "",
+            customer_location=state.get("customer_location"),
+            customer_language=state.get("customer_language")
+        )
+        if cached is not None:
+            agent, entry = cached
+            return {
+                "messages": [AIMessage(content=entry.ai_message)],
+                "ai_message": entry.ai_message,
+                "destination_details": entry.destination_details,
+                "current_agent": agent,
+                "next_agent": "END",
+                "answer_cached": True,
+                "answer_cacheable": True
+            }
+
+    agent = None
+    if FAST_ROUTER_ENABLED:
+        agent, confidence = fast_router.route(state.get("human_message") or "")
+        if agent is not None:
+            dlog.dlog_i(f"--- ROUTER: {agent} (confidence={confidence:.2f}) ---")
+    return {"next_agent": agent or config_agents.AGENT_SUPERVISOR, "answer_cached": False,
+            "answer_cacheable": cacheable}
+
+
+def choose_after_router(state):
+    """Điều kiện rẽ nhánh sau node ROUTER"""
+    return state["next_agent"]
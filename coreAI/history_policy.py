@@ -0,0 +1,131 @@
+# app/coreAI/history_policy.py
+import json
+
+from langchain_core.messages import SystemMessage
+
+import dconfig
+
+_config = dconfig.config_object
+
+HISTORY_MAX_TURNS = int(getattr(_config, "HISTORY_MAX_TURNS", 6))
+HISTORY_SUMMARY_MAX_CHARS = int(getattr(_config, "HISTORY_SUMMARY_MAX_CHARS", 1500))
+HISTORY_SUMMARY_LINE_CHARS = 200
+
+# Các slot trong state luôn được gửi kèm cho LLM
+PINNED_SLOTS = ("destination_details", "itinerary_info", "booking_info")
+
+
+def _role(message) -> str:
+    if isinstance(message, dict):
+        return message.get("role") or message.get("type") or ""
+    if isinstance(message, (tuple, list)) and message:
+        return str(message[0])
+    return getattr(message, "type", "")
+
+
+def _content(message) -> str:
+    if isinstance(message, dict):
+        content = message.get("content", "")
+    elif isinstance(message, (tuple, list)) and len(message) > 1:
+        content = message[1]
+    else:
+        content = getattr(message, "content", "")
+    return content if isinstance(content, str) else str(content)
+
+
+def _is_human(message) -> bool:
+    return _role(message) in ("human", "user")
+
+
+def extractive_summarizer(previous_summary: str, messages: list) -> str:
+    """
+    Tóm tắt tăng dần không dùng LLM: nối các câu cũ (cắt ngắn) vào summary trước đó,
+    chỉ giữ phần mới nhất trong giới hạn HISTORY_SUMMARY_MAX_CHARS
+    """
+    lines = [previous_summary] if previous_summary else []
+    for message in messages:
+        content = " ".join(_content(message).split())
+        if not content:
+            continue
+        speaker = "Khách" if _is_human(message) else "Trợ lý"
+        lines.append(f"- {speaker}: {content[:HISTORY_SUMMARY_LINE_CHARS]}")
+    summary = "\n".join(lines)
+    if len(summary) > HISTORY_SUMMARY_MAX_CHARS:
+        summary = summary[-HISTORY_SUMMARY_MAX_CHARS:]
+        summary = summary[summary.find("\n") + 1:] if "\n" in summary else summary
+    return summary
+
+
+class HistoryPolicy:
+    """
+    Giới hạn lịch sử gửi cho LLM: N lượt gần nhất + summary cuộn + các slot ghim
+
+    Args:
+        max_turns: Số lượt hội thoại (tính theo tin nhắn của khách) giữ nguyên văn
+        pinned_slots: Các key trong state luôn gửi kèm
+        summarizer: Hàm (summary_cũ, messages_bị_loại) -> summary_mới
+    """
+
+    def __init__(self, max_turns=HISTORY_MAX_TURNS, pinned_slots=PINNED_SLOTS, summarizer=extractive_summarizer):
+        self.max_turns = max_turns
+        self.pinned_slots = pinned_slots
+        self.summarizer = summarizer
+
+    def window_start(self, messages: list) -> int:
+        """Vị trí bắt đầu của N lượt gần nhất"""
+        turns = 0
+        for i in range(len(messages) - 1, -1, -1):
+            if _is_human(messages[i]):
+                turns += 1
+                if turns == self.max_turns:
+                    return i
+        return 0
+
+    def has_context(self, state) -> bool:
+        """Lượt hiện tại có thể phụ thuộc ngữ cảnh trước đó (đã có câu trả lời, summary hoặc slot ghim)"""
+        if state.get("history_summary") or any(state.get(slot) for slot in self.pinned_slots):
+            return True
+        return any(_role(message) in ("ai", "assistant") for message in state.get("messages") or [])
+
+    def _pinned_context(self, state) -> str:
+        pinned = {slot: state.get(slot) for slot in self.pinned_slots if state.get(slot)}
+        if not pinned:
+            return ""
+        return json.dumps(pinned, ensure_ascii=False, separators=(",", ":"), default=str)
+
+    def apply(self, state) -> list:
+        """
+        Tạo danh sách messages gửi cho LLM, cập nhật summary trong state
+
+        Returns:
+            [SystemMessage(summary + slot ghim)] + N lượt gần nhất
+        """
+        messages = state.get("messages") or []
+        start = self.window_start(messages)
+
+        summary = state.get("history_summary") or ""
+        summarized = state.get("history_summarized_count") or 0
+        if summarized > len(messages):
+            # Lịch sử bị thay mới (thread reset), tóm tắt lại từ đầu
+            summary, summarized = "", 0
+        if start > summarized:
+            summary = self.summarizer(summary, messages[summarized:start])
+            summarized = start
+
+        state["history_summary"] = summary
+        state["history_summarized_count"] = summarized
+
+        context_parts = []
+        if summary:
+            context_parts.append(f"# TÓM TẮT HỘI THOẠI TRƯỚC\n{summary}")
+        pinned = self._pinned_context(state)
+        if pinned:
+            context_parts.append(f"# THÔNG TIN ĐÃ XÁC ĐỊNH\n{pinned}")
+
+        window = list(messages[start:])
+        if context_parts:
+            return [SystemMessage(content="\n\n".join(context_parts))] + window
+        return window
+
+
+history_policy = HistoryPolicy()
@@ -0,0 +1,278 @@
+# app/coreAI/itinerary_engine.py
+import re
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from coreAI.retrieval.geo_index import haversine_km
+from coreAI.retrieval.search_filters import normalize_attraction_type
+
+# Khung giờ tham quan trong ngày (phút tính từ 0h)
+DAY_START = 8 * 60
+DAY_END = 18 * 60
+MAX_STOPS_PER_DAY = 5
+CITY_SPEED_KMH = 25.0
+
+# Thời gian tham quan ước tính theo loại điểm (phút)
+VISIT_MINUTES = {
+    "beach": 180,
+    "mountain": 180,
+    "nature": 150,
+    "entertainment": 180,
+    "cave": 120,
+    "waterfall": 90,
+    "museum": 90,
+    "historical": 75,
+    "temple": 60,
+    "market": 60,
+    "architecture": 45,
+}
+DEFAULT_VISIT_MINUTES = 90
+
+_TIME_RE = re.compile(r"(\d{1,2})\s*[:hg]\s*(\d{2})?")
+_ALL_DAY_WORDS = ("24/7", "24h", "ca ngay", "all day")
+
+
+def distance_matrix(lats_deg, lons_deg) -> np.ndarray:
+    """Ma trận khoảng cách haversine N×N (km), tính vector hóa"""
+    lats = np.radians(np.asarray(lats_deg, dtype=np.float64))
+    lons = np.radians(np.asarray(lons_deg, dtype=np.float64))
+    return haversine_km(lats[:, None], lons[:, None], lats[None, :], lons[None, :])
+
+
+def parse_opening_hours(opening_hours) -> tuple:
+    """
+    Giờ mở/đóng cửa (phút trong ngày)
+
+    '07:00 - 17:30' -> (420, 1050), '24/7' -> (0, 1440), không rõ -> (DAY_START, DAY_END)
+    """
+    if not opening_hours:
+        return DAY_START, DAY_END
+    text = str(opening_hours).lower()
+    if any(word in text for word in _ALL_DAY_WORDS):
+        return 0, 24 * 60
+    times = [int(h) * 60 + int(m or 0) for h, m in _TIME_RE.findall(text) if int(h) <= 24]
+    if len(times) < 2 or times[1] <= times[0]:
+        return DAY_START, DAY_END
+    return times[0], times[1]
+
+
+def visit_minutes(attraction_type) -> int:
+    return VISIT_MINUTES.get(normalize_attraction_type(attraction_type) or attraction_type, DEFAULT_VISIT_MINUTES)
+
+
+def travel_minutes(distance_km: float) -> float:
+    return distance_km / CITY_SPEED_KMH * 60
+
+
+def nearest_neighbour_tour(D: np.ndarray, start: int = 0) -> list:
+    """Đường đi tham lam: luôn tới điểm chưa thăm gần nhất"""
+    n = len(D)
+    visited = np.zeros(n, dtype=bool)
+    tour = [start]
+    visited[start] = True
+    for _ in range(n - 1):
+        distances = np.where(visited, np.inf, D[tour[-1]])
+        nxt = int(np.argmin(distances))
+        tour.append(nxt)
+        visited[nxt] = True
+    return tour
+
+
+def two_opt(D: np.ndarray, tour: list, max_passes: int = 50) -> list:
+    """
+    Cải thiện đường đi mở (không quay về điểm đầu) bằng 2-opt
+
+    Với mỗi cạnh (a, b), tính vector hóa độ lợi khi đảo đoạn b..c cho mọi c phía sau.
+    """
+    tour = np.array(tour, dtype=np.int64)
+    n = len(tour)
+    if n < 3:
+        return tour.tolist()
+
+    for _ in range(max_passes):
+        improved = False
+        for i in range(n - 2):
+            a, b = tour[i], tour[i + 1]
+            cs = tour[i + 2:]
+            ds = np.append(tour[i + 3:], -1)
+            # Cạnh cuối không có điểm d phía sau
+            d_cost = np.where(ds >= 0, D[b, np.maximum(ds, 0)] - D[cs, np.maximum(ds, 0)], 0.0)
+            gains = D[a, b] - D[a, cs] - d_cost
+            best = int(np.argmax(gains))
+            if gains[best] > 1e-9:
+                j = i + 2 + best
+                tour[i + 1:j + 1] = tour[i + 1:j + 1][::-1]
+                improved = True
+        if not improved:
+            break
+    return tour.tolist()
+
+
+def order_stops(D: np.ndarray, start: int = 0) -> list:
+    """Thứ tự tham quan: nearest neighbour rồi 2-opt"""
+    return two_opt(D, nearest_neighbour_tour(D, start))
+
+
+def _farthest_point_seeds(D: np.ndarray, k: int, first: int) -> list:
+    seeds = [first]
+    min_distance = D[first].copy()
+    for _ in range(k - 1):
+        nxt = int(np.argmax(min_distance))
+        seeds.append(nxt)
+        min_distance = np.minimum(min_distance, D[nxt])
+    return seeds
+
+
+def cluster_days(D: np.ndarray, n_days: int, durations, capacity_minutes: float, iterations: int = 5) -> list:
+    """
+    Chia điểm thành n_days cụm gần nhau, mỗi cụm không vượt quá capacity_minutes thời gian tham quan
+
+    k-medoids có ràng buộc sức chứa: khởi tạo farthest-point, gán tham lam theo khoảng cách tới medoid.
+
+    Returns:
+        List n_days list chỉ số điểm (điểm không xếp được bị bỏ ra)
+    """
+    n = len(D)
+    if n == 0:
+        return [[] for _ in range(n_days)]
+    k = min(n_days, n)
+    durations = np.asarray(durations, dtype=np.float64)
+    medoids = _farthest_point_seeds(D, k, int(np.argmin(D.sum(axis=1))))
+
+    clusters = []
+    for _ in range(iterations):
+        to_medoid = D[:, medoids]
+        # Điểm có lựa chọn rõ ràng nhất (chênh lệch giữa medoid gần nhất và nhì) được gán trước
+        sorted_distances = np.sort(to_medoid, axis=1)
+        regret = sorted_distances[:, 1] - sorted_distances[:, 0] if k > 1 else np.zeros(n)
+        clusters = [[] for _ in range(k)]
+        load = np.zeros(k)
+        for point in np.argsort(-regret, kind="stable"):
+            for cluster in np.argsort(to_medoid[point], kind="stable"):
+                if len(clusters[cluster]) < MAX_STOPS_PER_DAY and load[cluster] + durations[point] <= capacity_minutes:
+                    clusters[cluster].append(int(point))
+                    load[cluster] += durations[point]
+                    break
+
+        new_medoids = []
+        for cluster, members in zip(range(k), clusters):
+            if not members:
+                new_medoids.append(medoids[cluster])
+                continue
+            sub = D[np.ix_(members, members)]
+            new_medoids.append(members[int(np.argmin(sub.sum(axis=1)))])
+        if new_medoids == medoids:
+            break
+        medoids = new_medoids
+
+    return clusters + [[] for _ in range(n_days - k)]
+
+
+def schedule_day(D: np.ndarray, order: list, windows: list, durations: list) -> tuple:
+    """
+    Xếp giờ cho một ngày theo thứ tự đã tối ưu, tôn trọng giờ mở cửa
+
+    Returns:
+        (stops, skipped): stops là list (point, arrive, leave, travel_km); skipped là các điểm không kịp giờ
+    """
+    stops, skipped = [], []
+    clock = DAY_START
+    previous = None
+    for point in order:
+        travel_km = float(D[previous, point]) if previous is not None else 0.0
+        arrive = clock + travel_minutes(travel_km)
+        open_at, close_at = windows[point]
+        start = max(arrive, open_at)
+        leave = start + durations[point]
+        if leave > min(close_at, DAY_END + 60):
+            skipped.append(point)
+            continue
+        stops.append((point, start, leave, travel_km))
+        clock = leave
+        previous = point
+    return stops, skipped
+
+
+def _format_minutes(minutes: float) -> str:
+    minutes = int(round(minutes))
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _rank_candidates(candidates: list, preferences, limit: int) -> list:
+    """Ưu tiên điểm hợp sở thích rồi tới rating, giữ tối đa limit điểm có tọa độ"""
+    preferred = {normalize_attraction_type(p) for p in preferences or []} - {None}
+
+    def _score(dest):
+        matched = normalize_attraction_type(dest.get("attraction_type")) in preferred
+        return (matched, float(dest.get("rating") or 0))
+
+    located = [d for d in candidates if d.get("latitude") is not None and d.get("longitude") is not None]
+    return sorted(located, key=_score, reverse=True)[:limit]
+
+
+def build_itinerary(destination: str, duration: int, start_date: str, candidates: list, preferences=None) -> dict:
+    """
+    Lịch trình theo ngày từ danh sách điểm đến ứng viên
+
+    Args:
+        destination: Tỉnh/thành phố
+        duration: Số ngày (ItineraryRequest.duration)
+        start_date: Ngày bắt đầu YYYY-MM-DD
+        candidates: Bản ghi điểm đến (latitude, longitude, opening_hours, attraction_type, rating, ...)
+        preferences: Sở thích của khách, dùng để ưu tiên ứng viên
+
+    Returns:
+        {"destination", "duration", "days": [{"day", "date", "total_km", "stops": [...]}], "unscheduled": [...]}
+    """
+    selected = _rank_candidates(candidates, preferences, duration * MAX_STOPS_PER_DAY)
+    plan = {"destination": destination, "duration": duration, "days": [], "unscheduled": []}
+    try:
+        first_day = datetime.strptime(start_date, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        first_day = None
+
+    if not selected:
+        return plan
+
+    D = distance_matrix([float(d["latitude"]) for d in selected], [float(d["longitude"]) for d in selected])
+    windows = [parse_opening_hours(d.get("opening_hours")) for d in selected]
+    durations = [visit_minutes(d.get("attraction_type")) for d in selected]
+
+    clusters = cluster_days(D, duration, durations, capacity_minutes=DAY_END - DAY_START)
+    assigned = {point for cluster in clusters for point in cluster}
+    unscheduled = [point for point in range(len(selected)) if point not in assigned]
+
+    for day, members in enumerate(clusters, start=1):
+        stops = []
+        total_km = 0.0
+        if members:
+            sub = D[np.ix_(members, members)]
+            # Bắt đầu từ điểm đóng cửa sớm nhất
+            start = int(np.argmin([windows[m][1] for m in members]))
+            order = [members[i] for i in order_stops(sub, start)]
+            scheduled, skipped = schedule_day(D, order, windows, durations)
+            unscheduled += skipped
+            for point, arrive, leave, travel_km in scheduled:
+                dest = selected[point]
+                total_km += travel_km
+                stops.append({
+                    "id": dest.get("id"),
+                    "name": dest.get("name"),
+                    "type": dest.get("attraction_type"),
+                    "arrive": _format_minutes(arrive),
+                    "leave": _format_minutes(leave),
+                    "travel_km": round(travel_km, 1),
+                })
+        plan["days"].append({
+            "day": day,
+            "date": (first_day + timedelta(days=day - 1)).strftime("%Y-%m-%d") if first_day else None,
+            "total_km": round(total_km, 1),
+            "stops": stops,
+        })
+
+    plan["unscheduled"] = [
+        {"id": selected[point].get("id"), "name": selected[point].get("name")} for point in unscheduled
+    ]
+    return plan
+
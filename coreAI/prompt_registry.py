@@ -0,0 +1,167 @@
+# app/coreAI/prompt_registry.py
+import os
+import string
+import threading
+import time
+
+import yaml
+
+import dconfig
+import dlog
+
+_config = dconfig.config_object
+
+PROMPTS_FILE = getattr(
+    _config, "PROMPTS_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "configs", "prompts.yaml")
+)
+PROMPT_RELOAD_INTERVAL = float(getattr(_config, "PROMPT_RELOAD_INTERVAL", 5.0))
+
+_formatter = string.Formatter()
+
+
+def _compile(text: str) -> list:
+    """Tách template thành các đoạn (literal, tên biến) một lần"""
+    return [(literal, field) for literal, field, _, _ in _formatter.parse(text)]
+
+
+class CompiledPrompt:
+    """
+    Prompt đã parse sẵn
+
+    Phần trước dòng đầu tiên có biến là static_prefix: render một lần, giống hệt nhau từng byte giữa các lượt
+    để provider cache được prompt. Vì vậy các biến theo lượt ({current_time}, {customer_location}, ...)
+    nên đặt ở cuối prompt.
+    """
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self.text = text
+
+        lines = text.split("\n")
+        split_at = next((i for i, line in enumerate(lines) if any(field for _, field in _compile(line))), len(lines))
+        static_text = "\n".join(lines[:split_at]) + ("\n" if split_at < len(lines) else "")
+
+        self.static_prefix = "".join(literal for literal, _ in _compile(static_text))
+        self._suffix_chunks = _compile("\n".join(lines[split_at:]))
+        self.variables = frozenset(field for _, field in self._suffix_chunks if field)
+
+    def render(self, **values) -> str:
+        """Prompt đầy đủ; biến không truyền vào được giữ nguyên dạng {tên}"""
+        return self.static_prefix + "".join(
+            literal + ("" if field is None else str(values.get(field, "{" + field + "}")))
+            for literal, field in self._suffix_chunks
+        )
+
+
+class PromptRegistry:
+    """
+    Đọc prompts.yaml một lần, giữ các prompt đã compile trong RAM
+
+    Theo dõi mtime của file, khi thay đổi thì nạp lại và thay nguyên khối (lượt đang chạy vẫn dùng bản cũ).
+    """
+
+    def __init__(self, path: str = PROMPTS_FILE, reload_interval: float = PROMPT_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._prompts = {}
+        self._mtime = None
+        self.version = 0
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._missing = set()
+
+    def load(self) -> bool:
+        """Nạp lại nếu file đã thay đổi; lỗi parse thì giữ bản đang dùng"""
+        with self._lock:
+            try:
+                mtime = self._file_version()
+                if mtime == self._mtime:
+                    return False
+                with open(self.path, "r", encoding="utf-8") as f:
+                    raw = yaml.safe_load(f) or {}
+                if self._file_version() != mtime:
+                    # File đang được ghi dở, lần kiểm tra sau sẽ nạp lại
+                    return False
+                prompts = {name: CompiledPrompt(name, text) for name, text in raw.items() if isinstance(text, str)}
+            except Exception as e:
+                dlog.dlog_e(f"Load prompts {self.path} error: {e}")
+                return False
+
+            self._prompts = prompts
+            self._missing = set()
+            self._mtime = mtime
+            self.version += 1
+            listeners = list(self._listeners)
+
+        dlog.dlog_i(f"Loaded {len(prompts)} prompts (version {self.version})")
+        for listener in listeners:
+            try:
+                listener(self.version)
+            except Exception as e:
+                dlog.dlog_e(f"Prompt reload listener error: {e}")
+        return True
+
+    def _file_version(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _ensure_loaded(self):
+        if self._mtime is None:
+            self.load()
+            self.start_watching()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.reload_interval)
+            self.load()
+
+    def start_watching(self):
+        with self._lock:
+            if self._watcher is None and self.reload_interval > 0:
+                self._watcher = threading.Thread(target=self._watch, name="prompt-watcher", daemon=True)
+                self._watcher.start()
+
+    def on_reload(self, listener):
+        """Đăng ký callback(version) khi prompts được nạp lại"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    @staticmethod
+    def resolve_name(prompt_ref: str) -> str:
+        """Tên prompt từ tên hoặc đường dẫn dạng 'configs/prompts.yaml#DESTINATION_INFO_PROMPT'"""
+        return prompt_ref.rsplit("#", 1)[-1] if prompt_ref else prompt_ref
+
+    def get(self, prompt_ref: str):
+        """Prompt đã compile; None (kèm log lỗi một lần) nếu không tìm thấy tên prompt"""
+        self._ensure_loaded()
+        name = self.resolve_name(prompt_ref)
+        prompt = self._prompts.get(name)
+        if prompt is None and prompt_ref not in self._missing:
+            self._missing.add(prompt_ref)
+            dlog.dlog_e(
+                f"Prompt {prompt_ref!r} (tên {name!r}) không có trong {self.path}: "
+                f"cần là tên prompt hoặc dạng '<file>#<TÊN_PROMPT>'"
+            )
+        return prompt
+
+    def render(self, prompt_ref: str, **values) -> str:
+        prompt = self.get(prompt_ref)
+        if prompt is None:
+            raise KeyError(f"Prompt {prompt_ref} không tồn tại trong {self.path}")
+        return prompt.render(**values)
+
+    def static_prefix(self, prompt_ref: str) -> str:
+        """Phần đầu cố định của prompt (xem CompiledPrompt), dùng làm key prompt cache phía provider"""
+        prompt = self.get(prompt_ref)
+        if prompt is None:
+            raise KeyError(f"Prompt {prompt_ref} không tồn tại trong {self.path}")
+        return prompt.static_prefix
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._prompts)
+
+
+prompt_registry = PromptRegistry()
@@ -0,0 +1 @@
+# app/coreAI/retrieval/__init__.py
@@ -0,0 +1,268 @@
+# app/coreAI/retrieval/embedding_cache.py
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import dconfig
+import dlog
+from common_utils.metrics import trace_span, EMBEDDING_LATENCY
+from common_utils.single_flight import SingleFlight
+from common_utils.text_utils import normalize_text
+
+_config = dconfig.config_object
+
+EMBEDDING_CACHE_SIZE = int(getattr(_config, "EMBEDDING_CACHE_SIZE", 4096))
+EMBEDDING_CACHE_TTL = float(getattr(_config, "EMBEDDING_CACHE_TTL", 24 * 3600))
+EMBEDDING_CACHE_DISK_DIR = getattr(_config, "EMBEDDING_CACHE_DISK_DIR", None)
+EMBEDDING_CACHE_DISK_CAPACITY = int(getattr(_config, "EMBEDDING_CACHE_DISK_CAPACITY", 100000))
+
+
+class DiskEmbeddingStore:
+    """
+    Lưu embedding trên đĩa: mảng float32 memory-mapped + log key -> dòng (append-only)
+
+    Mỗi put chỉ ghi một dòng vector và nối một dòng vào log, không ghi lại toàn bộ index.
+    Dữ liệu giữ nguyên sau khi restart process.
+    """
+
+    VECTORS_FILE = "vectors.f32"
+    INDEX_FILE = "index.json"
+    KEYS_FILE = "keys.log"
+
+    def __init__(self, directory: str, capacity: int):
+        self.directory = directory
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._index = {}
+        self._dim = None
+        self._vectors = None
+        self._log = None
+
+        os.makedirs(directory, exist_ok=True)
+        index_path = os.path.join(directory, self.INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("capacity") == capacity:
+                self._dim = meta["dim"]
+                # index.json kiểu cũ còn chứa toàn bộ key
+                self._index = dict(meta.get("keys", {}))
+                self._load_keys()
+                self._open(mode="r+")
+        atexit.register(self.flush)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _load_keys(self):
+        if not os.path.exists(self._path(self.KEYS_FILE)):
+            return
+        with open(self._path(self.KEYS_FILE), "r", encoding="utf-8") as f:
+            for line in f:
+                # Dòng cuối có thể bị cắt dở nếu process chết giữa chừng
+                try:
+                    key, row = json.loads(line)
+                except ValueError:
+                    continue
+                if row < self.capacity:
+                    self._index[key] = row
+
+    def _open(self, mode):
+        self._vectors = np.memmap(
+            self._path(self.VECTORS_FILE),
+            dtype=np.float32,
+            mode=mode,
+            shape=(self.capacity, self._dim)
+        )
+        if mode == "w+":
+            # Store mới: ghi meta một lần và bỏ log key cũ (nếu có, của capacity/dim khác)
+            tmp_path = self._path(self.INDEX_FILE) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"dim": self._dim, "capacity": self.capacity}, f)
+            os.replace(tmp_path, self._path(self.INDEX_FILE))
+        self._log = open(self._path(self.KEYS_FILE), "w" if mode == "w+" else "a", encoding="utf-8")
+
+    def get(self, key: str):
+        row = self._index.get(key)
+        if row is None:
+            return None
+        return np.array(self._vectors[row], dtype=np.float32)
+
+    def put(self, key: str, vector):
+        with self._lock:
+            if key in self._index:
+                return
+            if self._vectors is None:
+                self._dim = len(vector)
+                self._open(mode="w+")
+            if len(self._index) >= self.capacity or len(vector) != self._dim:
+                return
+            row = len(self._index)
+            # Ghi vector trước rồi mới ghi key: key trong log luôn trỏ tới dòng đã có dữ liệu
+            self._vectors[row] = np.asarray(vector, dtype=np.float32)
+            self._log.write(json.dumps([key, row], ensure_ascii=False) + "\n")
+            self._log.flush()
+            self._index[key] = row
+
+    def flush(self):
+        """Đẩy vector xuống đĩa (gọi khi shutdown)"""
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+            if self._log is not None:
+                self._log.flush()
+
+    def __len__(self):
+        return len(self._index)
+
+
+class EmbeddingCache:
+    """
+    Cache embedding 2 tầng: LRU trong RAM (giới hạn size + TTL) và DiskEmbeddingStore (tùy chọn)
+
+    Key được chuẩn hóa (bỏ dấu, chữ thường, gộp khoảng trắng).
+    """
+
+    def __init__(self, embed_fn, max_size=EMBEDDING_CACHE_SIZE, ttl=EMBEDDING_CACHE_TTL, disk_store=None):
+        self._embed_fn = embed_fn
+        self.max_size = max_size
+        self.ttl = ttl
+        self.disk_store = disk_store
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight("embedding")
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(text: str) -> str:
+        return normalize_text(text)
+
+    def _get_memory(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            vector, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return vector
+
+    def _put_memory(self, key, vector):
+        with self._lock:
+            self._entries[key] = (vector, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_embedding(self, text: str):
+        """Lấy embedding của text, chỉ gọi embedding service khi cache miss"""
+        key = self.make_key(text)
+
+        vector = self._get_memory(key)
+        if vector is not None:
+            self.hits += 1
+            return vector
+
+        if self.disk_store is not None:
+            stored = self.disk_store.get(key)
+            if stored is not None:
+                self.disk_hits += 1
+                vector = stored.tolist()
+                self._put_memory(key, vector)
+                return vector
+
+        self.misses += 1
+        # Các request cùng text tới đồng thời chỉ gọi embedding service một lần
+        return self._flight.do(key, self._embed, key, text)
+
+    def _embed(self, key: str, text: str):
+        with trace_span("embedding", EMBEDDING_LATENCY):
+            vector = self._embed_fn(text)
+        vector = vector.tolist() if hasattr(vector, "tolist") else list(vector)
+        self._put_memory(key, vector)
+        if self.disk_store is not None:
+            self.disk_store.put(key, vector)
+        return vector
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters"""
+        total = self.hits + self.disk_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "disk_size": len(self.disk_store) if self.disk_store is not None else 0,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits + self.disk_hits) / total if total else 0.0,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """EmbeddingCache dùng chung cho embedding_service.create_embedding"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                from coreAI import embedding_service
+
+                disk_store = None
+                if EMBEDDING_CACHE_DISK_DIR:
+                    disk_store = DiskEmbeddingStore(EMBEDDING_CACHE_DISK_DIR, EMBEDDING_CACHE_DISK_CAPACITY)
+                _cache = EmbeddingCache(embedding_service.create_embedding, disk_store=disk_store)
+    return _cache
+
+
+def configure_embedding_cache(embed_fn, max_size=EMBEDDING_CACHE_SIZE, ttl=EMBEDDING_CACHE_TTL, disk_store=None):
+    """Thay EmbeddingCache dùng chung (vd. embedding giả lập khi benchmark)"""
+    global _cache
+    with _cache_lock:
+        _cache = EmbeddingCache(embed_fn, max_size=max_size, ttl=ttl, disk_store=disk_store)
+    return _cache
+
+
+def cached_embedding(text: str):
+    """Shortcut: embedding có cache"""
+    return get_embedding_cache().get_embedding(text)
+
+
+def warm_up():
+    """Embed trước các tổ hợp VN_TOURISM_CITIES × ATTRACTION_TYPES × ACTIVITY_TYPES"""
+    from common_utils.tourism_constants import VN_TOURISM_CITIES, ATTRACTION_TYPES, ACTIVITY_TYPES
+    from coreAI.tools.destination_tools import build_query_text
+
+    attraction_types = [None] + [names[0] for names in ATTRACTION_TYPES.values()]
+    activities = [None] + [names[0] for names in ACTIVITY_TYPES.values()]
+
+    cache = get_embedding_cache()
+    count = 0
+    start = time.monotonic()
+    for city in VN_TOURISM_CITIES:
+        for attraction_type in attraction_types:
+            for activity in activities:
+                cache.get_embedding(build_query_text(location=city, attraction_type=attraction_type, activity=activity))
+                count += 1
+
+    dlog.dlog_i(f"Embedding cache warm-up: {count} queries in {time.monotonic() - start:.1f}s, stats={cache.stats()}")
+    return count
+
+
+if __name__ == "__main__":
+    warm_up()
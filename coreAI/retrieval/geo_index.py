@@ -0,0 +1,280 @@
+# app/coreAI/retrieval/geo_index.py
+import math
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+import dconfig
+import dlog
+from coreAI.retrieval.search_filters import attraction_type_key, normalize_location
+
+_config = dconfig.config_object
+
+GEO_INDEX_REFRESH_SECONDS = float(getattr(_config, "GEO_INDEX_REFRESH_SECONDS", 300))
+GEO_GRID_CELL_DEG = 0.1  # ~11km mỗi ô
+EARTH_RADIUS_KM = 6371.0088
+
+_COLUMNS = ("id", "name", "location", "attraction_type", "latitude", "longitude", "rating", "thumbnail_url",
+            "opening_hours")
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Khoảng cách haversine (km) từ 1 điểm tới mảng điểm, tọa độ tính bằng radian"""
+    dlat = lats - lat
+    dlon = lons - lon
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def load_destinations_from_mysql(since=None):
+    """Đọc các điểm đến có tọa độ, chỉ lấy bản ghi thay đổi sau `since` nếu có"""
+    from database.pools import get_mysql_pool
+
+    sql = f"SELECT {', '.join(_COLUMNS)}, updated_at FROM destinations " \
+          "WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+    params = ()
+    if since is not None:
+        # >=: updated_at chỉ chính xác tới giây, đọc lại các dòng cùng giây với watermark
+        sql += " AND updated_at >= %s"
+        params = (since,)
+    sql += " ORDER BY updated_at"
+
+    with get_mysql_pool().connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+class _Snapshot:
+    """Dữ liệu bất biến của index, được thay nguyên khối khi refresh"""
+
+    def __init__(self, records):
+        self.records = records
+        self.ids = [str(r["id"]) for r in records]
+        self.row_of = {dest_id: i for i, dest_id in enumerate(self.ids)}
+        self.lats = np.radians(np.array([float(r["latitude"]) for r in records], dtype=np.float64))
+        self.lons = np.radians(np.array([float(r["longitude"]) for r in records], dtype=np.float64))
+        self.types = np.array([attraction_type_key(r.get("attraction_type")) for r in records], dtype=object)
+        self.locations = np.array([normalize_location(r.get("location")) for r in records], dtype=object)
+
+        cells = defaultdict(list)
+        for i, r in enumerate(records):
+            cells[_cell(float(r["latitude"]), float(r["longitude"]))].append(i)
+        self.cells = {key: np.array(rows, dtype=np.int64) for key, rows in cells.items()}
+
+
+def _cell(lat_deg, lon_deg):
+    return int(math.floor(lat_deg / GEO_GRID_CELL_DEG)), int(math.floor(lon_deg / GEO_GRID_CELL_DEG))
+
+
+class DestinationGeoIndex:
+    """
+    Index không gian trong RAM cho các điểm đến
+
+    Lưới ô GEO_GRID_CELL_DEG để lọc ứng viên, sau đó tính haversine vector hóa bằng NumPy.
+    Refresh tăng dần theo cột updated_at.
+    """
+
+    def __init__(self, loader=load_destinations_from_mysql, refresh_seconds=GEO_INDEX_REFRESH_SECONDS):
+        self._loader = loader
+        self.refresh_seconds = refresh_seconds
+        self._snapshot = _Snapshot([])
+        self._watermark = None
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    def refresh(self, full=False, if_stale=False):
+        """
+        Nạp các bản ghi thay đổi từ watermark (hoặc toàn bộ nếu full=True)
+
+        Args:
+            if_stale: Bỏ qua nếu thread khác vừa refresh xong trong lúc chờ lock
+        """
+        with self._lock:
+            if if_stale and not self._is_stale():
+                return 0
+            # Đặt trước khi đọc để lỗi DB không làm mỗi request đều thử lại
+            self._refreshed_at = time.monotonic()
+            since = None if full else self._watermark
+            rows = self._loader(since)
+            if not rows and not full:
+                return 0
+
+            if full:
+                self._watermark = None
+            records = {} if full else {dest_id: r for dest_id, r in zip(self._snapshot.ids, self._snapshot.records)}
+            changed = 0
+            for row in rows:
+                dest_id = str(row["id"])
+                updated_at = row.get("updated_at")
+                if updated_at is not None and (self._watermark is None or updated_at > self._watermark):
+                    self._watermark = updated_at
+                if row.get("latitude") is None or row.get("longitude") is None:
+                    changed += records.pop(dest_id, None) is not None
+                elif records.get(dest_id) != row:
+                    # Dòng cùng giây với watermark được đọc lại mỗi lần, chỉ tính là thay đổi nếu khác bản cũ
+                    records[dest_id] = row
+                    changed += 1
+
+            if changed or full:
+                self._snapshot = _Snapshot(list(records.values()))
+                dlog.dlog_i(f"Geo index refreshed: {changed} changed, {len(records)} total")
+            return changed
+
+    def set_loader(self, loader):
+        """Đổi nguồn dữ liệu và nạp lại index"""
+        self._loader = loader
+        self.refresh(full=True)
+
+    def _is_stale(self):
+        return self._refreshed_at is None or time.monotonic() - self._refreshed_at > self.refresh_seconds
+
+    def _refresh_if_stale(self):
+        try:
+            self.refresh(if_stale=True)
+        except Exception as e:
+            dlog.dlog_e(f"Geo index refresh error: {e}")
+
+    def _ensure_fresh(self):
+        if not self._is_stale():
+            return
+        if self._refreshed_at is None:
+            # Chưa nạp lần nào: chờ nạp xong, các request đồng thời chờ lock rồi dùng luôn kết quả
+            self._refresh_if_stale()
+        elif not self._lock.locked():
+            # Đã có dữ liệu: refresh ở background, request hiện tại dùng snapshot cũ
+            threading.Thread(target=self._refresh_if_stale, name="geo-index-refresh", daemon=True).start()
+
+    def __len__(self):
+        return len(self._snapshot.ids)
+
+    def __contains__(self, destination_id):
+        return str(destination_id) in self._snapshot.row_of
+
+    def updated_at(self, destination_id):
+        """updated_at của điểm đến trong index (None nếu không có)"""
+        self._ensure_fresh()
+        snapshot = self._snapshot
+        row = snapshot.row_of.get(str(destination_id))
+        return None if row is None else snapshot.records[row].get("updated_at")
+
+    def coordinates(self, destination_ids) -> tuple:
+        """Tọa độ (radian) của các điểm đến, NaN nếu không có trong index"""
+        self._ensure_fresh()
+        snapshot = self._snapshot
+        rows = np.array([snapshot.row_of.get(str(dest_id), -1) for dest_id in destination_ids], dtype=np.int64)
+        found = rows >= 0
+        lats = np.full(len(rows), np.nan)
+        lons = np.full(len(rows), np.nan)
+        lats[found] = snapshot.lats[rows[found]]
+        lons[found] = snapshot.lons[rows[found]]
+        return lats, lons
+
+    def _format(self, snapshot, rows, distances):
+        results = []
+        for row, distance in zip(rows, distances):
+            record = snapshot.records[row]
+            results.append({
+                "id": record["id"],
+                "name": record.get("name"),
+                "location": record.get("location"),
+                "type": record.get("attraction_type"),
+                "rating": record.get("rating"),
+                "thumbnail_url": record.get("thumbnail_url"),
+                "distance_km": round(float(distance), 2)
+            })
+        return results
+
+    def _type_mask(self, snapshot, rows, attraction_type):
+        if not attraction_type:
+            return np.ones(len(rows), dtype=bool)
+        return snapshot.types[rows] == attraction_type_key(attraction_type)
+
+    def radius_search(self, lat_deg, lon_deg, radius_km, attraction_type=None, exclude_id=None, limit=20):
+        """Các điểm trong bán kính radius_km, sắp xếp theo khoảng cách"""
+        self._ensure_fresh()
+        snapshot = self._snapshot
+        if not snapshot.ids:
+            return []
+
+        # Các ô lưới giao với bounding box của vòng tròn
+        dlat = radius_km / 111.0
+        dlon = radius_km / (111.0 * max(math.cos(math.radians(lat_deg)), 0.01))
+        min_cell = _cell(lat_deg - dlat, lon_deg - dlon)
+        max_cell = _cell(lat_deg + dlat, lon_deg + dlon)
+        candidates = [
+            snapshot.cells[(i, j)]
+            for i in range(min_cell[0], max_cell[0] + 1)
+            for j in range(min_cell[1], max_cell[1] + 1)
+            if (i, j) in snapshot.cells
+        ]
+        if not candidates:
+            return []
+
+        rows = np.concatenate(candidates)
+        rows = rows[self._type_mask(snapshot, rows, attraction_type)]
+        distances = haversine_km(math.radians(lat_deg), math.radians(lon_deg), snapshot.lats[rows], snapshot.lons[rows])
+
+        keep = distances <= radius_km
+        if exclude_id is not None and str(exclude_id) in snapshot.row_of:
+            keep &= rows != snapshot.row_of[str(exclude_id)]
+        rows, distances = rows[keep], distances[keep]
+
+        order = np.argsort(distances, kind="stable")[:limit]
+        return self._format(snapshot, rows[order], distances[order])
+
+    def nearest(self, lat_deg, lon_deg, k=10, attraction_type=None, exclude_id=None):
+        """k điểm gần nhất"""
+        self._ensure_fresh()
+        snapshot = self._snapshot
+        if not snapshot.ids:
+            return []
+
+        rows = np.arange(len(snapshot.ids))
+        if exclude_id is not None and str(exclude_id) in snapshot.row_of:
+            rows = rows[rows != snapshot.row_of[str(exclude_id)]]
+        rows = rows[self._type_mask(snapshot, rows, attraction_type)]
+        if len(rows) == 0:
+            return []
+
+        distances = haversine_km(math.radians(lat_deg), math.radians(lon_deg), snapshot.lats[rows], snapshot.lons[rows])
+        k = min(k, len(rows))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top], kind="stable")]
+        return self._format(snapshot, rows[top], distances[top])
+
+    def in_location(self, location) -> list:
+        """Bản ghi (có tọa độ) của các điểm đến thuộc một tỉnh/thành"""
+        self._ensure_fresh()
+        snapshot = self._snapshot
+        if not snapshot.ids or not location:
+            return []
+        rows = np.flatnonzero(snapshot.locations == normalize_location(location))
+        return [snapshot.records[row] for row in rows]
+
+    def nearby_destination(self, destination_id, radius_km, attraction_type=None, limit=20):
+        """
+        Các điểm gần một điểm đến trong index
+
+        Returns:
+            List kết quả, hoặc None nếu destination_id không có trong index
+        """
+        self._ensure_fresh()
+        snapshot = self._snapshot
+        row = snapshot.row_of.get(str(destination_id))
+        if row is None:
+            return None
+        record = snapshot.records[row]
+        return self.radius_search(
+            float(record["latitude"]),
+            float(record["longitude"]),
+            radius_km,
+            attraction_type=attraction_type,
+            exclude_id=destination_id,
+            limit=limit
+        )
+
+
+destination_geo_index = DestinationGeoIndex()
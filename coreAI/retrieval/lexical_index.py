@@ -0,0 +1,236 @@
+# app/coreAI/retrieval/lexical_index.py
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+import dconfig
+import dlog
+from common_utils.text_utils import normalize_text
+from common_utils.tourism_constants import ATTRACTION_TYPES, ACTIVITY_TYPES
+from coreAI.retrieval.search_filters import (
+    location_in, normalize_location, parse_price_bounds, resolve_price_range, UNKNOWN_PRICE
+)
+
+_config = dconfig.config_object
+
+LEXICAL_INDEX_REFRESH_SECONDS = float(getattr(_config, "LEXICAL_INDEX_REFRESH_SECONDS", 600))
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60
+
+# Trọng số từng trường khi đánh index
+FIELD_BOOSTS = {"name": 3, "location": 2, "description": 1}
+SYNONYM_WEIGHT = 0.5
+
+_WORD_RE = re.compile(r"\w+")
+_COLUMNS = (
+    "id", "name", "location", "attraction_type", "description", "image_url", "thumbnail_url",
+    "price_info", "rating", "opening_hours"
+)
+
+
+def tokenize(text: str) -> list:
+    """
+    Tách token tiếng Việt: âm tiết đã bỏ dấu + cặp âm tiết liền nhau
+
+    'Chùa Một Cột' -> ['chua', 'mot', 'cot', 'chua_mot', 'mot_cot']
+    """
+    syllables = _WORD_RE.findall(normalize_text(text))
+    return syllables + [f"{a}_{b}" for a, b in zip(syllables, syllables[1:])]
+
+
+def _build_synonyms():
+    """Token -> các token đồng nghĩa, từ ATTRACTION_TYPES và ACTIVITY_TYPES"""
+    synonyms = defaultdict(set)
+    for table in (ATTRACTION_TYPES, ACTIVITY_TYPES):
+        for key, names in table.items():
+            group = {normalize_text(key)} | {normalize_text(name) for name in names}
+            for phrase in group:
+                synonyms[phrase] |= group - {phrase}
+    return synonyms
+
+
+def load_destination_documents():
+    """Đọc toàn bộ điểm đến từ MySQL để đánh index"""
+    from database.pools import get_mysql_pool
+
+    with get_mysql_pool().connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT {', '.join(_COLUMNS)} FROM destinations")
+            return cursor.fetchall()
+
+
+class _Corpus:
+    """Inverted index BM25 bất biến, thay nguyên khối khi rebuild"""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.ids = [str(d["id"]) for d in documents]
+        self.row_of = {dest_id: i for i, dest_id in enumerate(self.ids)}
+        self.locations = [normalize_location(d.get("location")) for d in documents]
+        bounds = [parse_price_bounds(d.get("price_info")) for d in documents]
+        self.min_prices = np.array([b[0] for b in bounds], dtype=np.float64)
+        self.max_prices = np.array([b[1] for b in bounds], dtype=np.float64)
+
+        postings = defaultdict(lambda: ([], []))
+        lengths = np.zeros(len(documents), dtype=np.float32)
+        for row, doc in enumerate(documents):
+            counts = Counter()
+            for field, boost in FIELD_BOOSTS.items():
+                for token in tokenize(doc.get(field) or ""):
+                    counts[token] += boost
+            lengths[row] = sum(counts.values())
+            for token, tf in counts.items():
+                rows, tfs = postings[token]
+                rows.append(row)
+                tfs.append(tf)
+
+        self.postings = {
+            token: (np.array(rows, dtype=np.int64), np.array(tfs, dtype=np.float32))
+            for token, (rows, tfs) in postings.items()
+        }
+        self.lengths = lengths
+        self.avg_length = float(lengths.mean()) if len(documents) else 0.0
+
+    def idf(self, df):
+        n = len(self.ids)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+
+class DestinationLexicalIndex:
+    """BM25 trên name/location/description của điểm đến, có bỏ dấu và mở rộng đồng nghĩa"""
+
+    def __init__(self, loader=load_destination_documents, refresh_seconds=LEXICAL_INDEX_REFRESH_SECONDS):
+        self._loader = loader
+        self.refresh_seconds = refresh_seconds
+        self._corpus = _Corpus([])
+        self._synonyms = [
+            (re.compile(rf"\b{re.escape(phrase)}\b"), group) for phrase, group in _build_synonyms().items()
+        ]
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    def rebuild(self, if_stale=False):
+        """
+        Đánh index lại toàn bộ (BM25 cần thống kê toàn corpus)
+
+        Args:
+            if_stale: Bỏ qua nếu thread khác vừa rebuild xong trong lúc chờ lock
+        """
+        with self._lock:
+            if if_stale and not self._is_stale():
+                return
+            # Đặt trước khi đọc để lỗi DB không làm mỗi request đều thử lại
+            self._refreshed_at = time.monotonic()
+            documents = self._loader()
+            self._corpus = _Corpus(list(documents))
+            dlog.dlog_i(f"Lexical index rebuilt: {len(documents)} documents")
+
+    def set_loader(self, loader):
+        """Đổi nguồn dữ liệu và nạp lại index"""
+        self._loader = loader
+        self.rebuild()
+
+    def _is_stale(self):
+        return self._refreshed_at is None or time.monotonic() - self._refreshed_at > self.refresh_seconds
+
+    def _rebuild_if_stale(self):
+        try:
+            self.rebuild(if_stale=True)
+        except Exception as e:
+            dlog.dlog_e(f"Lexical index rebuild error: {e}")
+
+    def _ensure_fresh(self):
+        if not self._is_stale():
+            return
+        if self._refreshed_at is None:
+            # Chưa có index: chờ build xong, các request đồng thời chờ lock rồi dùng luôn kết quả
+            self._rebuild_if_stale()
+        elif not self._lock.locked():
+            # Build corpus mới ở background rồi thay nguyên khối, request hiện tại dùng corpus cũ
+            threading.Thread(target=self._rebuild_if_stale, name="lexical-index-rebuild", daemon=True).start()
+
+    def _query_terms(self, query: str) -> dict:
+        """Token của query kèm trọng số, gồm cả từ đồng nghĩa"""
+        terms = {token: 1.0 for token in tokenize(query)}
+        normalized = normalize_text(query)
+        for pattern, group in self._synonyms:
+            if pattern.search(normalized):
+                for synonym in group:
+                    for token in tokenize(synonym):
+                        terms.setdefault(token, SYNONYM_WEIGHT)
+        return terms
+
+    def search(self, query: str, top_k=10, exclude_ids=None, location=None, price_range=None) -> list:
+        """
+        Tìm kiếm BM25
+
+        Args:
+            price_range: Key PRICE_RANGES hoặc chuỗi tự do ('<100k', '100-500k'), lọc theo khoảng giá
+
+        Returns:
+            List (document, score) theo điểm giảm dần
+        """
+        self._ensure_fresh()
+        corpus = self._corpus
+        if not corpus.ids or not query:
+            return []
+
+        scores = np.zeros(len(corpus.ids), dtype=np.float32)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * corpus.lengths / max(corpus.avg_length, 1e-6))
+        for term, weight in self._query_terms(query).items():
+            posting = corpus.postings.get(term)
+            if posting is None:
+                continue
+            rows, tfs = posting
+            scores[rows] += weight * corpus.idf(len(rows)) * tfs * (BM25_K1 + 1) / (tfs + norm[rows])
+
+        if exclude_ids:
+            for dest_id in exclude_ids:
+                row = corpus.row_of.get(str(dest_id))
+                if row is not None:
+                    scores[row] = 0.0
+        if location:
+            wanted = normalize_location(location)
+            mask = np.array([location_in(wanted, loc) for loc in corpus.locations], dtype=bool)
+            scores[~mask] = 0.0
+        bounds = resolve_price_range(price_range)
+        if bounds is not None:
+            lo, hi = bounds
+            mask = (corpus.max_prices >= lo) & (corpus.min_prices <= hi) & (corpus.max_prices != UNKNOWN_PRICE)
+            scores[~mask] = 0.0
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) == 0:
+            return []
+        top = candidates[np.argsort(-scores[candidates], kind="stable")[:top_k]]
+        return [(corpus.documents[row], float(scores[row])) for row in top]
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K, weights=None):
+    """
+    Gộp nhiều danh sách xếp hạng bằng Reciprocal Rank Fusion
+
+    Args:
+        rankings: List các danh sách id đã xếp hạng
+        k: Hằng số RRF
+        weights: Trọng số cho từng danh sách
+
+    Returns:
+        List id theo điểm RRF giảm dần
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores = defaultdict(float)
+    first_seen = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, item_id in enumerate(ranking):
+            scores[item_id] += weight / (k + rank + 1)
+            first_seen.setdefault(item_id, len(first_seen))
+    return sorted(scores, key=lambda item_id: (-scores[item_id], first_seen[item_id]))
+
+
+destination_lexical_index = DestinationLexicalIndex()
@@ -0,0 +1,140 @@
+# app/coreAI/retrieval/reranker.py
+import math
+from datetime import datetime
+
+import numpy as np
+
+import dconfig
+import dlog
+from common_utils.metrics import trace_span
+from common_utils.tourism_constants import CITY_GEO, TRAVEL_SEASONS
+from coreAI.retrieval.geo_index import destination_geo_index, haversine_km
+from coreAI.retrieval.search_filters import (
+    UNKNOWN_PRICE, normalize_location, parse_price_bounds, resolve_price_range
+)
+
+_config = dconfig.config_object
+
+FEATURES = ("relevance", "rating", "season", "distance", "price")
+DEFAULT_WEIGHTS = {"relevance": 0.45, "rating": 0.2, "season": 0.15, "distance": 0.1, "price": 0.1}
+# Khoảng cách (km) mà điểm distance giảm còn 1/e
+RERANK_DISTANCE_SCALE_KM = float(getattr(_config, "RERANK_DISTANCE_SCALE_KM", 300))
+# Giá trị feature khi thiếu dữ liệu (không có rating, không rõ vùng, không có tọa độ, ...)
+NEUTRAL = 0.5
+
+# Mức phù hợp đi du lịch của từng mùa trong TRAVEL_SEASONS
+SEASON_QUALITY = {
+    "spring": 0.8, "summer": 0.6, "autumn": 1.0, "winter": 0.5,
+    "dry_season": 1.0, "rainy_season": 0.35
+}
+
+_REGIONS = tuple(TRAVEL_SEASONS)
+# season_matrix[vùng, tháng - 1]
+_SEASON_MATRIX = np.full((len(_REGIONS), 12), NEUTRAL)
+for _r, _region in enumerate(_REGIONS):
+    for _season, _info in TRAVEL_SEASONS[_region].items():
+        for _month in _info["months"]:
+            _SEASON_MATRIX[_r, _month - 1] = SEASON_QUALITY.get(_season, NEUTRAL)
+
+# Tên tỉnh/thành đã chuẩn hóa -> (chỉ số vùng, lat, lon theo radian)
+_CITY_LOOKUP = {
+    normalize_location(city): (_REGIONS.index(info["region"]), math.radians(info["lat"]), math.radians(info["lon"]))
+    for city, info in CITY_GEO.items()
+}
+
+
+def parse_weights(value) -> dict:
+    """Trọng số từ cấu hình: dict hoặc chuỗi 'rating=0.3,season=0.2'; feature không khai báo giữ mặc định"""
+    weights = dict(DEFAULT_WEIGHTS)
+    if isinstance(value, str):
+        value = dict(item.split("=", 1) for item in value.split(",") if "=" in item)
+    for name, weight in (value or {}).items():
+        name = name.strip()
+        if name in weights:
+            weights[name] = float(weight)
+    return weights
+
+
+RERANK_WEIGHTS = parse_weights(getattr(_config, "RERANK_WEIGHTS", None))
+
+
+def city_info(location):
+    """(chỉ số vùng, lat, lon) của tỉnh/thành, None nếu không nằm trong VN_TOURISM_CITIES"""
+    return _CITY_LOOKUP.get(normalize_location(location)) if location else None
+
+
+class DestinationReranker:
+    """
+    Xếp hạng lại toàn bộ ứng viên sau khi fuse vector + BM25, tính trong một lượt NumPy
+
+    score = Σ weight * feature, mọi feature nằm trong [0, 1]:
+    - relevance: thứ hạng sau khi fuse
+    - rating: rating / 5
+    - season: tháng đi so với mùa của vùng (TRAVEL_SEASONS)
+    - distance: exp(-km / RERANK_DISTANCE_SCALE_KM) từ vị trí của khách
+    - price: khớp khoảng giá yêu cầu
+    Mỗi kết quả có thêm 'score' và 'score_breakdown' (phần đóng góp của từng feature).
+    """
+
+    def __init__(self, weights: dict = None):
+        self.weights = parse_weights(weights) if weights is not None else dict(RERANK_WEIGHTS)
+        self._weight_vector = np.array([self.weights[name] for name in FEATURES])
+
+    def features(self, results: list, customer_location=None, month: int = None, price_range=None) -> np.ndarray:
+        """Ma trận feature (số kết quả x len(FEATURES))"""
+        n = len(results)
+        matrix = np.full((n, len(FEATURES)), NEUTRAL)
+
+        matrix[:, 0] = 1.0 - np.arange(n) / max(n, 1)
+
+        ratings = np.array([r.get("rating") if r.get("rating") is not None else np.nan for r in results], dtype=float)
+        matrix[:, 1] = np.where(np.isnan(ratings), NEUTRAL, np.clip(ratings / 5.0, 0.0, 1.0))
+
+        cities = [city_info(r.get("location")) for r in results]
+        regions = np.array([c[0] if c else -1 for c in cities], dtype=np.int64)
+        month = month if month and 1 <= month <= 12 else datetime.now().month
+        matrix[:, 2] = np.where(regions >= 0, _SEASON_MATRIX[regions, month - 1], NEUTRAL)
+
+        origin = city_info(customer_location)
+        if origin is not None:
+            lats, lons = destination_geo_index.coordinates([r.get("id") for r in results])
+            # Điểm chưa có tọa độ: lấy tọa độ trung tâm tỉnh/thành
+            city_lats = np.array([c[1] if c else np.nan for c in cities])
+            city_lons = np.array([c[2] if c else np.nan for c in cities])
+            lats = np.where(np.isnan(lats), city_lats, lats)
+            lons = np.where(np.isnan(lons), city_lons, lons)
+            distances = haversine_km(origin[1], origin[2], lats, lons)
+            matrix[:, 3] = np.where(np.isnan(distances), NEUTRAL, np.exp(-distances / RERANK_DISTANCE_SCALE_KM))
+
+        bounds = resolve_price_range(price_range)
+        if bounds is not None:
+            prices = np.array([parse_price_bounds(r.get("price_info")) for r in results], dtype=float).reshape(n, 2)
+            lo, hi = bounds
+            known = prices[:, 1] != UNKNOWN_PRICE
+            overlaps = (prices[:, 1] >= lo) & (prices[:, 0] <= hi)
+            matrix[:, 4] = np.where(known, np.where(overlaps, 1.0, 0.0), NEUTRAL)
+
+        return matrix
+
+    def rerank(self, results: list, customer_location=None, month: int = None, price_range=None) -> list:
+        """Kết quả sắp xếp theo score giảm dần, thêm score và score_breakdown"""
+        if not results:
+            return results
+        with trace_span("rerank", candidates=len(results)):
+            contributions = self.features(results, customer_location, month, price_range) * self._weight_vector
+            scores = contributions.sum(axis=1)
+            order = np.argsort(-scores, kind="stable")
+
+        reranked = []
+        for row in order:
+            reranked.append({
+                **results[row],
+                "score": round(float(scores[row]), 3),
+                "score_breakdown": {name: round(float(contributions[row, i]), 3) for i, name in enumerate(FEATURES)}
+            })
+        dlog.dlog_i(f"--- rerank {len(results)} candidates, top: {reranked[0].get('name')} "
+                    f"{reranked[0]['score_breakdown']}")
+        return reranked
+
+
+destination_reranker = DestinationReranker()
@@ -0,0 +1,129 @@
+# app/coreAI/retrieval/result_cursor.py
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+import dconfig
+from common_utils.metrics import registry
+from common_utils.text_utils import normalize_text
+
+_config = dconfig.config_object
+
+RESULT_CURSOR_MAX_ENTRIES = int(getattr(_config, "RESULT_CURSOR_MAX_ENTRIES", 2048))
+RESULT_CURSOR_TTL = float(getattr(_config, "RESULT_CURSOR_TTL", 1800))
+
+RESULT_CURSOR = registry.counter("tourism_result_cursor_total", "Số lần tạo/đọc cursor phân trang kết quả")
+
+
+def query_key(*criteria) -> str:
+    """Key của truy vấn từ các tiêu chí đã chuẩn hóa (None/'' coi như nhau)"""
+    return "|".join(normalize_text(str(c)) if c else "" for c in criteria)
+
+
+class _Cursor:
+    __slots__ = ("token", "scope", "results", "offset", "expires_at")
+
+    def __init__(self, token, scope, results, expires_at):
+        self.token = token
+        self.scope = scope
+        self.results = results
+        self.offset = 0
+        self.expires_at = expires_at
+
+
+class ResultCursorStore:
+    """
+    Danh sách ứng viên đã tìm sẵn (sâu hơn một trang) để phân trang "xem thêm" không cần embedding/ANN lại
+
+    Mỗi cursor gắn với (thread_id, query_key) và có token ngẫu nhiên để LLM truyền lại. Giới hạn số cursor
+    trong RAM, bỏ cursor ít dùng nhất (LRU) và cursor quá TTL. Cursor chỉ nằm trong process tạo ra nó,
+    worker khác không thấy thì tool tìm lại từ đầu theo tiêu chí.
+    """
+
+    def __init__(self, max_entries: int = RESULT_CURSOR_MAX_ENTRIES, ttl: float = RESULT_CURSOR_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._cursors = OrderedDict()
+        self._by_scope = {}
+        self._lock = threading.Lock()
+
+    def create(self, thread_id, key: str, results: list) -> str:
+        """Lưu danh sách kết quả, trả về token; thay cursor cũ cùng (thread_id, key)"""
+        scope = (thread_id, key)
+        token = secrets.token_urlsafe(9)
+        with self._lock:
+            old = self._by_scope.pop(scope, None)
+            if old is not None:
+                self._cursors.pop(old, None)
+            self._cursors[token] = _Cursor(token, scope, list(results), time.monotonic() + self.ttl)
+            self._by_scope[scope] = token
+            while len(self._cursors) > self.max_entries:
+                _, evicted = self._cursors.popitem(last=False)
+                self._by_scope.pop(evicted.scope, None)
+                RESULT_CURSOR.inc(outcome="evicted")
+        RESULT_CURSOR.inc(outcome="created")
+        return token
+
+    def _get(self, token):
+        cursor = self._cursors.get(token)
+        if cursor is None:
+            return None
+        if cursor.expires_at <= time.monotonic():
+            del self._cursors[token]
+            self._by_scope.pop(cursor.scope, None)
+            RESULT_CURSOR.inc(outcome="expired")
+            return None
+        self._cursors.move_to_end(token)
+        cursor.expires_at = time.monotonic() + self.ttl
+        return cursor
+
+    def find(self, thread_id, key: str):
+        """Token của cursor đang có cho cùng thread và truy vấn"""
+        with self._lock:
+            token = self._by_scope.get((thread_id, key))
+            return token if token is not None and self._get(token) is not None else None
+
+    def page(self, token: str, size: int, exclude_ids=None, thread_id=None):
+        """
+        Trang tiếp theo (chưa dịch offset, gọi advance sau khi biết số bản ghi thực sự trả về)
+
+        Returns:
+            (records, has_more), hoặc None nếu cursor không tồn tại/hết hạn/thuộc thread khác
+        """
+        excluded = {str(i) for i in exclude_ids or []}
+        with self._lock:
+            cursor = self._get(token)
+            if cursor is None or (thread_id is not None and cursor.scope[0] not in (None, thread_id)):
+                RESULT_CURSOR.inc(outcome="miss")
+                return None
+            if excluded:
+                cursor.results = cursor.results[:cursor.offset] + [
+                    r for r in cursor.results[cursor.offset:] if str(r.get("id")) not in excluded
+                ]
+            records = cursor.results[cursor.offset:cursor.offset + size]
+            has_more = cursor.offset + len(records) < len(cursor.results)
+        RESULT_CURSOR.inc(outcome="hit")
+        return records, has_more
+
+    def advance(self, token: str, count: int) -> bool:
+        """Dịch cursor qua count bản ghi đã trả về, trả về còn kết quả hay không"""
+        with self._lock:
+            cursor = self._cursors.get(token)
+            if cursor is None:
+                return False
+            cursor.offset = min(cursor.offset + count, len(cursor.results))
+            return cursor.offset < len(cursor.results)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"cursors": len(self._cursors), "max_entries": self.max_entries}
+
+
+result_cursors = ResultCursorStore()
+
+registry.register_collector(
+    "tourism_result_cursors",
+    "Số cursor phân trang đang giữ trong RAM",
+    lambda: [({"stat": key}, value) for key, value in result_cursors.stats().items()]
+)
@@ -0,0 +1,223 @@
+# app/coreAI/retrieval/search_filters.py
+import json
+import re
+
+from common_utils.text_utils import normalize_text
+from common_utils.tourism_constants import ATTRACTION_TYPES, CITY_ALIASES, PRICE_RANGES, VN_TOURISM_CITIES
+
+# Giá trị scalar field min_price/max_price (Milvus) khi điểm đến không có thông tin giá, Milvus không có NULL
+UNKNOWN_PRICE = -1
+
+_NUMBER_RE = re.compile(r"(\d+(?:[.,]\d+)*)\s*(k|nghìn|ngàn|tr|triệu|m|đ|d|vnd)?", re.IGNORECASE)
+_UNIT_MULTIPLIERS = {"k": 1000, "nghìn": 1000, "ngàn": 1000, "tr": 1000000, "triệu": 1000000, "m": 1000000}
+_FREE_WORDS = ("free", "mien phi", "0d")
+_BELOW_WORDS = ("<", "duoi", "under", "below", "max", "toi da")
+_ABOVE_WORDS = (">", "tren", "over", "above", "from", "tu ")
+
+_PUNCTUATION_RE = re.compile(r"[^\w]+")
+
+
+def _location_text(text) -> str:
+    """Bỏ dấu, chữ thường, bỏ dấu câu: 'TP. HCM' -> 'tp hcm'"""
+    return _PUNCTUATION_RE.sub(" ", normalize_text(text)).strip()
+
+
+# Tên/tên gọi khác đã chuẩn hóa -> tên tỉnh/thành chuẩn hóa, khớp theo cả từ, tên dài trước
+_CITY_NAMES = {_location_text(city): _location_text(city) for city in VN_TOURISM_CITIES}
+_CITY_NAMES.update({
+    _location_text(alias): _location_text(city) for city, aliases in CITY_ALIASES.items() for alias in aliases
+})
+_CITY_RE = re.compile(
+    r"(?<!\w)(" + "|".join(re.escape(name) for name in sorted(_CITY_NAMES, key=len, reverse=True)) + r")(?!\w)"
+)
+_TYPE_ALIASES = {
+    normalize_text(name): key
+    for key, names in ATTRACTION_TYPES.items()
+    for name in [key] + names
+}
+
+
+def _to_number(text: str):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        match = _NUMBER_RE.search(str(text or ""))
+        if not match:
+            return None
+        return _parse_amount(match.group(1), match.group(2))
+
+
+def _parse_amount(digits: str, unit) -> float:
+    unit = (unit or "").lower()
+    if unit in _UNIT_MULTIPLIERS:
+        # 1.5tr / 1,5tr: dấu phân cách là phần thập phân
+        return float(digits.replace(",", ".")) * _UNIT_MULTIPLIERS[unit]
+    # 100.000đ / 100,000: dấu phân cách hàng nghìn
+    return float(re.sub(r"[.,]", "", digits))
+
+
+def _is_free(value) -> bool:
+    return any(word in normalize_text(str(value)) for word in _FREE_WORDS)
+
+
+def _value_price(value):
+    """Giá của một mục trong price_info: số, chuỗi có đơn vị, hoặc 'Miễn phí' -> 0"""
+    price = _to_number(value)
+    if price is None and _is_free(value):
+        return 0
+    return price
+
+
+def parse_price_bounds(price_info) -> tuple:
+    """
+    Giá thấp nhất / cao nhất từ price_info
+
+    '{"adult": 100000, "child": 50000}' -> (50000, 100000)
+    '{"adult": "100.000đ", "child": "Miễn phí"}' -> (0, 100000)
+    Không có giá -> (UNKNOWN_PRICE, UNKNOWN_PRICE)
+    """
+    if price_info is None or price_info == "":
+        return UNKNOWN_PRICE, UNKNOWN_PRICE
+    if isinstance(price_info, str):
+        try:
+            price_info = json.loads(price_info)
+        except ValueError:
+            pass
+
+    if isinstance(price_info, dict):
+        values = price_info.values()
+    elif isinstance(price_info, (list, tuple)):
+        values = price_info
+    else:
+        values = [price_info]
+
+    prices = [p for p in (_value_price(v) for v in values if not isinstance(v, (dict, list))) if p is not None]
+    if not prices:
+        return UNKNOWN_PRICE, UNKNOWN_PRICE
+    return int(min(prices)), int(max(prices))
+
+
+def resolve_price_range(price_range) -> tuple:
+    """
+    Khoảng giá (lo, hi) từ key PRICE_RANGES hoặc chuỗi tự do
+
+    'cheap' / '<100k' / 'dưới 100k' -> (0, 100000)
+    '50k' / '200.000đ' (chỉ một mức giá) -> (0, mức giá)
+    '100-500k' -> (100000, 500000)
+    '>500k' -> (500000, inf)
+    Không hiểu -> None
+    """
+    if not price_range:
+        return None
+    if price_range in PRICE_RANGES:
+        bucket = PRICE_RANGES[price_range]
+        return bucket["min"], bucket["max"]
+
+    text = normalize_text(price_range)
+    for bucket in PRICE_RANGES.values():
+        if text == normalize_text(bucket["label"]):
+            return bucket["min"], bucket["max"]
+    if any(text.startswith(word) or text == word for word in _FREE_WORDS):
+        return 0, 0
+
+    matches = _NUMBER_RE.findall(price_range.lower())
+    if not matches:
+        return None
+    # '100-500k': đơn vị ở số sau áp dụng cho cả số trước
+    last_unit = matches[-1][1]
+    amounts = [_parse_amount(digits, unit or last_unit) for digits, unit in matches]
+
+    if len(amounts) >= 2:
+        return min(amounts[0], amounts[1]), max(amounts[0], amounts[1])
+    if any(word in text for word in _BELOW_WORDS):
+        return 0, amounts[0]
+    if any(word in text for word in _ABOVE_WORDS):
+        return amounts[0], float("inf")
+    # Một mức giá không kèm 'dưới'/'trên': coi là ngân sách tối đa
+    return 0, amounts[0]
+
+
+def normalize_location(location) -> str:
+    """
+    Tên tỉnh/thành chuẩn hóa (bỏ dấu, chữ thường), ưu tiên khớp VN_TOURISM_CITIES và CITY_ALIASES
+
+    'TP. HCM' / 'Sài Gòn' -> 'ho chi minh', 'Phố cổ, Quảng Nam' -> 'hoi an'
+    """
+    text = _location_text(location)
+    match = _CITY_RE.search(text)
+    return _CITY_NAMES[match.group(1)] if match else text
+
+
+def location_matches(location, candidate) -> bool:
+    """Địa điểm của bản ghi (candidate) khớp địa điểm yêu cầu, so sánh sau normalize_location"""
+    wanted = normalize_location(location)
+    if not wanted:
+        return True
+    return location_in(wanted, normalize_location(candidate))
+
+
+def location_in(wanted: str, actual: str) -> bool:
+    """So khớp hai địa điểm đã normalize_location: trùng nhau hoặc actual chứa nguyên cụm từ wanted"""
+    return actual == wanted or f" {wanted} " in f" {actual} "
+
+
+def normalize_attraction_type(attraction_type):
+    """Key ATTRACTION_TYPES của loại điểm tham quan ('bãi biển' -> 'beach'), None nếu không nhận ra"""
+    if not attraction_type:
+        return None
+    return _TYPE_ALIASES.get(normalize_text(attraction_type))
+
+
+def attraction_type_key(attraction_type) -> str:
+    """Giá trị type_norm: key ATTRACTION_TYPES nếu nhận ra, nếu không thì tên loại đã chuẩn hóa"""
+    return normalize_attraction_type(attraction_type) or normalize_text(attraction_type or "")
+
+
+def price_overlaps(min_price, max_price, bounds) -> bool:
+    """Khoảng giá của điểm đến giao với khoảng giá yêu cầu"""
+    if bounds is None:
+        return True
+    lo, hi = bounds
+    return max_price >= lo and min_price <= hi and max_price != UNKNOWN_PRICE
+
+
+def _quote(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def build_destination_expr(location=None, attraction_type=None, price_range=None, exclude_ids=None) -> str:
+    """
+    Biên dịch bộ lọc sang biểu thức boolean của Milvus, áp dụng ngay trong lúc ANN search
+
+    Dùng các scalar field location_norm, type_norm, min_price, max_price do vector_sync ghi vào collection.
+    Loại điểm không nhận ra và khoảng giá không hiểu thì không lọc (vẫn nằm trong query embedding).
+
+    Returns:
+        Biểu thức, '' nếu không có điều kiện
+    """
+    clauses = []
+    wanted = normalize_location(location) if location else ""
+    if wanted:
+        # Tỉnh/thành đã biết: so trùng; địa danh khác: location_norm chứa cụm từ (giống location_in)
+        if wanted in _CITY_NAMES.values():
+            clauses.append(f"location_norm == {_quote(wanted)}")
+        else:
+            clauses.append(f"location_norm like {_quote('%' + wanted + '%')}")
+
+    type_key = normalize_attraction_type(attraction_type)
+    if type_key:
+        clauses.append(f"type_norm == {_quote(type_key)}")
+
+    bounds = resolve_price_range(price_range)
+    if bounds is not None:
+        lo, hi = bounds
+        # max_price >= 0 loại luôn điểm đến không có giá (UNKNOWN_PRICE)
+        clauses.append(f"max_price >= {max(int(lo), 0)}")
+        if hi != float("inf"):
+            clauses.append(f"min_price <= {int(hi)}")
+
+    ids = [int(dest_id) for dest_id in exclude_ids or [] if str(dest_id).isdigit()]
+    if ids:
+        clauses.append(f"id not in {ids}")
+
+    return " and ".join(clauses)
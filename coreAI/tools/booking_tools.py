@@ -0,0 +1,66 @@
+# app/coreAI/tools/booking_tools.py
+import json
+from typing import Optional
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import tool
+
+import dlog
+from common_utils.metrics import traced, TOOL_LATENCY
+from coreAI.tools.tool_output import serialize_tool_output
+from coreAI.tools.review_tools import REVIEW_TOOLS
+from database.booking_engine import get_booking_engine
+from object_models.tourism_state import BookingRequest
+
+
+@tool(
+    name_or_callable="create_booking",
+    description="Đặt dịch vụ (tour, khách sạn, vé, ...) sau khi khách đã xác nhận đầy đủ thông tin",
+    args_schema=BookingRequest
+)
+@traced("tool", TOOL_LATENCY, tool="create_booking")
+def create_booking_tool(
+        service_type: str,
+        check_in: str,
+        number_of_people: int,
+        customer_name: str,
+        customer_phone: str,
+        service_id: Optional[str] = None,
+        check_out: Optional[str] = None,
+        customer_email: Optional[str] = None,
+        special_requests: Optional[str] = None,
+        payment_method: Optional[str] = None,
+        config: RunnableConfig = None
+) -> str:
+    """
+    Đặt dịch vụ qua booking engine
+
+    Gọi lại với cùng thông tin (khách gửi lại tin nhắn) trả về đúng booking đã tạo, không đặt thêm.
+    customer lấy từ config["configurable"]["customer"].
+
+    Returns:
+        JSON {status, booking_id, total_price, confirmation_link, duplicate} hoặc {status: rejected, reason, message}
+    """
+    configurable = (config or {}).get("configurable") or {}
+    thread_id = configurable.get("thread_id")
+    dlog.dlog_i(f"--- create_booking: {service_type} {service_id} {check_in} x{number_of_people}, thread={thread_id}")
+
+    request = BookingRequest(
+        service_type=service_type,
+        service_id=service_id,
+        check_in=check_in,
+        check_out=check_out,
+        number_of_people=number_of_people,
+        customer_name=customer_name,
+        customer_phone=customer_phone,
+        customer_email=customer_email,
+        special_requests=special_requests,
+        payment_method=payment_method
+    )
+    result = get_booking_engine().book(thread_id, configurable.get("customer"), request.model_dump())
+    if result["status"] != "confirmed":
+        return json.dumps(result, ensure_ascii=False)
+    return serialize_tool_output("create_booking", result)
+
+
+# Nhân viên đặt dịch vụ cũng nhận đánh giá của khách sau chuyến đi
+BOOKING_SERVICE_TOOLS = [create_booking_tool, *REVIEW_TOOLS]
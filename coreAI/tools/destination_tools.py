@@ -1,12 +1,27 @@
 # app/coreAI/tools/destination_tools.py
 import json
 from typing import Optional, List
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
 
+import dconfig
 import dlog
-from coreAI import embedding_service
-from database.dao.milvus.destination_dao import DestinationDAO
+from common_utils.metrics import traced, TOOL_LATENCY
+from coreAI.answer_cache import cite_events
+from coreAI.retrieval.embedding_cache import cached_embedding
+from coreAI.retrieval.geo_index import destination_geo_index
+from coreAI.retrieval.lexical_index import destination_lexical_index, reciprocal_rank_fusion
+from coreAI.retrieval.reranker import destination_reranker
+from coreAI.retrieval.result_cursor import result_cursors, query_key
+from coreAI.retrieval.search_filters import attraction_type_key
+from coreAI.tools.tool_output import serialize_tool_output, serialize_tool_page
+from database.dao.dao_provider import get_destination_dao
+from database.review_aggregates import review_aggregator
+
+SEARCH_TOP_K = 10
+# Số ứng viên lấy một lần rồi giữ trong cursor cho các trang "xem thêm"
+SEARCH_CURSOR_DEPTH = int(getattr(dconfig.config_object, "SEARCH_CURSOR_DEPTH", 50))
 
 
 class DestinationQuery(BaseModel):
@@ -16,31 +31,21 @@ class DestinationQuery(BaseModel):
     activity: Optional[str] = Field(None, description="Hoạt động (tham quan, mạo hiểm, nghỉ dưỡng, ...)")
     keyword: Optional[str] = Field(None, description="Từ khóa tìm kiếm")
     price_range: Optional[str] = Field(None, description="Khoảng giá (free, <100k, 100-500k, >500k)")
+    customer_location: Optional[str] = Field(None, description="Vị trí hiện tại của khách (ưu tiên điểm gần)")
+    travel_month: Optional[int] = Field(None, description="Tháng dự định đi (1-12), mặc định tháng hiện tại")
     exclude_ids: Optional[List[str]] = Field(None, description="Loại trừ các ID đã hiển thị")
+    cursor: Optional[str] = Field(
+        None, description="Khi khách muốn xem thêm: truyền lại 'cursor' của kết quả trước cùng các tiêu chí cũ"
+    )
 
 
-@tool(
-    name_or_callable="retriever_destination_info",
-    description="Tìm kiếm thông tin điểm đến du lịch dựa trên tiêu chí",
-    args_schema=DestinationQuery
-)
-def retriever_destination_info_tool(
+def build_query_text(
         location: Optional[str] = None,
         attraction_type: Optional[str] = None,
         activity: Optional[str] = None,
-        keyword: Optional[str] = None,
-        price_range: Optional[str] = None,
-        exclude_ids: Optional[List[str]] = None
+        keyword: Optional[str] = None
 ) -> str:
-    """
-    Tìm kiếm điểm đến du lịch
-
-    Returns:
-        JSON list các điểm đến: [{id, name, location, type, description, image_url, price_info}]
-    """
-    dlog.dlog_i(f"--- retriever_destination_info: location={location}, type={attraction_type}")
-
-    # Tạo query text cho embedding
+    """Tạo query text cho embedding từ các tiêu chí tìm kiếm"""
     query_parts = []
     if location:
         query_parts.append(f"location: {location}")
@@ -51,16 +56,64 @@ def retriever_destination_info_tool(
     if keyword:
         query_parts.append(keyword)
 
-    query_text = " ".join(query_parts) if query_parts else "điểm du lịch"
+    return " ".join(query_parts) if query_parts else "điểm du lịch"
+
+
+def fuse_search_results(vector_results: list, lexical_results: list, top_k: int = SEARCH_TOP_K) -> list:
+    """Gộp kết quả vector (Milvus) và BM25 bằng Reciprocal Rank Fusion"""
+    by_id = {}
+    for dest in vector_results + lexical_results:
+        by_id.setdefault(str(dest.get("id")), dest)
+    fused_ids = reciprocal_rank_fusion([
+        [str(dest.get("id")) for dest in vector_results],
+        [str(dest.get("id")) for dest in lexical_results]
+    ])
+    return [by_id[dest_id] for dest_id in fused_ids[:top_k]]
+
+
+def format_destination(dest: dict) -> dict:
+    # Rating và số lượt đánh giá lấy từ thống kê review trong RAM (mới hơn cột rating đã index)
+    reviews = review_aggregator.get("destination", dest.get("id"))
+    return {
+        "id": dest.get("id"),
+        "name": dest.get("name"),
+        "location": dest.get("location"),
+        "type": dest.get("attraction_type"),
+        "description": dest.get("description"),
+        "image_url": dest.get("image_url"),
+        "thumbnail_url": dest.get("thumbnail_url"),
+        "price_info": dest.get("price_info"),
+        "rating": round(reviews.average, 2) if reviews is not None else dest.get("rating"),
+        "review_count": reviews.count if reviews is not None else None,
+        "opening_hours": dest.get("opening_hours")
+    }
+
+
+def search_destination_candidates(
+        location: Optional[str] = None,
+        attraction_type: Optional[str] = None,
+        activity: Optional[str] = None,
+        keyword: Optional[str] = None,
+        price_range: Optional[str] = None,
+        exclude_ids: Optional[List[str]] = None,
+        top_k: int = SEARCH_CURSOR_DEPTH,
+        customer_location: Optional[str] = None,
+        travel_month: Optional[int] = None
+) -> list:
+    """Tìm ứng viên điểm đến (vector + BM25, fuse rồi xếp hạng lại), đã format, tối đa top_k"""
+    # Tạo query text cho embedding
+    query_text = build_query_text(location, attraction_type, activity, keyword)
 
-    # Tạo embedding
-    query_vector = embedding_service.create_embedding(query_text)
+    # Tạo embedding (có cache)
+    query_vector = cached_embedding(query_text)
 
     # Search trong database
-    destination_dao = DestinationDAO()
+    destination_dao = get_destination_dao()
 
-    # Prepare filters
+    # Prepare filters (DAO lọc ngay trong ANN search)
     filters = {}
+    if attraction_type:
+        filters["attraction_type"] = attraction_type
     if price_range:
         filters["price_range"] = price_range
     if location:
@@ -68,37 +121,117 @@ def retriever_destination_info_tool(
 
     results = destination_dao.search_destinations(
         query_vector=query_vector,
-        top_k=10,
+        top_k=top_k,
         exclude_ids=exclude_ids or [],
         filters=filters
     )
 
+    # Kết hợp BM25 để bắt tên riêng và từ khóa không dấu
+    lexical_query = " ".join(part for part in (keyword, attraction_type, activity) if part) or location
+    lexical_results = destination_lexical_index.search(
+        lexical_query or "",
+        top_k=top_k,
+        exclude_ids=exclude_ids,
+        location=location,
+        price_range=price_range
+    )
+    results = fuse_search_results(results or [], [doc for doc, _ in lexical_results], top_k=top_k)
+    return destination_reranker.rerank(
+        [format_destination(dest) for dest in results],
+        customer_location=customer_location,
+        month=travel_month,
+        price_range=price_range
+    )
+
+
+def destination_page(cursor: str, thread_id=None, exclude_ids: Optional[List[str]] = None) -> Optional[str]:
+    """
+    Trang tiếp theo từ cursor, không gọi embedding/ANN
+
+    Returns:
+        JSON {cursor?, results}, None nếu cursor không còn (hết hạn, bị evict, hoặc ở worker khác)
+    """
+    page = result_cursors.page(cursor, SEARCH_TOP_K, exclude_ids=exclude_ids, thread_id=thread_id)
+    if page is None:
+        return None
+    records, has_more = page
+    if not records:
+        return json.dumps({
+            "message": "Đã hiển thị hết các điểm đến phù hợp",
+            "results": []
+        }, ensure_ascii=False)
+
+    output, shown = serialize_tool_page("retriever_destination_info", {
+        **({"cursor": cursor} if has_more else {}),
+        "results": records
+    })
+    if shown < len(records) and not has_more:
+        # Một phần trang bị cắt cho vừa budget, vẫn còn để xem tiếp
+        output, shown = serialize_tool_page("retriever_destination_info", {"cursor": cursor, "results": records})
+    result_cursors.advance(cursor, shown)
+    return output
+
+
+def _thread_id(config: RunnableConfig):
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
+
+@tool(
+    name_or_callable="retriever_destination_info",
+    description="Tìm kiếm thông tin điểm đến du lịch dựa trên tiêu chí",
+    args_schema=DestinationQuery
+)
+@traced("tool", TOOL_LATENCY, tool="retriever_destination_info")
+def retriever_destination_info_tool(
+        location: Optional[str] = None,
+        attraction_type: Optional[str] = None,
+        activity: Optional[str] = None,
+        keyword: Optional[str] = None,
+        price_range: Optional[str] = None,
+        customer_location: Optional[str] = None,
+        travel_month: Optional[int] = None,
+        exclude_ids: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+        config: RunnableConfig = None
+) -> str:
+    """
+    Tìm kiếm điểm đến du lịch
+
+    Lần tìm đầu lấy sẵn SEARCH_CURSOR_DEPTH ứng viên, xếp hạng lại theo rating/mùa/khoảng cách/giá
+    và lưu thành cursor theo (thread_id, truy vấn);
+    các trang "xem thêm" đọc tiếp từ cursor, không embedding hay search lại.
+
+    Returns:
+        JSON {cursor?, results: [{id, name, location, type, description, image_url, price_info}]}
+    """
+    dlog.dlog_i(f"--- retriever_destination_info: location={location}, type={attraction_type}, cursor={cursor}")
+
+    thread_id = _thread_id(config)
+    key = query_key(location, attraction_type, activity, keyword, price_range, customer_location, travel_month)
+
+    # LLM có thể chỉ truyền exclude_ids (cách cũ): dùng lại cursor của cùng truy vấn nếu có
+    cursor = cursor or (result_cursors.find(thread_id, key) if exclude_ids else None)
+    if cursor:
+        output = destination_page(cursor, thread_id=thread_id, exclude_ids=exclude_ids)
+        if output is not None:
+            return output
+
+    results = search_destination_candidates(
+        location, attraction_type, activity, keyword, price_range, exclude_ids,
+        customer_location=customer_location, travel_month=travel_month
+    )
+
     if not results:
         return json.dumps({
             "error": "Không tìm thấy điểm đến phù hợp",
             "suggestion": "Thử tìm kiếm với tiêu chí khác"
         }, ensure_ascii=False)
 
-    # Format results
-    formatted_results = []
-    for dest in results:
-        formatted_results.append({
-            "id": dest.get("id"),
-            "name": dest.get("name"),
-            "location": dest.get("location"),
-            "type": dest.get("attraction_type"),
-            "description": dest.get("description"),
-            "image_url": dest.get("image_url"),
-            "thumbnail_url": dest.get("thumbnail_url"),
-            "price_info": dest.get("price_info"),
-            "rating": dest.get("rating"),
-            "opening_hours": dest.get("opening_hours")
-        })
-
-    return json.dumps(formatted_results, ensure_ascii=False, indent=2)
+    return destination_page(result_cursors.create(thread_id, key, results), thread_id=thread_id)
 
 
 @tool(name_or_callable="get_destination_details")
+@traced("tool", TOOL_LATENCY, tool="get_destination_details")
 def get_destination_details_tool(destination_id: str) -> str:
     """
     Lấy thông tin chi tiết của một điểm đến cụ thể
@@ -111,7 +244,7 @@ def get_destination_details_tool(destination_id: str) -> str:
     """
     dlog.dlog_i(f"--- get_destination_details: {destination_id}")
 
-    destination_dao = DestinationDAO()
+    destination_dao = get_destination_dao()
     destination = destination_dao.get_destination_by_id(destination_id)
 
     if not destination:
@@ -119,25 +252,34 @@ def get_destination_details_tool(destination_id: str) -> str:
             "error": f"Không tìm thấy điểm đến với ID: {destination_id}"
         }, ensure_ascii=False)
 
-    return json.dumps(destination, ensure_ascii=False, indent=2)
+    return serialize_tool_output("get_destination_details", destination)
 
 
 @tool(name_or_callable="get_nearby_attractions")
-def get_nearby_attractions_tool(destination_id: str, radius_km: float = 10.0) -> str:
+@traced("tool", TOOL_LATENCY, tool="get_nearby_attractions")
+def get_nearby_attractions_tool(destination_id: str, radius_km: float = 10.0,
+                                attraction_type: Optional[str] = None) -> str:
     """
     Tìm các điểm tham quan gần một địa điểm
 
     Args:
         destination_id: ID điểm đến trung tâm
         radius_km: Bán kính tìm kiếm (km)
+        attraction_type: Lọc theo loại điểm tham quan (beach, temple, ...)
 
     Returns:
         JSON list các điểm gần
     """
-    dlog.dlog_i(f"--- get_nearby_attractions: {destination_id}, radius={radius_km}km")
+    dlog.dlog_i(f"--- get_nearby_attractions: {destination_id}, radius={radius_km}km, type={attraction_type}")
 
-    destination_dao = DestinationDAO()
-    nearby = destination_dao.get_nearby_destinations(destination_id, radius_km)
+    # Tra index không gian trong RAM, chỉ xuống DB khi điểm đến chưa có trong index
+    nearby = destination_geo_index.nearby_destination(destination_id, radius_km, attraction_type=attraction_type)
+    if nearby is None:
+        destination_dao = get_destination_dao()
+        nearby = destination_dao.get_nearby_destinations(destination_id, radius_km)
+        if attraction_type:
+            type_key = attraction_type_key(attraction_type)
+            nearby = [d for d in nearby or [] if attraction_type_key(d.get("attraction_type")) == type_key]
 
     if not nearby:
         return json.dumps({
@@ -145,10 +287,11 @@ def get_nearby_attractions_tool(destination_id: str, radius_km: float = 10.0) ->
             "results": []
         }, ensure_ascii=False)
 
-    return json.dumps({"results": nearby}, ensure_ascii=False, indent=2)
+    return serialize_tool_output("get_nearby_attractions", {"results": nearby})
 
 
 @tool(name_or_callable="get_events_and_festivals")
+@traced("tool", TOOL_LATENCY, tool="get_events_and_festivals")
 def get_events_and_festivals_tool(location: str, month: Optional[int] = None) -> str:
     """
     Lấy thông tin sự kiện, lễ hội tại địa phương
@@ -162,7 +305,7 @@ def get_events_and_festivals_tool(location: str, month: Optional[int] = None) ->
     """
     dlog.dlog_i(f"--- get_events_and_festivals: {location}, month={month}")
 
-    destination_dao = DestinationDAO()
+    destination_dao = get_destination_dao()
     events = destination_dao.get_events_by_location(location, month)
 
     if not events:
@@ -171,4 +314,7 @@ def get_events_and_festivals_tool(location: str, month: Optional[int] = None) ->
             "results": []
         }, ensure_ascii=False)
 
-    return json.dumps({"results": events}, ensure_ascii=False, indent=2)
\ No newline at end of file
+    # Câu trả lời có thể được answer cache lưu lại: ghi nhận version sự kiện để kiểm tra khi cache hit
+    cite_events(events)
+    results = [{k: v for k, v in event.items() if k != "updated_at"} for event in events]
+    return serialize_tool_output("get_events_and_festivals", {"results": results})
\ No newline at end of file
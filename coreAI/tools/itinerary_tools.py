@@ -0,0 +1,51 @@
+# app/coreAI/tools/itinerary_tools.py
+import json
+from typing import Optional, List
+from langchain_core.tools import tool
+
+import dlog
+from common_utils.metrics import traced, TOOL_LATENCY
+from coreAI.itinerary_engine import build_itinerary
+from coreAI.retrieval.geo_index import destination_geo_index
+from coreAI.tools.tool_output import serialize_tool_output
+from object_models.tourism_state import ItineraryRequest
+
+
+@tool(
+    name_or_callable="plan_itinerary_route",
+    description="Xếp lịch trình theo ngày (thứ tự tham quan, giờ đến/đi, quãng đường) cho một tỉnh/thành",
+    args_schema=ItineraryRequest
+)
+@traced("tool", TOOL_LATENCY, tool="plan_itinerary_route")
+def plan_itinerary_route_tool(
+        destination: str,
+        duration: int,
+        start_date: str,
+        number_of_people: int = 1,
+        budget: Optional[float] = None,
+        preferences: Optional[List[str]] = None,
+        accommodation_type: Optional[str] = None,
+        transportation: Optional[str] = None
+) -> str:
+    """
+    Lịch trình tối ưu quãng đường: chia ngày theo cụm điểm gần nhau, sắp thứ tự bằng nearest neighbour + 2-opt
+
+    Agent chỉ cần diễn đạt lại kết quả, không tự sắp xếp thứ tự điểm đến.
+
+    Returns:
+        JSON {destination, duration, days: [{day, date, total_km, stops}], unscheduled}
+    """
+    dlog.dlog_i(f"--- plan_itinerary_route: {destination}, {duration} days from {start_date}")
+
+    candidates = destination_geo_index.in_location(destination)
+    if not candidates:
+        return json.dumps({
+            "error": f"Chưa có dữ liệu điểm đến có tọa độ tại {destination}",
+            "suggestion": "Dùng retriever_destination_info để gợi ý điểm đến"
+        }, ensure_ascii=False)
+
+    plan = build_itinerary(destination, duration, start_date, candidates, preferences)
+    return serialize_tool_output("plan_itinerary_route", plan)
+
+
+ITINERARY_PLANNING_TOOLS = [plan_itinerary_route_tool]
@@ -0,0 +1,54 @@
+# app/coreAI/tools/review_tools.py
+import json
+from typing import Optional
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import tool
+
+import dlog
+from common_utils.metrics import traced, TOOL_LATENCY
+from database.review_aggregates import review_aggregator
+from object_models.tourism_state import ReviewRequest
+
+
+@tool(
+    name_or_callable="create_review",
+    description="Ghi đánh giá (1-5 sao, kèm nhận xét) của khách cho điểm đến, tour hoặc khách sạn đã sử dụng",
+    args_schema=ReviewRequest
+)
+@traced("tool", TOOL_LATENCY, tool="create_review")
+def create_review_tool(
+        service_type: str,
+        service_id: int,
+        rating: int,
+        comment: Optional[str] = None,
+        config: RunnableConfig = None
+) -> str:
+    """
+    Ghi review và cập nhật thống kê đánh giá (review_aggregates, cột rating) trong cùng transaction
+
+    customer lấy từ config["configurable"]["customer"].
+
+    Returns:
+        JSON {status: recorded, review_id, rating, review_count} hoặc {status: rejected, message}
+    """
+    configurable = (config or {}).get("configurable") or {}
+    customer_id = configurable.get("customer")
+    dlog.dlog_i(f"--- create_review: {service_type} {service_id} {rating}*, customer={customer_id}")
+
+    if not customer_id:
+        return json.dumps({"status": "rejected", "message": "Khách cần đăng nhập để gửi đánh giá"}, ensure_ascii=False)
+    try:
+        review_id = review_aggregator.record_review(customer_id, service_type, service_id, rating, comment)
+    except ValueError as e:
+        return json.dumps({"status": "rejected", "message": str(e)}, ensure_ascii=False)
+
+    stats = review_aggregator.stats(service_type, service_id) or {}
+    return json.dumps({
+        "status": "recorded",
+        "review_id": review_id,
+        "rating": stats.get("rating"),
+        "review_count": stats.get("review_count"),
+    }, ensure_ascii=False)
+
+
+REVIEW_TOOLS = [create_review_tool]
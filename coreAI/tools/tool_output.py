@@ -0,0 +1,158 @@
+# app/coreAI/tools/tool_output.py
+import json
+import math
+
+import dconfig
+import dlog
+
+TOOL_OUTPUT_TOKEN_BUDGET = int(getattr(dconfig.config_object, "TOOL_OUTPUT_TOKEN_BUDGET", 1500))
+CHARS_PER_TOKEN = 3  # Ước lượng thô cho tiếng Việt
+MIN_DESCRIPTION_CHARS = 80
+
+# Cấu hình theo tool: các trường giữ lại (None = tất cả) và độ dài mô tả tối đa
+TOOL_OUTPUT_SPECS = {
+    "retriever_destination_info": {
+        "fields": ("id", "name", "location", "type", "description", "thumbnail_url", "price_info", "rating",
+                   "review_count", "opening_hours"),
+        "description_chars": 300
+    },
+    "get_destination_details": {"fields": None, "description_chars": 1500},
+    "get_nearby_attractions": {"fields": None, "description_chars": 200},
+    "get_events_and_festivals": {"fields": None, "description_chars": 300},
+    "plan_itinerary_route": {"fields": None, "description_chars": 0},
+    "create_booking": {"fields": None, "description_chars": 0},
+}
+_DEFAULT_SPEC = {"fields": None, "description_chars": 500}
+
+# Các trường lưu JSON dạng text trong DB
+_JSON_TEXT_FIELDS = ("price_info", "contact_info")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _dumps(payload) -> str:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def truncate_text(text, max_chars: int):
+    """Cắt text theo ranh giới từ, thêm '…'"""
+    if not isinstance(text, str) or len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(" ", 1)[0]
+    return cut.rstrip(",.;: ") + "…"
+
+
+def _compact_record(record: dict, fields, description_chars: int) -> dict:
+    compact = {}
+    for key, value in record.items():
+        if fields is not None and key not in fields:
+            continue
+        if value is None or value == "" or value == [] or value == {}:
+            continue
+        if key in _JSON_TEXT_FIELDS and isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+        if key == "description":
+            value = truncate_text(value, description_chars)
+        compact[key] = value
+    return compact
+
+
+def _hoist_common_fields(records: list):
+    """Trường có cùng giá trị ở mọi bản ghi được đưa lên 'common' một lần"""
+    if len(records) < 2 or not all(isinstance(r, dict) for r in records):
+        return {}, records
+    common = {}
+    for key, value in records[0].items():
+        if key == "id" or isinstance(value, (dict, list)):
+            continue
+        if all(r.get(key) == value for r in records[1:]):
+            common[key] = value
+    if not common:
+        return {}, records
+    return common, [{k: v for k, v in r.items() if k not in common} for r in records]
+
+
+def _render(records: list, common: dict, extra: dict, dropped: int) -> str:
+    payload = dict(extra)
+    if common:
+        payload["common"] = common
+    payload["results"] = records
+    if dropped:
+        payload["truncated"] = dropped
+    return _dumps(payload)
+
+
+def serialize_tool_page(tool_name: str, payload, token_budget: int = TOOL_OUTPUT_TOKEN_BUDGET) -> tuple:
+    """
+    Như serialize_tool_output, trả thêm số bản ghi thực sự nằm trong output (sau khi cắt cho vừa budget)
+
+    Returns:
+        (JSON string, số bản ghi)
+    """
+    spec = TOOL_OUTPUT_SPECS.get(tool_name, _DEFAULT_SPEC)
+    baseline = json.dumps(payload, ensure_ascii=False, indent=2, default=str)
+
+    if isinstance(payload, list):
+        extra, records = {}, payload
+    elif isinstance(payload, dict) and isinstance(payload.get("results"), list):
+        extra = {k: v for k, v in payload.items() if k != "results"}
+        records = payload["results"]
+    else:
+        extra, records = None, [payload]
+
+    description_chars = spec["description_chars"]
+    compact = [_compact_record(r, spec["fields"], description_chars) if isinstance(r, dict) else r for r in records]
+
+    shown = len(records)
+    if extra is None:
+        # Một bản ghi: chỉ rút gọn mô tả cho vừa budget
+        output = _dumps(compact[0])
+        while (isinstance(records[0], dict) and estimate_tokens(output) > token_budget
+               and description_chars > MIN_DESCRIPTION_CHARS):
+            description_chars //= 2
+            output = _dumps(_compact_record(records[0], spec["fields"], description_chars))
+    else:
+        common, items = _hoist_common_fields(compact)
+        output = _render(items, common, extra, 0)
+
+        # Rút gọn mô tả trước, sau đó bỏ bớt các bản ghi cuối
+        while estimate_tokens(output) > token_budget and description_chars > MIN_DESCRIPTION_CHARS:
+            description_chars //= 2
+            compact = [_compact_record(r, spec["fields"], description_chars) if isinstance(r, dict) else r
+                       for r in records]
+            common, items = _hoist_common_fields(compact)
+            output = _render(items, common, extra, 0)
+        dropped = 0
+        while estimate_tokens(output) > token_budget and len(items) > 1:
+            items = items[:-1]
+            dropped += 1
+            output = _render(items, common, extra, dropped)
+        shown = len(items)
+
+    saved_bytes = len(baseline.encode("utf-8")) - len(output.encode("utf-8"))
+    saved_tokens = estimate_tokens(baseline) - estimate_tokens(output)
+    dlog.dlog_i(f"--- {tool_name} output: ~{estimate_tokens(output)} tokens, saved {saved_bytes}B (~{saved_tokens} tokens)")
+    return output, shown
+
+
+def serialize_tool_output(tool_name: str, payload, token_budget: int = TOOL_OUTPUT_TOKEN_BUDGET) -> str:
+    """
+    Serialize output của tool gọn nhất có thể cho LLM
+
+    - Không indent, chỉ giữ các trường cần thiết, cắt mô tả
+    - Gộp các trường trùng lặp giữa các bản ghi vào 'common'
+    - Cắt bớt để vừa token_budget
+
+    Args:
+        tool_name: Tên tool (key trong TOOL_OUTPUT_SPECS)
+        payload: list bản ghi, dict có 'results', hoặc dict một bản ghi
+
+    Returns:
+        JSON string
+    """
+    return serialize_tool_page(tool_name, payload, token_budget)[0]
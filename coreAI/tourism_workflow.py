@@ -1,52 +1,98 @@
 # app/coreAI/tourism_workflow.py
-from langgraph.checkpoint.memory import MemorySaver
+import time
+
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import END, StateGraph
 
 import dlog
-from coreAI.agents import (
-    supervisor,
-    hello_node,
-    destination_info_node,
-    itinerary_planning_node,
-    booking_service_node,
-    weather_emergency_node,
-    review_feedback_node,
-    faq_node,
-    human_node,
-    other_node
-)
-from coreAI.agents.agent_supervisor import choose_worker
+from common_utils.metrics import traced_node, trace_turn, metrics_callback, PROCESS_LATENCY, ROUTING_PATHS
+from common_utils.startup import lazy_import
+from coreAI.admission import turn_admission, overloaded_response, OverloadedError
+from coreAI.answer_cache import answer_cache, track_citations, ANSWER_CACHE_ENABLED
+from coreAI.checkpointer import get_checkpointer
+from coreAI.fast_router import fast_router_node, choose_after_router
 from dconfig import config_agents
 from object_models.tourism_state import TourismState
 
 INTERRUPT_BEFORE_AGENTS = [config_agents.AGENT_HUMAN]
+# Node chỉ định tuyến, token LLM của các node này không phải câu trả lời cho khách
+ROUTING_NODES = frozenset({config_agents.AGENT_ROUTER, config_agents.AGENT_SUPERVISOR, config_agents.AGENT_HUMAN})
+# Node trong create_react_agent sinh structured output (JSON), không stream cho khách
+STRUCTURED_OUTPUT_NODES = frozenset({"generate_structured_response"})
+INTERRUPT_KEY = "__interrupt__"
+
+
+def _lazy_agent(module_name: str, attribute: str):
+    """
+    Node/hàm của agent, chỉ import module agent (LangChain, LLM client, ...) khi được gọi lần đầu
+
+    Warm-up lúc khởi động import trước để lượt đầu tiên không bị chậm.
+    """
+    def _call(state):
+        return getattr(lazy_import(module_name), attribute)(state)
+
+    _call.__name__ = attribute
+    return _call
+
+
+choose_worker = _lazy_agent("coreAI.agents.agent_supervisor", "choose_worker")
 
 
 class TourismAgentWorkflow:
     """Workflow quản lý các agent du lịch"""
 
-    def __init__(self):
-        self.chain = self.build_graph()
+    def __init__(self, nodes: dict = None, checkpointer=None):
+        self.chain = self.build_graph(nodes=nodes, checkpointer=checkpointer)
 
     @staticmethod
-    def build_graph():
-        """Xây dựng graph workflow"""
+    def default_nodes() -> dict:
+        """Các node mặc định: tên agent -> hàm node"""
+        return {
+            config_agents.AGENT_ROUTER: fast_router_node,
+            config_agents.AGENT_SUPERVISOR: _lazy_agent("coreAI.agents", "supervisor"),
+            config_agents.AGENT_HELLO: _lazy_agent("coreAI.agents", "hello_node"),
+            config_agents.AGENT_DESTINATION_INFO: _lazy_agent("coreAI.agents", "destination_info_node"),
+            config_agents.AGENT_ITINERARY_PLANNING: _lazy_agent("coreAI.agents", "itinerary_planning_node"),
+            config_agents.AGENT_BOOKING_SERVICE: _lazy_agent("coreAI.agents", "booking_service_node"),
+            config_agents.AGENT_WEATHER_EMERGENCY: _lazy_agent("coreAI.agents", "weather_emergency_node"),
+            config_agents.AGENT_REVIEW_FEEDBACK: _lazy_agent("coreAI.agents", "review_feedback_node"),
+            config_agents.AGENT_FAQ: _lazy_agent("coreAI.agents", "faq_node"),
+            config_agents.AGENT_HUMAN: _lazy_agent("coreAI.agents", "human_node"),
+            config_agents.AGENT_OTHER: _lazy_agent("coreAI.agents", "other_node"),
+        }
+
+    @staticmethod
+    def build_graph(nodes: dict = None, checkpointer=None):
+        """
+        Xây dựng graph workflow
+
+        Args:
+            nodes: Thay thế một số node (vd. bản giả lập khi benchmark)
+            checkpointer: Checkpointer, mặc định get_checkpointer() (SQLite dùng chung giữa các worker)
+        """
         workflow = StateGraph(TourismState)
 
         # Add nodes
-        workflow.add_node(config_agents.AGENT_SUPERVISOR, supervisor)
-        workflow.add_node(config_agents.AGENT_HELLO, hello_node)
-        workflow.add_node(config_agents.AGENT_DESTINATION_INFO, destination_info_node)
-        workflow.add_node(config_agents.AGENT_ITINERARY_PLANNING, itinerary_planning_node)
-        workflow.add_node(config_agents.AGENT_BOOKING_SERVICE, booking_service_node)
-        workflow.add_node(config_agents.AGENT_WEATHER_EMERGENCY, weather_emergency_node)
-        workflow.add_node(config_agents.AGENT_REVIEW_FEEDBACK, review_feedback_node)
-        workflow.add_node(config_agents.AGENT_FAQ, faq_node)
-        workflow.add_node(config_agents.AGENT_HUMAN, human_node)
-        workflow.add_node(config_agents.AGENT_OTHER, other_node)
+        all_nodes = TourismAgentWorkflow.default_nodes()
+        all_nodes.update(nodes or {})
+        for name, node in all_nodes.items():
+            workflow.add_node(name, traced_node(name, node))
 
         # Set entry point
-        workflow.set_entry_point(config_agents.AGENT_SUPERVISOR)
+        workflow.set_entry_point(config_agents.AGENT_ROUTER)
+
+        # Fast-path router: câu rõ ràng đi thẳng, còn lại qua supervisor
+        workflow.add_conditional_edges(
+            config_agents.AGENT_ROUTER,
+            choose_after_router,
+            {
+                config_agents.AGENT_SUPERVISOR: config_agents.AGENT_SUPERVISOR,
+                config_agents.AGENT_HELLO: config_agents.AGENT_HELLO,
+                config_agents.AGENT_WEATHER_EMERGENCY: config_agents.AGENT_WEATHER_EMERGENCY,
+                config_agents.AGENT_FAQ: config_agents.AGENT_FAQ,
+                "END": END
+            }
+        )
 
         # Supervisor routing
         workflow.add_conditional_edges(
@@ -124,13 +170,50 @@ class TourismAgentWorkflow:
             }
         )
 
-        # Compile with memory
-        memory = MemorySaver()
+        # Checkpointer dùng chung giữa các worker (xem CHECKPOINT_BACKEND)
         return workflow.compile(
-            checkpointer=memory,
+            checkpointer=checkpointer or get_checkpointer(),
             interrupt_before=INTERRUPT_BEFORE_AGENTS
         )
 
+    @staticmethod
+    def _build_input(message: str, history: list, thread_id: str, customer: int, customer_location: str = None):
+        """Tạo input cho workflow"""
+        return {
+            "human_message": message,
+            "thread_id": thread_id,
+            "messages": history,
+            "customer": customer,
+            "customer_location": customer_location or "Hà Nội, Việt Nam",
+            "customer_language": "vi"  # TODO: Detect language
+        }
+
+    @staticmethod
+    def _is_interrupted(current_state) -> bool:
+        """Thread đang dừng trước agent interrupt (HUMAN)"""
+        return len(current_state.next) > 0 and current_state.next[0] in INTERRUPT_BEFORE_AGENTS
+
+    @staticmethod
+    def _store_answer(message: str, response: dict, started: float, cited_events=None):
+        """Lưu câu trả lời cuối vào answer cache (chỉ lượt đầu của thread, bỏ qua lượt trả từ cache/đang chờ HUMAN)"""
+        if not ANSWER_CACHE_ENABLED or response.get("answer_cached") or not response.get("answer_cacheable"):
+            return
+        if response.get("next_agent") == config_agents.AGENT_HUMAN:
+            return
+        try:
+            answer_cache.store(
+                message,
+                agent=response.get("current_agent"),
+                ai_message=response.get("ai_message"),
+                destination_details=response.get("destination_details"),
+                customer_location=response.get("customer_location"),
+                customer_language=response.get("customer_language"),
+                latency=time.monotonic() - started,
+                event_versions=cited_events
+            )
+        except Exception as e:
+            dlog.dlog_e(f"Answer cache store error: {e}")
+
     def process(self, message: str, history: list, thread_id: str, customer: int, customer_location: str = None):
         """
         Xử lý tin nhắn từ khách hàng
@@ -146,32 +229,142 @@ class TourismAgentWorkflow:
             Response từ agent
         """
         dlog.dlog_i(f"Processing message: {message}")
+        started = time.monotonic()
 
-        from langchain_core.runnables import RunnableConfig
+        # Các lượt cùng thread chạy lần lượt, số lượt chạy đồng thời bị giới hạn
+        try:
+            turn_admission.acquire(thread_id)
+        except OverloadedError as e:
+            return overloaded_response(e)
+        try:
+            return self._process_turn(message, history, thread_id, customer, customer_location, started)
+        finally:
+            turn_admission.release(thread_id)
 
-        input_data = {
-            "human_message": message,
-            "thread_id": thread_id,
-            "messages": history,
-            "customer": customer,
-            "customer_location": customer_location or "Hà Nội, Việt Nam",
-            "customer_language": "vi"  # TODO: Detect language
+    def _process_turn(self, message: str, history: list, thread_id: str, customer: int, customer_location: str,
+                      started: float):
+        """Chạy một lượt hội thoại (đã được cấp lượt bởi turn_admission)"""
+        input_data = self._build_input(message, history, thread_id, customer, customer_location)
+        config: RunnableConfig = {
+            "configurable": {"thread_id": thread_id, "customer": customer},
+            "callbacks": [metrics_callback]
         }
 
-        config: RunnableConfig = {"configurable": {"thread_id": thread_id}}
+        with trace_turn(), track_citations() as cited_events:
+            # Check if need to resume from interrupt
+            current_state = self.chain.get_state(config)
+            if self._is_interrupted(current_state):
+                self.chain.update_state(
+                    config=config,
+                    values=input_data,
+                    as_node=current_state.values["current_agent"]
+                )
+                input_data = None
+
+            # Invoke workflow
+            resumed = input_data is None
+            response = self.chain.invoke(input=input_data, config=config, stream_mode="values")
+            if not resumed:
+                self._store_answer(message, response, started, cited_events)
+
+        dlog.dlog_i(f"Agent response: {response.get('ai_message', '')}")
+        return response
+
+    async def astream_process(self, message: str, history: list, thread_id: str, customer: int,
+                              customer_location: str = None):
+        """
+        Xử lý tin nhắn bất đồng bộ, stream sự kiện cho SSE/websocket
+
+        Yields:
+            {"event": "node", "node": ...}: Agent vừa chạy xong
+            {"event": "token", "node": ..., "content": ...}: Token câu trả lời từ agent trả lời khách
+            {"event": "interrupt", "interrupts": [...]}: Workflow dừng chờ HUMAN
+            {"event": "end", "response": ...}: State cuối cùng
+        """
+        dlog.dlog_i(f"Processing message (async): {message}")
+        started = time.monotonic()
+
+        try:
+            async with turn_admission.aturn(thread_id):
+                async for event in self._astream_turn(message, history, thread_id, customer, customer_location,
+                                                      started):
+                    yield event
+        except OverloadedError as e:
+            yield {"event": "end", "response": overloaded_response(e)}
+
+    async def _astream_turn(self, message: str, history: list, thread_id: str, customer: int,
+                            customer_location: str, started: float):
+
+        input_data = self._build_input(message, history, thread_id, customer, customer_location)
+        config: RunnableConfig = {
+            "configurable": {"thread_id": thread_id, "customer": customer},
+            "callbacks": [metrics_callback]
+        }
 
         # Check if need to resume from interrupt
-        current_state = self.chain.get_state(config)
-        if len(current_state.next) > 0 and current_state.next[0] in INTERRUPT_BEFORE_AGENTS:
-            self.chain.update_state(
+        current_state = await self.chain.aget_state(config)
+        if self._is_interrupted(current_state):
+            await self.chain.aupdate_state(
                 config=config,
                 values=input_data,
                 as_node=current_state.values["current_agent"]
             )
             input_data = None
 
-        # Invoke workflow
-        response = self.chain.invoke(input=input_data, config=config, stream_mode="values")
+        resumed = input_data is None
+        response = {}
+        path = []
+        with track_citations() as cited_events:
+            async for namespace, mode, chunk in self.chain.astream(
+                    input=input_data,
+                    config=config,
+                    stream_mode=["updates", "messages", "values"],
+                    subgraphs=True
+            ):
+                if mode == "messages":
+                    message_chunk, metadata = chunk
+                    node = self._answer_node(namespace, metadata)
+                    content = getattr(message_chunk, "content", None)
+                    if node is not None and isinstance(content, str) and content \
+                            and not getattr(message_chunk, "tool_call_chunks", None):
+                        yield {"event": "token", "node": node, "content": content}
+                elif namespace:
+                    # updates/values của graph agent lồng bên trong node
+                    continue
+                elif mode == "updates":
+                    for node, update in chunk.items():
+                        if node == INTERRUPT_KEY:
+                            yield {"event": "interrupt", "interrupts": [getattr(i, "value", i) for i in update]}
+                            continue
+                        path.append(node)
+                        yield {"event": "node", "node": node}
+                elif mode == "values":
+                    response = chunk
 
+        if not resumed:
+            self._store_answer(message, response, started, cited_events)
+        PROCESS_LATENCY.observe(time.monotonic() - started)
+        if path:
+            ROUTING_PATHS.inc(path="→".join(path))
         dlog.dlog_i(f"Agent response: {response.get('ai_message', '')}")
-        return response
\ No newline at end of file
+        yield {"event": "end", "response": response}
+
+    @staticmethod
+    def _answer_node(namespace: tuple, metadata: dict):
+        """Node trả lời khách sinh ra token, None nếu token thuộc routing/tool call/structured output"""
+        # namespace: ("DESTINATION_INFO:<task_id>", ...) khi token đến từ graph agent lồng bên trong node
+        node = namespace[0].split(":", 1)[0] if namespace else metadata.get("langgraph_node")
+        if node is None or node in ROUTING_NODES:
+            return None
+        if namespace and metadata.get("langgraph_node") in STRUCTURED_OUTPUT_NODES:
+            return None
+        return node
+
+    async def aprocess(self, message: str, history: list, thread_id: str, customer: int,
+                       customer_location: str = None):
+        """Phiên bản async của process, trả về state cuối cùng"""
+        response = {}
+        async for event in self.astream_process(message, history, thread_id, customer, customer_location):
+            if event["event"] == "end":
+                response = event["response"]
+        return response
@@ -0,0 +1,543 @@
+# app/database/booking_engine.py
+import hashlib
+import json
+import queue
+import re
+import secrets
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import dconfig
+import dlog
+from common_utils.metrics import registry
+from common_utils.single_flight import SingleFlight
+from common_utils.text_utils import normalize_text
+
+_config = dconfig.config_object
+
+# Kết quả đặt chỗ được giữ để trả lại ngay cho các lần gửi trùng (chat retry)
+BOOKING_IDEMPOTENCY_TTL = float(getattr(_config, "BOOKING_IDEMPOTENCY_TTL", 24 * 3600))
+BOOKING_IDEMPOTENCY_MAX_KEYS = int(getattr(_config, "BOOKING_IDEMPOTENCY_MAX_KEYS", 100000))
+# Group commit: gom các booking trong BOOKING_BATCH_WINDOW giây, tối đa BOOKING_BATCH_SIZE mỗi transaction
+BOOKING_BATCH_SIZE = int(getattr(_config, "BOOKING_BATCH_SIZE", 200))
+BOOKING_BATCH_WINDOW = float(getattr(_config, "BOOKING_BATCH_WINDOW", 0.005))
+BOOKING_COMMIT_TIMEOUT = float(getattr(_config, "BOOKING_COMMIT_TIMEOUT", 8.0))
+BOOKING_MAX_RETRIES = int(getattr(_config, "BOOKING_MAX_RETRIES", 5))
+BOOKING_CONFIRMATION_URL = getattr(_config, "BOOKING_CONFIRMATION_URL", None)
+
+BOOKING_ATTEMPTS = registry.counter("tourism_booking_attempts_total", "Số lần đặt chỗ theo kết quả")
+BOOKING_BATCH = registry.histogram(
+    "tourism_booking_batch_size", "Số booking trong mỗi lần group commit", buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500)
+)
+BOOKING_COMMIT_LATENCY = registry.histogram("tourism_booking_commit_seconds", "Thời gian một lần group commit")
+
+_PHONE_RE = re.compile(r"\D+")
+_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y")
+_ER_DUP_ENTRY = 1062
+# Các trường của BookingRequest tạo nên idempotency key
+_KEY_FIELDS = ("service_type", "service_id", "check_in", "check_out", "number_of_people",
+               "customer_name", "customer_phone", "customer_email", "special_requests", "payment_method")
+
+_BOOKING_COLUMNS = ("booking_id", "idempotency_key", "customer_id", "service_type", "service_id", "check_in",
+                    "check_out", "number_of_people", "total_price", "customer_name", "customer_phone",
+                    "customer_email", "special_requests", "payment_method", "confirmation_link")
+
+
+class BookingRejected(Exception):
+    """Không thể đặt chỗ (hết chỗ, tour không tồn tại, ...)"""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+        self.message = message
+
+
+class _Conflict(Exception):
+    """Bản ghi trùng idempotency_key được worker khác ghi giữa chừng, chạy lại cả batch"""
+
+
+def _parse_date(value, field: str):
+    """
+    Ngày đặt chỗ (YYYY-MM-DD, chấp nhận thêm DD/MM/YYYY) -> date
+
+    Raises:
+        BookingRejected: Ngày không hợp lệ
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise BookingRejected("invalid_date", f"Ngày {field} '{value}' không hợp lệ, vui lòng dùng dạng YYYY-MM-DD")
+
+
+def _normalize_request(request: dict) -> dict:
+    """Chuẩn hóa ngày về YYYY-MM-DD trước khi tính idempotency key và giữ chỗ"""
+    check_in = _parse_date(request.get("check_in"), "check_in")
+    if check_in is None:
+        raise BookingRejected("invalid_date", "Thiếu ngày check_in")
+    check_out = _parse_date(request.get("check_out"), "check_out")
+    if check_out is not None and check_out < check_in:
+        raise BookingRejected("invalid_date", f"Ngày check_out {check_out} trước ngày check_in {check_in}")
+    return {
+        **request,
+        "check_in": check_in.isoformat(),
+        "check_out": check_out.isoformat() if check_out is not None else None,
+    }
+
+
+def idempotency_key(thread_id, request: dict) -> str:
+    """Key từ thread_id + nội dung yêu cầu đã chuẩn hóa: cùng yêu cầu gửi lại cho cùng key"""
+    canonical = {}
+    for field in _KEY_FIELDS:
+        value = request.get(field)
+        if field == "customer_phone" and value:
+            value = _PHONE_RE.sub("", str(value))
+        elif isinstance(value, str):
+            value = normalize_text(value)
+        canonical[field] = value
+    payload = json.dumps([str(thread_id or ""), canonical], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:40]
+
+
+def _new_booking_id() -> str:
+    return f"BK{datetime.now():%y%m%d}{secrets.token_hex(4).upper()}"
+
+
+class MySQLBookingStore:
+    """Các thao tác MySQL của booking engine (bảng tours, tour_capacity, bookings)"""
+
+    def __init__(self, get_pool=None):
+        if get_pool is None:
+            from database.pools import get_mysql_pool as get_pool
+        self._get_pool = get_pool
+
+    @contextmanager
+    def transaction(self):
+        with self._get_pool().connection() as conn:
+            conn.begin()
+            try:
+                with conn.cursor() as cursor:
+                    yield cursor
+            except Exception:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def load_capacity(self, tour_id, travel_date):
+        """
+        Sức chứa của tour theo ngày, tạo dòng tour_capacity từ tours.max_participants nếu chưa có
+
+        Returns:
+            dict {price, capacity, booked, version} (capacity None = không giới hạn), None nếu tour không tồn tại
+        """
+        with self.transaction() as cursor:
+            cursor.execute(
+                "SELECT price, max_participants FROM tours WHERE id = %s AND status = 'active'", (tour_id,)
+            )
+            tour = cursor.fetchone()
+            if tour is None:
+                return None
+            if tour["max_participants"] is None:
+                return {"price": tour["price"], "capacity": None, "booked": 0, "version": 0}
+            # Không dùng INSERT IGNORE: nó nuốt cả lỗi khác ngoài trùng khóa (FK, giá trị sai kiểu, ...)
+            cursor.execute(
+                "INSERT INTO tour_capacity (tour_id, travel_date, capacity, booked, version) "
+                "VALUES (%s, %s, %s, 0, 0) ON DUPLICATE KEY UPDATE tour_id = tour_id",
+                (tour_id, travel_date, tour["max_participants"])
+            )
+            cursor.execute(
+                "SELECT capacity, booked, version FROM tour_capacity WHERE tour_id = %s AND travel_date = %s",
+                (tour_id, travel_date)
+            )
+            row = cursor.fetchone()
+        return {"price": tour["price"], **row}
+
+    @staticmethod
+    def existing_bookings(cursor, keys: list) -> dict:
+        """idempotency_key -> booking đã ghi"""
+        if not keys:
+            return {}
+        cursor.execute(
+            "SELECT idempotency_key, booking_id, total_price, confirmation_link, booking_status FROM bookings "
+            f"WHERE idempotency_key IN ({', '.join(['%s'] * len(keys))})",
+            keys
+        )
+        return {row["idempotency_key"]: row for row in cursor.fetchall()}
+
+    @staticmethod
+    def add_booked(cursor, tour_id, travel_date, people: int, version: int) -> bool:
+        """Cộng số chỗ đã đặt nếu version chưa đổi và còn đủ chỗ (optimistic concurrency)"""
+        cursor.execute(
+            "UPDATE tour_capacity SET booked = booked + %s, version = version + 1 "
+            "WHERE tour_id = %s AND travel_date = %s AND version = %s AND booked + %s <= capacity",
+            (people, tour_id, travel_date, version, people)
+        )
+        return cursor.rowcount == 1
+
+    @staticmethod
+    def read_capacity(cursor, tour_id, travel_date) -> dict:
+        # Locking read: đọc bản mới nhất thay vì snapshot của transaction
+        cursor.execute(
+            "SELECT capacity, booked, version FROM tour_capacity WHERE tour_id = %s AND travel_date = %s FOR UPDATE",
+            (tour_id, travel_date)
+        )
+        return cursor.fetchone()
+
+    @staticmethod
+    def insert_bookings(cursor, rows: list) -> int:
+        """
+        Insert nhiều booking một lần (INSERT thường, không IGNORE để lỗi dữ liệu không bị nuốt thành warning)
+
+        Raises:
+            _Conflict: idempotency_key đã được worker khác ghi giữa chừng
+        """
+        import pymysql
+
+        try:
+            cursor.executemany(
+                f"INSERT INTO bookings ({', '.join(_BOOKING_COLUMNS)}) "
+                f"VALUES ({', '.join(['%s'] * len(_BOOKING_COLUMNS))})",
+                [tuple(row[column] for column in _BOOKING_COLUMNS) for row in rows]
+            )
+        except pymysql.err.IntegrityError as e:
+            if e.args and e.args[0] == _ER_DUP_ENTRY and "idempotency_key" in str(e.args[-1]):
+                raise _Conflict() from e
+            raise
+        return cursor.rowcount
+
+
+class _Capacity:
+    """Sức chứa của một tour/ngày trong RAM: booked theo DB (kèm version) + số chỗ đang giữ chờ commit"""
+
+    __slots__ = ("price", "capacity", "booked", "version", "reserved", "lock")
+
+    def __init__(self, price, capacity, booked, version):
+        self.price = price
+        self.capacity = capacity
+        self.booked = booked
+        self.version = version
+        self.reserved = 0
+        self.lock = threading.Lock()
+
+    def remaining(self) -> int:
+        return self.capacity - self.booked - self.reserved
+
+    def try_reserve(self, people: int) -> bool:
+        with self.lock:
+            if self.capacity is not None and self.remaining() < people:
+                return False
+            self.reserved += people
+            return True
+
+    def release(self, people: int):
+        with self.lock:
+            self.reserved -= people
+
+
+class _PendingBooking:
+    __slots__ = ("row", "capacity_key", "future")
+
+    def __init__(self, row, capacity_key):
+        self.row = row
+        self.capacity_key = capacity_key
+        self.future = Future()
+
+
+class BookingEngine:
+    """
+    Đường ghi booking chịu tải cao (flash sale)
+
+    - Idempotency key = thread_id + nội dung BookingRequest; gửi trùng trả lại kết quả cũ trong O(1), không xuống DB
+    - Chỗ còn lại theo tour/ngày giữ trong RAM, hết chỗ thì từ chối ngay; khi commit đối chiếu với MySQL
+      bằng optimistic concurrency (cột version) nên nhiều worker không thể bán vượt sức chứa
+    - Booking hợp lệ được group commit: một transaction cho cả batch, insert nhiều dòng một lần
+    """
+
+    def __init__(self, store=None, batch_size: int = BOOKING_BATCH_SIZE, batch_window: float = BOOKING_BATCH_WINDOW,
+                 commit_timeout: float = BOOKING_COMMIT_TIMEOUT):
+        self.store = store or MySQLBookingStore()
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.commit_timeout = commit_timeout
+
+        self._results = SingleFlight("booking", ttl=BOOKING_IDEMPOTENCY_TTL, max_results=BOOKING_IDEMPOTENCY_MAX_KEYS)
+        self._capacity_loads = SingleFlight("tour_capacity")
+        self._capacities = {}
+        self._queue = queue.Queue()
+        self._committer = None
+        self._lock = threading.Lock()
+
+        self.committed = 0
+        self.batches = 0
+
+    # ----- Sức chứa -----
+
+    def _capacity(self, tour_id, travel_date) -> _Capacity:
+        key = (str(tour_id), str(travel_date))
+        capacity = self._capacities.get(key)
+        if capacity is None:
+            capacity = self._capacity_loads.do(key, self._load_capacity, key)
+        return capacity
+
+    def _load_capacity(self, key) -> _Capacity:
+        capacity = self._capacities.get(key)
+        if capacity is not None:
+            return capacity
+        row = self.store.load_capacity(*key)
+        if row is None:
+            raise BookingRejected("not_found", f"Không tìm thấy tour {key[0]} đang mở bán")
+        capacity = _Capacity(row["price"], row["capacity"], row["booked"], row["version"])
+        self._capacities[key] = capacity
+        return capacity
+
+    def invalidate(self, tour_id=None, travel_date=None):
+        """Bỏ sức chứa đã nạp (vd. sau khi admin đổi max_participants), lần đặt sau đọc lại DB"""
+        with self._lock:
+            for key in list(self._capacities):
+                if (tour_id is None or key[0] == str(tour_id)) and (travel_date is None or key[1] == str(travel_date)):
+                    del self._capacities[key]
+
+    # ----- API -----
+
+    def book(self, thread_id, customer_id, request: dict) -> dict:
+        """
+        Đặt chỗ (chặn tới khi batch chứa booking được commit)
+
+        Returns:
+            dict {status: confirmed|rejected, booking_id, duplicate, ...}
+        """
+        if not customer_id:
+            # Không ghi booking vô chủ (customer_id = 0): khách phải đăng nhập trước khi đặt
+            BOOKING_ATTEMPTS.inc(outcome="login_required")
+            return {"status": "rejected", "reason": "login_required", "message": "Khách cần đăng nhập để đặt dịch vụ"}
+        try:
+            request = _normalize_request(request)
+        except BookingRejected as e:
+            BOOKING_ATTEMPTS.inc(outcome=e.reason)
+            return {"status": "rejected", "reason": e.reason, "message": e.message}
+
+        key = idempotency_key(thread_id, request)
+        executed = []
+
+        def _run():
+            executed.append(True)
+            return self._book(key, customer_id, request)
+
+        try:
+            result = self._results.do(key, _run)
+        except BookingRejected as e:
+            BOOKING_ATTEMPTS.inc(outcome=e.reason)
+            return {"status": "rejected", "reason": e.reason, "message": e.message}
+
+        duplicate = not executed or result.get("duplicate", False)
+        BOOKING_ATTEMPTS.inc(outcome="duplicate" if duplicate else "confirmed")
+        return {**result, "duplicate": duplicate}
+
+    def _book(self, key: str, customer_id, request: dict) -> dict:
+        people = int(request.get("number_of_people") or 1)
+        capacity_key = None
+        total_price = None
+
+        if request.get("service_type") == "tour" and request.get("service_id"):
+            # check_in đã chuẩn hóa về YYYY-MM-DD nên "2026-10-20" và "20/10/2026" dùng chung bộ đếm
+            capacity_key = (str(request["service_id"]), str(request["check_in"]))
+            capacity = self._capacity(*capacity_key)
+            if not capacity.try_reserve(people):
+                raise BookingRejected("sold_out", f"Tour đã hết chỗ ngày {request['check_in']}")
+            if capacity.price is not None:
+                total_price = float(capacity.price) * people
+
+        booking_id = _new_booking_id()
+        row = {
+            **{column: request.get(column) for column in _BOOKING_COLUMNS},
+            "booking_id": booking_id,
+            "idempotency_key": key,
+            "customer_id": customer_id,
+            "number_of_people": people,
+            "total_price": total_price,
+            "confirmation_link": f"{BOOKING_CONFIRMATION_URL.rstrip('/')}/{booking_id}" if BOOKING_CONFIRMATION_URL else None,
+        }
+        pending = _PendingBooking(row, capacity_key)
+        self._ensure_committer()
+        self._queue.put(pending)
+        try:
+            return pending.future.result(timeout=self.commit_timeout)
+        except TimeoutError:
+            # Booking vẫn có thể được commit sau đó; lần gửi lại sẽ thấy qua idempotency_key trong DB
+            raise BookingRejected("timeout", "Hệ thống đặt chỗ đang bận, bạn vui lòng thử lại sau ít phút")
+
+    # ----- Group commit -----
+
+    def _ensure_committer(self):
+        if self._committer is None:
+            with self._lock:
+                if self._committer is None:
+                    self._committer = threading.Thread(target=self._commit_loop, name="booking-committer", daemon=True)
+                    self._committer.start()
+
+    def _commit_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch: list):
+        start = time.monotonic()
+        BOOKING_BATCH.observe(len(batch))
+        outcomes = None
+        for _ in range(BOOKING_MAX_RETRIES):
+            try:
+                outcomes = self._commit_once(batch)
+                break
+            except _Conflict:
+                continue
+            except Exception as e:
+                dlog.dlog_e(f"Booking commit error ({len(batch)} bookings): {e}")
+                outcomes = {id(p): e for p in batch}
+                break
+        if outcomes is None:
+            outcomes = {id(p): BookingRejected("conflict", "Không thể đặt chỗ lúc này, vui lòng thử lại") for p in batch}
+
+        for pending in batch:
+            outcome = outcomes[id(pending)]
+            capacity = self._capacities.get(pending.capacity_key) if pending.capacity_key else None
+            if capacity is not None:
+                capacity.release(pending.row["number_of_people"])
+            if isinstance(outcome, Exception):
+                pending.future.set_exception(outcome)
+            else:
+                pending.future.set_result(outcome)
+
+        self.batches += 1
+        BOOKING_COMMIT_LATENCY.observe(time.monotonic() - start)
+
+    def _commit_once(self, batch: list) -> dict:
+        """Một transaction cho cả batch; trả về id(pending) -> kết quả hoặc exception"""
+        outcomes = {}
+        with self.store.transaction() as cursor:
+            # Trùng với booking đã ghi (worker khác, hoặc trước khi restart)
+            existing = self.store.existing_bookings(cursor, [p.row["idempotency_key"] for p in batch])
+            accepted = []
+            for pending in batch:
+                row = existing.get(pending.row["idempotency_key"])
+                if row is not None:
+                    outcomes[id(pending)] = {**self._result(pending.row), **row, "duplicate": True}
+                    outcomes[id(pending)].pop("idempotency_key", None)
+                else:
+                    accepted.append(pending)
+
+            # Cộng booked theo từng tour/ngày, bỏ các booking cuối batch nếu DB báo không đủ chỗ
+            by_capacity = {}
+            for pending in accepted:
+                if pending.capacity_key is not None:
+                    by_capacity.setdefault(pending.capacity_key, []).append(pending)
+            rejected = set()
+            applied = []
+            for capacity_key, group in by_capacity.items():
+                fitted = self._apply_capacity(cursor, capacity_key, group)
+                applied.append((capacity_key, sum(p.row["number_of_people"] for p in fitted)))
+                for pending in group[len(fitted):]:
+                    rejected.add(id(pending))
+                    outcomes[id(pending)] = BookingRejected("sold_out", "Tour đã hết chỗ ngày "
+                                                                         f"{pending.row['check_in']}")
+
+            rows = [p.row for p in accepted if id(p) not in rejected]
+            if rows:
+                self.store.insert_bookings(cursor, rows)
+
+        for capacity_key, people in applied:
+            capacity = self._capacities.get(capacity_key)
+            if capacity is not None:
+                with capacity.lock:
+                    capacity.booked += people
+                    capacity.version += 1
+        for pending in accepted:
+            if id(pending) not in rejected:
+                outcomes[id(pending)] = self._result(pending.row)
+        self.committed += len(rows)
+        return outcomes
+
+    def _apply_capacity(self, cursor, capacity_key, group: list) -> list:
+        """Ghi số chỗ của group vào tour_capacity, trả về các booking (đầu group) được chấp nhận"""
+        capacity = self._capacities.get(capacity_key)
+        if capacity is None or capacity.capacity is None:
+            return group
+        version = capacity.version
+        fitted = group
+        for _ in range(BOOKING_MAX_RETRIES):
+            people = sum(p.row["number_of_people"] for p in fitted)
+            if not fitted or self.store.add_booked(cursor, *capacity_key, people, version):
+                return fitted
+            # Worker khác đã ghi: đọc lại và đồng bộ bộ đếm trong RAM
+            row = self.store.read_capacity(cursor, *capacity_key)
+            with capacity.lock:
+                capacity.capacity, capacity.booked, version = row["capacity"], row["booked"], row["version"]
+                capacity.version = version
+            available = row["capacity"] - row["booked"]
+            fitted = []
+            for pending in group:
+                if pending.row["number_of_people"] > available:
+                    break
+                available -= pending.row["number_of_people"]
+                fitted.append(pending)
+        raise _Conflict()
+
+    @staticmethod
+    def _result(row: dict) -> dict:
+        return {
+            "status": "confirmed",
+            "booking_id": row["booking_id"],
+            "service_type": row["service_type"],
+            "service_id": row["service_id"],
+            "check_in": row["check_in"],
+            "check_out": row["check_out"],
+            "number_of_people": row["number_of_people"],
+            "total_price": row["total_price"],
+            "confirmation_link": row["confirmation_link"],
+        }
+
+    def stats(self) -> dict:
+        return {
+            "tours_loaded": len(self._capacities),
+            "queued": self._queue.qsize(),
+            "committed": self.committed,
+            "batches": self.batches,
+        }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_booking_engine() -> BookingEngine:
+    """BookingEngine dùng chung cho toàn process"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = BookingEngine()
+                registry.register_collector(
+                    "tourism_booking_engine",
+                    "Trạng thái booking engine",
+                    lambda: [({"stat": key}, value) for key, value in _engine.stats().items()]
+                )
+    return _engine
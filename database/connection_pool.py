@@ -0,0 +1,175 @@
+# app/database/connection_pool.py
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import dlog
+
+
+class PoolTimeoutError(Exception):
+    """Hết thời gian chờ lấy connection từ pool"""
+
+
+class _PooledConnection:
+    """Connection kèm thời điểm tạo để recycle"""
+
+    __slots__ = ("raw", "created_at")
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+
+
+class ConnectionPool:
+    """
+    Pool connection có giới hạn, dùng chung cho Milvus/MySQL
+
+    Args:
+        name: Tên pool (dùng cho log/metrics)
+        create: Hàm tạo connection mới
+        close: Hàm đóng connection
+        ping: Hàm health check, trả về True nếu connection còn dùng được
+        max_size: Số connection tối đa
+        timeout: Thời gian chờ tối đa khi pool đầy (giây)
+        recycle: Tuổi tối đa của connection (giây), <= 0 để tắt
+    """
+
+    def __init__(self, name, create, close, ping=None, max_size=10, timeout=5.0, recycle=3600):
+        self.name = name
+        self._create = create
+        self._close = close
+        self._ping = ping
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._closed = False
+
+        # Metrics
+        self._checkouts = 0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _new_connection(self):
+        conn = _PooledConnection(self._create())
+        with self._lock:
+            self._created += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            self._close(conn.raw)
+        except Exception as e:
+            dlog.dlog_e(f"[{self.name}] close connection error: {e}")
+        with self._lock:
+            self._size -= 1
+
+    def _is_usable(self, conn):
+        if self.recycle > 0 and time.monotonic() - conn.created_at > self.recycle:
+            with self._lock:
+                self._recycled += 1
+            return False
+        if self._ping is not None:
+            try:
+                return bool(self._ping(conn.raw))
+            except Exception:
+                return False
+        return True
+
+    def acquire(self):
+        """Lấy connection từ pool, tạo mới nếu còn slot"""
+        if self._closed:
+            raise RuntimeError(f"Pool {self.name} đã đóng")
+
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = None
+                with self._lock:
+                    can_create = self._size < self.max_size
+                    if can_create:
+                        self._size += 1
+                if can_create:
+                    try:
+                        conn = self._new_connection()
+                    except Exception:
+                        with self._lock:
+                            self._size -= 1
+                        raise
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        with self._lock:
+                            self._timeouts += 1
+                        raise PoolTimeoutError(f"Pool {self.name} hết connection sau {self.timeout}s")
+                    try:
+                        conn = self._idle.get(timeout=remaining)
+                    except queue.Empty:
+                        continue
+
+            if not self._is_usable(conn):
+                self._discard(conn)
+                continue
+
+            waited = time.monotonic() - start
+            with self._lock:
+                self._checkouts += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            return conn
+
+    def release(self, conn, broken=False):
+        """Trả connection về pool"""
+        if broken or self._closed:
+            self._discard(conn)
+        else:
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Context manager lấy/trả connection"""
+        conn = self.acquire()
+        try:
+            yield conn.raw
+        except Exception:
+            self.release(conn, broken=True)
+            raise
+        else:
+            self.release(conn)
+
+    def close(self):
+        """Đóng toàn bộ connection đang rảnh"""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+        dlog.dlog_i(f"[{self.name}] pool closed")
+
+    def stats(self):
+        """Metrics của pool: số connection, checkout, thời gian chờ"""
+        with self._lock:
+            return {
+                "name": self.name,
+                "size": self._size,
+                "idle": self._idle.qsize(),
+                "max_size": self.max_size,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "recycled": self._recycled,
+                "wait_avg_ms": (self._wait_total / self._checkouts * 1000) if self._checkouts else 0.0,
+                "wait_max_ms": self._wait_max * 1000,
+            }
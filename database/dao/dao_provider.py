@@ -0,0 +1,59 @@
+# app/database/dao/dao_provider.py
+import threading
+
+import dconfig
+from common_utils.metrics import TracedProxy
+from common_utils.single_flight import CoalescingProxy
+
+# Giữ kết quả DAO thêm vài giây sau khi gộp lời gọi (0 = chỉ gộp các lời gọi đang chạy)
+DAO_RESULT_TTL = float(getattr(dconfig.config_object, "DAO_RESULT_TTL", 0.0))
+
+# Các method chỉ đọc được gộp khi nhiều request giống nhau chạy đồng thời
+DESTINATION_READ_METHODS = (
+    "search_destinations",
+    "get_destination_by_id",
+    "get_nearby_destinations",
+    "get_events_by_location",
+)
+
+_instances = {}
+_lock = threading.Lock()
+
+
+def _wrap(dao, name):
+    # Đo latency bên trong lớp gộp để histogram chỉ tính các lời gọi thực sự xuống DB
+    return CoalescingProxy(TracedProxy(dao, name), name, DESTINATION_READ_METHODS, ttl=DAO_RESULT_TTL)
+
+
+def _get_instance(dao_class):
+    dao = _instances.get(dao_class)
+    if dao is None:
+        with _lock:
+            dao = _instances.get(dao_class)
+            if dao is None:
+                dao = _wrap(dao_class(), dao_class.__name__)
+                _instances[dao_class] = dao
+    return dao
+
+
+def get_destination_dao():
+    """DestinationDAO dùng chung cho toàn process"""
+    dao = _instances.get("destination")
+    if dao is not None:
+        return dao
+
+    from database.dao.pooled_destination_dao import PooledDestinationDAO
+
+    return _get_instance(PooledDestinationDAO)
+
+
+def override_destination_dao(dao):
+    """Thay DestinationDAO dùng chung (vd. bản in-memory khi benchmark)"""
+    with _lock:
+        _instances["destination"] = _wrap(dao, type(dao).__name__)
+
+
+def reset():
+    """Bỏ các DAO đã tạo (dùng khi shutdown)"""
+    with _lock:
+        _instances.clear()
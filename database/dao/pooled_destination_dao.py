@@ -0,0 +1,112 @@
+# app/database/dao/pooled_destination_dao.py
+import dconfig
+from coreAI.retrieval.search_filters import build_destination_expr, location_matches, normalize_location
+from database.pools import get_mysql_pool, get_milvus_pool
+
+_config = dconfig.config_object
+
+DESTINATION_COLLECTION = getattr(_config, "MILVUS_DESTINATION_COLLECTION", "destinations")
+VECTOR_FIELD = "embedding"
+NEARBY_LIMIT = 20
+
+# Field trả về từ collection điểm đến (vector_sync.destination_record ghi đủ các field này)
+DESTINATION_FIELDS = ("id", "name", "location", "attraction_type", "description", "image_url", "thumbnail_url",
+                      "price_info", "rating", "opening_hours")
+EVENT_COLUMNS = ("id", "name", "location", "event_type", "description", "start_date", "end_date", "month",
+                 "image_url", "updated_at")
+
+_NEARBY_SQL = (
+    "SELECT d.id, d.name, d.location, d.attraction_type, d.rating, d.thumbnail_url, "
+    "6371 * ACOS(LEAST(1, COS(RADIANS(c.latitude)) * COS(RADIANS(d.latitude)) * "
+    "COS(RADIANS(d.longitude) - RADIANS(c.longitude)) + SIN(RADIANS(c.latitude)) * SIN(RADIANS(d.latitude)))) "
+    "AS distance_km "
+    "FROM destinations c JOIN destinations d ON d.id <> c.id "
+    "WHERE c.id = %s AND c.latitude IS NOT NULL AND c.longitude IS NOT NULL "
+    "AND d.latitude BETWEEN c.latitude - %s AND c.latitude + %s "
+    "AND d.longitude IS NOT NULL "
+    "HAVING distance_km <= %s ORDER BY distance_km LIMIT %s"
+)
+
+
+class PooledDestinationDAO:
+    """
+    DestinationDAO dùng chung cho các tool, mỗi lời gọi mượn connection từ pool
+
+    ANN search trên collection điểm đến (Milvus), tra chi tiết / điểm lân cận / sự kiện trên MySQL.
+    Không mở connection mới cho từng tool call.
+    """
+
+    def search_destinations(self, query_vector, top_k=10, exclude_ids=None, filters=None):
+        """
+        Điểm đến gần query_vector nhất thỏa bộ lọc
+
+        Bộ lọc được biên dịch thành biểu thức Milvus (search_filters.build_destination_expr) và áp dụng ngay
+        trong ANN search, nên top_k kết quả đều hợp lệ và chỉ cần một lần gọi.
+
+        Args:
+            filters: {"location", "attraction_type", "price_range"}
+        """
+        filters = filters or {}
+        expr = build_destination_expr(
+            location=filters.get("location"),
+            attraction_type=filters.get("attraction_type"),
+            price_range=filters.get("price_range"),
+            exclude_ids=exclude_ids
+        )
+        with get_milvus_pool().connection() as client:
+            hits = client.search(
+                collection_name=DESTINATION_COLLECTION,
+                data=[[float(x) for x in query_vector]],
+                anns_field=VECTOR_FIELD,
+                limit=top_k,
+                filter=expr,
+                output_fields=list(DESTINATION_FIELDS)
+            )
+        return [{**hit["entity"], "id": hit["id"], "score": hit["distance"]} for hit in (hits[0] if hits else [])]
+
+    def get_destination_by_id(self, destination_id):
+        if not str(destination_id).isdigit():
+            return None
+        with get_mysql_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT * FROM destinations WHERE id = %s", (int(destination_id),))
+                return cursor.fetchone()
+
+    def get_nearby_destinations(self, destination_id, radius_km, limit=NEARBY_LIMIT):
+        """Các điểm trong bán kính radius_km (haversine), gần nhất trước"""
+        if not str(destination_id).isdigit():
+            return []
+        radius_km = float(radius_km)
+        with get_mysql_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                # Lọc sơ theo vĩ độ (1 độ ~ 111km) để MySQL không tính haversine cho cả bảng
+                cursor.execute(_NEARBY_SQL, (int(destination_id), radius_km / 111.0, radius_km / 111.0,
+                                             radius_km, int(limit)))
+                rows = cursor.fetchall()
+        return [{**row, "distance_km": round(float(row["distance_km"]), 2)} for row in rows]
+
+    def get_events_by_location(self, location, month=None):
+        """Sự kiện/lễ hội tại một tỉnh/thành (khớp cả tên gọi khác, xem search_filters.location_matches)"""
+        sql = f"SELECT {', '.join(EVENT_COLUMNS)} FROM events_festivals WHERE (location LIKE %s OR location LIKE %s)"
+        params = [f"%{location}%", f"%{normalize_location(location)}%"]
+        if month:
+            sql += " AND month = %s"
+            params.append(int(month))
+        sql += " ORDER BY start_date"
+        with get_mysql_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+        return [row for row in rows if location_matches(location, row.get("location"))]
+
+    def get_event_versions(self, event_ids):
+        """{event_id: updated_at} của các sự kiện còn tồn tại"""
+        event_ids = [int(event_id) for event_id in event_ids if str(event_id).isdigit()]
+        if not event_ids:
+            return {}
+        placeholders = ", ".join(["%s"] * len(event_ids))
+        with get_mysql_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"SELECT id, updated_at FROM events_festivals WHERE id IN ({placeholders})", event_ids)
+                rows = cursor.fetchall()
+        return {str(row["id"]): row["updated_at"] for row in rows}
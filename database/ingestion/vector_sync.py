@@ -0,0 +1,351 @@
+# app/database/ingestion/vector_sync.py
+"""
+Đồng bộ tăng dần bảng destinations / events_festivals (MySQL) sang vector collection (Milvus)
+
+Usage:
+    python -m database.ingestion.vector_sync --table destinations
+    python -m database.ingestion.vector_sync --table all --dry-run
+    python -m database.ingestion.vector_sync --table destinations --full --sync-deletes
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import dconfig
+import dlog
+from coreAI.retrieval.search_filters import (
+    attraction_type_key,
+    normalize_location,
+    parse_price_bounds,
+    UNKNOWN_PRICE
+)
+from database.pools import get_mysql_pool, get_milvus_pool
+
+_config = dconfig.config_object
+
+SYNC_STATE_FILE = getattr(_config, "VECTOR_SYNC_STATE_FILE",
+                          os.path.join(_config.DATA_DIR, "vector_sync_state.json"))
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_WORKERS = 4
+_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Scalar field cho filter pushdown (search_filters.build_destination_expr): tên -> (kiểu, tham số)
+DESTINATION_FILTER_FIELDS = {
+    "location_norm": ("VARCHAR", {"max_length": 255}),
+    "type_norm": ("VARCHAR", {"max_length": 100}),
+    "min_price": ("INT64", {}),
+    "max_price": ("INT64", {}),
+}
+
+
+def destination_text(row: dict) -> str:
+    parts = [row.get("name"), f"location: {row.get('location')}", f"type: {row.get('attraction_type')}",
+             row.get("description")]
+    return " ".join(str(p) for p in parts if p)
+
+
+def event_text(row: dict) -> str:
+    parts = [row.get("name"), f"location: {row.get('location')}", f"type: {row.get('event_type')}",
+             f"month: {row.get('month')}" if row.get("month") else None, row.get("description")]
+    return " ".join(str(p) for p in parts if p)
+
+
+def _text(value) -> str:
+    # Field VARCHAR của Milvus không nhận NULL
+    return "" if value is None else str(value)
+
+
+def destination_record(row: dict) -> dict:
+    """
+    Entity đầy đủ của điểm đến: upsert của Milvus thay nguyên entity nên phải ghi mọi field mà
+    retriever đọc từ kết quả search (xem destination_tools.format_destination), cùng các scalar field để lọc
+    """
+    min_price, max_price = parse_price_bounds(row.get("price_info"))
+    return {
+        "id": int(row["id"]),
+        "name": _text(row.get("name")),
+        "location": _text(row.get("location")),
+        "attraction_type": _text(row.get("attraction_type")),
+        "description": _text(row.get("description")),
+        "image_url": _text(row.get("image_url")),
+        "thumbnail_url": _text(row.get("thumbnail_url")),
+        "price_info": _text(row.get("price_info")),
+        "rating": float(row.get("rating") or 0.0),
+        "opening_hours": _text(row.get("opening_hours")),
+        "location_norm": normalize_location(row.get("location")),
+        "type_norm": attraction_type_key(row.get("attraction_type")),
+        "min_price": min_price,
+        "max_price": max_price,
+    }
+
+
+def event_record(row: dict) -> dict:
+    """Entity đầy đủ của sự kiện/lễ hội (get_events_and_festivals trả nguyên kết quả search)"""
+    return {
+        "id": int(row["id"]),
+        "name": _text(row.get("name")),
+        "location": _text(row.get("location")),
+        "event_type": _text(row.get("event_type")),
+        "description": _text(row.get("description")),
+        "start_date": _text(row.get("start_date")),
+        "end_date": _text(row.get("end_date")),
+        "month": int(row.get("month") or 0),
+        "image_url": _text(row.get("image_url")),
+    }
+
+
+# Cấu hình từng bảng: cột đọc, collection đích, hàm tạo text embedding và bản ghi Milvus
+TABLES = {
+    "destinations": {
+        "columns": ("id", "name", "location", "attraction_type", "description", "image_url", "thumbnail_url",
+                    "price_info", "rating", "opening_hours", "updated_at"),
+        "collection": getattr(_config, "MILVUS_DESTINATION_COLLECTION", "destinations"),
+        "text": destination_text,
+        "record": destination_record,
+        "filter_fields": DESTINATION_FILTER_FIELDS,
+        "backfill": True,
+    },
+    "events_festivals": {
+        "columns": ("id", "name", "location", "event_type", "description", "start_date", "end_date", "month",
+                    "image_url", "updated_at"),
+        "collection": getattr(_config, "MILVUS_EVENT_COLLECTION", "events_festivals"),
+        "text": event_text,
+        "record": event_record,
+    },
+}
+
+
+class SyncState:
+    """Watermark (updated_at, id) của từng bảng, lưu file JSON để chạy tiếp khi bị dừng"""
+
+    def __init__(self, path: str = SYNC_STATE_FILE):
+        self.path = path
+        self._state = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._state = json.load(f)
+
+    def get(self, table: str):
+        entry = self._state.get(table)
+        if not entry:
+            return None, 0
+        return datetime.strptime(entry["updated_at"], _TIMESTAMP_FORMAT), entry["last_id"]
+
+    def set(self, table: str, updated_at: datetime, last_id: int):
+        self._state[table] = {"updated_at": updated_at.strftime(_TIMESTAMP_FORMAT), "last_id": last_id}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def reset(self, table: str):
+        self._state.pop(table, None)
+
+
+def read_changed_rows(table: str, columns, since, last_id: int, chunk_size: int) -> list:
+    """Đọc một chunk bản ghi thay đổi theo keyset (updated_at, id)"""
+    sql = f"SELECT {', '.join(columns)} FROM {table}"
+    params = ()
+    if since is not None:
+        sql += " WHERE updated_at > %s OR (updated_at = %s AND id > %s)"
+        params = (since, since, last_id)
+    sql += " ORDER BY updated_at, id LIMIT %s"
+    params += (chunk_size,)
+
+    with get_mysql_pool().connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+def backfill_price_columns(table: str, records: list):
+    """Ghi min_price/max_price tính từ price_info về MySQL, giữ nguyên updated_at để không tự kích hoạt sync"""
+    params = [
+        (None if r["min_price"] == UNKNOWN_PRICE else r["min_price"],
+         None if r["max_price"] == UNKNOWN_PRICE else r["max_price"], r["id"])
+        for r in records
+    ]
+    with get_mysql_pool().connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.executemany(
+                f"UPDATE {table} SET min_price = %s, max_price = %s, updated_at = updated_at WHERE id = %s",
+                params
+            )
+
+
+def ensure_filter_fields(collection: str, fields: dict) -> list:
+    """
+    Thêm các scalar field lọc còn thiếu vào collection (collection tạo trước khi có filter pushdown)
+
+    Field thêm sau là nullable: các entity cũ mang NULL và không khớp bộ lọc cho tới khi chạy lại --full.
+
+    Returns:
+        Tên các field vừa thêm
+    """
+    from pymilvus import DataType
+
+    with get_milvus_pool().connection() as client:
+        info = client.describe_collection(collection_name=collection)
+        if info.get("enable_dynamic_field"):
+            # Field động: upsert ghi được luôn, biểu thức lọc dùng được theo tên
+            return []
+        existing = {field["name"] for field in info.get("fields", [])}
+        added = []
+        for name, (data_type, params) in fields.items():
+            if name in existing:
+                continue
+            client.add_collection_field(
+                collection_name=collection, field_name=name, data_type=getattr(DataType, data_type), nullable=True,
+                **params
+            )
+            added.append(name)
+    if added:
+        dlog.dlog_i(f"[vector_sync] {collection}: added filter fields {added}, run --full to fill existing rows")
+    return added
+
+
+def embed_texts(texts: list, executor: ThreadPoolExecutor) -> list:
+    """Embedding từng text (embedding_service chỉ có API một text), chạy song song trên executor"""
+    from coreAI import embedding_service
+
+    return [v.tolist() if hasattr(v, "tolist") else list(v)
+            for v in executor.map(embedding_service.create_embedding, texts)]
+
+
+class SyncReport:
+    def __init__(self, table: str, dry_run: bool):
+        self.table = table
+        self.dry_run = dry_run
+        self.rows = 0
+        self.deleted = 0
+        self.chunks = 0
+        self.read_seconds = 0.0
+        self.embed_seconds = 0.0
+        self.upsert_seconds = 0.0
+        self.started = time.monotonic()
+
+    def as_dict(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        return {
+            "table": self.table,
+            "dry_run": self.dry_run,
+            "rows": self.rows,
+            "deleted": self.deleted,
+            "chunks": self.chunks,
+            "elapsed_s": round(elapsed, 2),
+            "rows_per_s": round(self.rows / elapsed, 1) if elapsed else 0.0,
+            "read_s": round(self.read_seconds, 2),
+            "embed_s": round(self.embed_seconds, 2),
+            "upsert_s": round(self.upsert_seconds, 2),
+        }
+
+
+def sync_table(table: str, state: SyncState, chunk_size=DEFAULT_CHUNK_SIZE, workers=DEFAULT_WORKERS, dry_run=False,
+               full=False) -> SyncReport:
+    """Đồng bộ các bản ghi thay đổi của một bảng sang Milvus"""
+    spec = TABLES[table]
+    report = SyncReport(table, dry_run)
+    if full:
+        state.reset(table)
+    since, last_id = state.get(table)
+    if spec.get("filter_fields") and not dry_run:
+        ensure_filter_fields(spec["collection"], spec["filter_fields"])
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            start = time.monotonic()
+            rows = read_changed_rows(table, spec["columns"], since, last_id, chunk_size)
+            report.read_seconds += time.monotonic() - start
+            if not rows:
+                break
+
+            if not dry_run:
+                start = time.monotonic()
+                vectors = embed_texts([spec["text"](row) for row in rows], executor)
+                report.embed_seconds += time.monotonic() - start
+
+                records = []
+                for row, vector in zip(rows, vectors):
+                    record = spec["record"](row)
+                    record["embedding"] = vector
+                    records.append(record)
+
+                start = time.monotonic()
+                with get_milvus_pool().connection() as client:
+                    client.upsert(collection_name=spec["collection"], data=records)
+                if spec.get("backfill"):
+                    backfill_price_columns(table, records)
+                report.upsert_seconds += time.monotonic() - start
+
+            since, last_id = rows[-1]["updated_at"], int(rows[-1]["id"])
+            if not dry_run:
+                state.set(table, since, last_id)
+            report.rows += len(rows)
+            report.chunks += 1
+            dlog.dlog_i(f"[vector_sync] {table}: {report.rows} rows synced (watermark {since}, id {last_id})")
+
+            if len(rows) < chunk_size:
+                break
+    return report
+
+
+def sync_deletes(table: str, report: SyncReport, batch_size=DEFAULT_CHUNK_SIZE):
+    """Xóa khỏi Milvus các ID không còn trong MySQL"""
+    spec = TABLES[table]
+    with get_mysql_pool().connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT id FROM {table}")
+            mysql_ids = {int(row["id"]) for row in cursor.fetchall()}
+
+    with get_milvus_pool().connection() as client:
+        iterator = client.query_iterator(
+            collection_name=spec["collection"], batch_size=batch_size, filter="id >= 0", output_fields=["id"]
+        )
+        stale = []
+        while True:
+            batch = iterator.next()
+            if not batch:
+                iterator.close()
+                break
+            stale.extend(int(item["id"]) for item in batch if int(item["id"]) not in mysql_ids)
+
+        if stale and not report.dry_run:
+            for i in range(0, len(stale), batch_size):
+                client.delete(collection_name=spec["collection"], ids=stale[i:i + batch_size])
+    report.deleted = len(stale)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Đồng bộ MySQL -> Milvus theo updated_at")
+    parser.add_argument("--table", choices=list(TABLES) + ["all"], default="all")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Số lời gọi embedding song song")
+    parser.add_argument("--dry-run", action="store_true", help="Chỉ đếm bản ghi thay đổi, không embed/upsert")
+    parser.add_argument("--full", action="store_true", help="Bỏ watermark, đồng bộ lại toàn bộ")
+    parser.add_argument("--sync-deletes", action="store_true", help="Xóa khỏi Milvus các bản ghi đã bị xóa")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    state = SyncState()
+    tables = list(TABLES) if args.table == "all" else [args.table]
+
+    reports = []
+    for table in tables:
+        report = sync_table(table, state, args.chunk_size, args.workers, args.dry_run, args.full)
+        if args.sync_deletes:
+            sync_deletes(table, report)
+        reports.append(report.as_dict())
+
+    print(json.dumps(reports, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
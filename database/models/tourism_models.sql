@@ -11,6 +11,8 @@ CREATE TABLE destinations (
     longitude DECIMAL(11, 8),
     opening_hours VARCHAR(255),
     price_info TEXT,  -- JSON: {adult: 100000, child: 50000, ...}
+    min_price INT,  -- Giá thấp nhất trong price_info (vector_sync tính lại khi đồng bộ)
+    max_price INT,  -- Giá cao nhất trong price_info
     rating DECIMAL(3, 2),
     contact_info TEXT,  -- JSON: {phone, email, website}
     image_url VARCHAR(500),
@@ -18,7 +20,9 @@ CREATE TABLE destinations (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_location (location),
-    INDEX idx_type (attraction_type)
+    INDEX idx_type (attraction_type),
+    INDEX idx_price (min_price, max_price),
+    INDEX idx_updated_at (updated_at)
 );
 
 -- Bảng sự kiện/lễ hội
@@ -35,7 +39,8 @@ CREATE TABLE events_festivals (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_location (location),
-    INDEX idx_month (month)
+    INDEX idx_month (month),
+    INDEX idx_updated_at (updated_at)
 );
 
 -- Bảng tour du lịch
@@ -58,10 +63,22 @@ CREATE TABLE tours (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 );
 
+-- Sức chứa tour theo ngày khởi hành (booking_engine cập nhật bằng optimistic concurrency qua cột version)
+CREATE TABLE tour_capacity (
+    tour_id INT NOT NULL,
+    travel_date DATE NOT NULL,
+    capacity INT NOT NULL,  -- Mặc định lấy từ tours.max_participants
+    booked INT NOT NULL DEFAULT 0,
+    version INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (tour_id, travel_date)
+);
+
 -- Bảng đặt dịch vụ
 CREATE TABLE bookings (
     id INT PRIMARY KEY AUTO_INCREMENT,
     booking_id VARCHAR(100) UNIQUE NOT NULL,
+    idempotency_key VARCHAR(64) UNIQUE,  -- thread_id + nội dung yêu cầu, chặn ghi trùng khi khách gửi lại
     customer_id INT NOT NULL,
     service_type VARCHAR(50) NOT NULL,  -- tour, hotel, flight, attraction
     service_id INT,
@@ -102,6 +119,24 @@ CREATE TABLE reviews (
     INDEX idx_service (service_type, service_id)
 );
 
+-- Thống kê đánh giá theo dịch vụ (review_aggregates.py cộng dồn khi ghi review, --rebuild tính lại từ reviews)
+CREATE TABLE review_aggregates (
+    service_type VARCHAR(50) NOT NULL,
+    service_id INT NOT NULL,
+    review_count INT NOT NULL DEFAULT 0,
+    rating_sum INT NOT NULL DEFAULT 0,
+    rating_1 INT NOT NULL DEFAULT 0,
+    rating_2 INT NOT NULL DEFAULT 0,
+    rating_3 INT NOT NULL DEFAULT 0,
+    rating_4 INT NOT NULL DEFAULT 0,
+    rating_5 INT NOT NULL DEFAULT 0,
+    weighted_sum DOUBLE NOT NULL DEFAULT 0,  -- Σ weight * rating, weight = 2^((created_at - 2020-01-01) / half_life), số mũ chặn ở ±900
+    weighted_weight DOUBLE NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (service_type, service_id),
+    INDEX idx_updated_at (updated_at)
+);
+
 -- Bảng thông tin khẩn cấp
 CREATE TABLE emergency_contacts (
     id INT PRIMARY KEY AUTO_INCREMENT,
@@ -0,0 +1,91 @@
+# app/database/pools.py
+import threading
+
+import dconfig
+import dlog
+from database.connection_pool import ConnectionPool
+
+_config = dconfig.config_object
+
+POOL_MAX_SIZE = int(getattr(_config, "DB_POOL_MAX_SIZE", 10))
+POOL_TIMEOUT = float(getattr(_config, "DB_POOL_TIMEOUT", 5.0))
+POOL_RECYCLE = int(getattr(_config, "DB_POOL_RECYCLE", 3600))
+
+_pools = {}
+_lock = threading.Lock()
+
+
+def _create_mysql_connection():
+    import pymysql
+
+    return pymysql.connect(
+        host=_config.MYSQL_HOST,
+        port=int(_config.MYSQL_PORT),
+        user=_config.MYSQL_USER,
+        password=_config.MYSQL_PASSWORD,
+        database=_config.MYSQL_DATABASE,
+        charset="utf8mb4",
+        cursorclass=pymysql.cursors.DictCursor,
+        autocommit=True,
+        connect_timeout=int(POOL_TIMEOUT)
+    )
+
+
+def _ping_mysql(conn):
+    conn.ping(reconnect=False)
+    return True
+
+
+def _create_milvus_client():
+    from pymilvus import MilvusClient
+
+    return MilvusClient(uri=f"http://{_config.MILVUS_HOST}:{_config.MILVUS_PORT}", timeout=POOL_TIMEOUT)
+
+
+def _ping_milvus(client):
+    client.list_collections()
+    return True
+
+
+def _get_pool(name, create, close, ping):
+    pool = _pools.get(name)
+    if pool is None:
+        with _lock:
+            pool = _pools.get(name)
+            if pool is None:
+                pool = ConnectionPool(
+                    name=name,
+                    create=create,
+                    close=close,
+                    ping=ping,
+                    max_size=POOL_MAX_SIZE,
+                    timeout=POOL_TIMEOUT,
+                    recycle=POOL_RECYCLE
+                )
+                _pools[name] = pool
+    return pool
+
+
+def get_mysql_pool():
+    """Pool connection MySQL dùng chung"""
+    return _get_pool("mysql", _create_mysql_connection, lambda conn: conn.close(), _ping_mysql)
+
+
+def get_milvus_pool():
+    """Pool client Milvus dùng chung"""
+    return _get_pool("milvus", _create_milvus_client, lambda client: client.close(), _ping_milvus)
+
+
+def pool_stats():
+    """Metrics của toàn bộ pool"""
+    return [pool.stats() for pool in list(_pools.values())]
+
+
+def close_all():
+    """Đóng toàn bộ pool (gọi khi shutdown)"""
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+    dlog.dlog_i("All database pools closed")
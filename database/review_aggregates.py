@@ -0,0 +1,339 @@
+# app/database/review_aggregates.py
+"""
+Thống kê đánh giá theo (service_type, service_id): số lượt, tổng điểm, phân bố 1-5 sao, điểm ưu tiên đánh giá gần đây
+
+Cập nhật O(1) khi ghi review, đồng bộ sang destinations.rating / tours.rating.
+
+Usage:
+    python -m database.review_aggregates --rebuild
+"""
+import argparse
+import sys
+import threading
+import time
+from datetime import datetime
+
+import dconfig
+import dlog
+from common_utils.metrics import registry
+
+_config = dconfig.config_object
+
+# Review cũ hơn một chu kỳ bán rã có trọng số bằng một nửa review mới
+REVIEW_HALF_LIFE_DAYS = float(getattr(_config, "REVIEW_HALF_LIFE_DAYS", 180))
+REVIEW_AGGREGATE_REFRESH_SECONDS = float(getattr(_config, "REVIEW_AGGREGATE_REFRESH_SECONDS", 60))
+# Mốc tính trọng số: weight = 2^((created_at - mốc) / half_life), không phải giảm lại các review cũ khi thời gian trôi
+DECAY_EPOCH = datetime(2020, 1, 1)
+# Chặn số mũ để 2^x (và tổng cộng dồn) không tràn double (~2^1024). Với half-life 180 ngày mốc này chỉ chạm tới
+# sau ~440 năm; half-life nhỏ thì sớm hơn, khi đó các review mới nhất có cùng trọng số thay vì lỗi OverflowError
+MAX_DECAY_EXPONENT = 900.0
+
+# service_type -> bảng có cột rating được đồng bộ
+RATING_TABLES = {"destination": "destinations", "tour": "tours"}
+
+REVIEWS_RECORDED = registry.counter("tourism_reviews_recorded_total", "Số review được ghi theo loại dịch vụ")
+
+_HALF_LIFE_SECONDS = REVIEW_HALF_LIFE_DAYS * 86400
+_AGGREGATE_COLUMNS = ("service_type", "service_id", "review_count", "rating_sum", "rating_1", "rating_2",
+                      "rating_3", "rating_4", "rating_5", "weighted_sum", "weighted_weight", "updated_at")
+
+
+# Cùng công thức decay_weight, tính trong MySQL (tham số: DECAY_EPOCH, half-life, MAX_DECAY_EXPONENT x2)
+_DECAY_WEIGHT_SQL = "POW(2, LEAST(GREATEST(TIMESTAMPDIFF(SECOND, %s, created_at) / %s, -%s), %s))"
+
+
+def decay_weight(created_at: datetime) -> float:
+    exponent = (created_at - DECAY_EPOCH).total_seconds() / _HALF_LIFE_SECONDS
+    return 2.0 ** max(-MAX_DECAY_EXPONENT, min(exponent, MAX_DECAY_EXPONENT))
+
+
+def _service_key(service_type, service_id) -> tuple:
+    """
+    Kiểm tra và chuẩn hóa (service_type, service_id) của review
+
+    Raises:
+        ValueError: Thiếu loại dịch vụ hoặc mã dịch vụ không phải số
+    """
+    service_type = str(service_type or "").strip().lower()
+    if not service_type:
+        raise ValueError("Thiếu service_type của review")
+    try:
+        service_id = int(service_id)
+    except (TypeError, ValueError):
+        raise ValueError(f"service_id phải là số, nhận {service_id!r}") from None
+    return service_type, service_id
+
+
+class ReviewAggregate:
+    """Thống kê của một dịch vụ, cộng dồn được trong O(1)"""
+
+    __slots__ = ("count", "total", "histogram", "weighted_sum", "weighted_weight")
+
+    def __init__(self, count=0, total=0, histogram=None, weighted_sum=0.0, weighted_weight=0.0):
+        self.count = count
+        self.total = total
+        self.histogram = list(histogram) if histogram else [0] * 5
+        self.weighted_sum = weighted_sum
+        self.weighted_weight = weighted_weight
+
+    @classmethod
+    def from_row(cls, row: dict):
+        return cls(
+            int(row["review_count"]), int(row["rating_sum"]),
+            [int(row[f"rating_{star}"]) for star in range(1, 6)],
+            float(row["weighted_sum"]), float(row["weighted_weight"])
+        )
+
+    def add(self, rating: int, created_at: datetime = None):
+        weight = decay_weight(created_at or datetime.now())
+        self.count += 1
+        self.total += rating
+        self.histogram[rating - 1] += 1
+        self.weighted_sum += weight * rating
+        self.weighted_weight += weight
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count else None
+
+    @property
+    def recent_average(self):
+        return self.weighted_sum / self.weighted_weight if self.weighted_weight else None
+
+    def to_dict(self) -> dict:
+        return {
+            "rating": round(self.average, 2) if self.count else None,
+            "review_count": self.count,
+            "recent_rating": round(self.recent_average, 2) if self.count else None,
+            "histogram": {star: self.histogram[star - 1] for star in range(1, 6)},
+        }
+
+
+def load_aggregates_from_mysql(since=None):
+    """Đọc bảng review_aggregates, chỉ lấy dòng thay đổi sau `since` nếu có"""
+    from database.pools import get_mysql_pool
+
+    sql = f"SELECT {', '.join(_AGGREGATE_COLUMNS)} FROM review_aggregates"
+    params = ()
+    if since is not None:
+        # >=: updated_at chỉ chính xác tới giây, đọc lại các dòng cùng giây với watermark
+        sql += " WHERE updated_at >= %s"
+        params = (since,)
+
+    with get_mysql_pool().connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+def _sync_rating_sql(table: str) -> str:
+    # Giữ nguyên updated_at: đổi rating không cần embed lại hay làm mất answer cache
+    return (
+        f"UPDATE {table} t JOIN review_aggregates a ON a.service_type = %s AND a.service_id = t.id "
+        "SET t.rating = ROUND(a.rating_sum / a.review_count, 2), t.updated_at = t.updated_at "
+        "WHERE a.review_count > 0"
+    )
+
+
+class ReviewAggregator:
+    """
+    Thống kê đánh giá trong RAM, đọc O(1) khi trả kết quả tìm kiếm
+
+    Nguồn chính là bảng review_aggregates (MySQL cộng dồn nguyên tử nên nhiều worker ghi cùng lúc vẫn đúng).
+    Review ghi qua process này được cộng ngay vào bản trong RAM, thay đổi từ worker khác được nạp lại
+    theo updated_at mỗi REVIEW_AGGREGATE_REFRESH_SECONDS.
+    """
+
+    def __init__(self, loader=load_aggregates_from_mysql, refresh_seconds=REVIEW_AGGREGATE_REFRESH_SECONDS):
+        self._loader = loader
+        self.refresh_seconds = refresh_seconds
+        self._aggregates = {}
+        self._watermark = None
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(service_type, service_id) -> tuple:
+        return str(service_type), str(service_id)
+
+    def refresh(self, full=False, if_stale=False):
+        """
+        Nạp các dòng thay đổi từ watermark (hoặc toàn bộ nếu full=True)
+
+        Args:
+            if_stale: Bỏ qua nếu thread khác vừa nạp xong trong lúc chờ lock
+        """
+        with self._lock:
+            if if_stale and not self._is_stale():
+                return 0
+            # Đặt trước khi đọc để lỗi DB không làm mỗi request đều thử lại
+            self._refreshed_at = time.monotonic()
+            rows = self._loader(None if full else self._watermark)
+            aggregates = {} if full else dict(self._aggregates)
+            for row in rows:
+                aggregates[self._key(row["service_type"], row["service_id"])] = ReviewAggregate.from_row(row)
+                updated_at = row.get("updated_at")
+                if updated_at is not None and (self._watermark is None or updated_at > self._watermark):
+                    self._watermark = updated_at
+            self._aggregates = aggregates
+            if rows:
+                dlog.dlog_i(f"Review aggregates refreshed: {len(rows)} changed, {len(aggregates)} total")
+            return len(rows)
+
+    def set_loader(self, loader):
+        """Đổi nguồn dữ liệu và nạp lại"""
+        self._loader = loader
+        self._watermark = None
+        self.refresh(full=True)
+
+    def _is_stale(self):
+        return self._refreshed_at is None or time.monotonic() - self._refreshed_at > self.refresh_seconds
+
+    def _refresh_if_stale(self):
+        try:
+            self.refresh(full=self._refreshed_at is None, if_stale=True)
+        except Exception as e:
+            dlog.dlog_e(f"Review aggregates refresh error: {e}")
+
+    def _ensure_fresh(self):
+        if not self._is_stale():
+            return
+        if self._refreshed_at is None:
+            # Chưa nạp lần nào: chờ nạp xong, các request đồng thời chờ lock rồi dùng luôn kết quả
+            self._refresh_if_stale()
+        elif not self._lock.locked():
+            # Nạp phần thay đổi ở background, request hiện tại dùng bản đang có
+            threading.Thread(target=self._refresh_if_stale, name="review-aggregates-refresh", daemon=True).start()
+
+    def get(self, service_type, service_id):
+        """ReviewAggregate của dịch vụ, None nếu chưa có đánh giá"""
+        self._ensure_fresh()
+        return self._aggregates.get(self._key(service_type, service_id))
+
+    def stats(self, service_type, service_id) -> dict:
+        aggregate = self.get(service_type, service_id)
+        return aggregate.to_dict() if aggregate is not None else None
+
+    def apply(self, service_type, service_id, rating: int, created_at: datetime = None):
+        """Cộng một review vào bản trong RAM"""
+        key = self._key(service_type, service_id)
+        with self._lock:
+            aggregate = self._aggregates.get(key)
+            if aggregate is None:
+                aggregate = self._aggregates[key] = ReviewAggregate()
+            aggregate.add(rating, created_at)
+
+    def record_review(self, customer_id, service_type, service_id, rating: int, comment=None, images=None) -> int:
+        """
+        Ghi review và cập nhật thống kê trong cùng một transaction (O(1), không quét lại bảng reviews)
+
+        Returns:
+            id của review
+
+        Raises:
+            ValueError: Thiếu service_type/service_id hoặc rating ngoài khoảng 1-5
+        """
+        from database.pools import get_mysql_pool
+
+        service_type, service_id = _service_key(service_type, service_id)
+        rating = int(rating)
+        if not 1 <= rating <= 5:
+            raise ValueError(f"rating phải từ 1 tới 5, nhận {rating}")
+        created_at = datetime.now().replace(microsecond=0)
+        weight = decay_weight(created_at)
+        stars = [1 if star == rating else 0 for star in range(1, 6)]
+
+        with get_mysql_pool().connection() as conn:
+            conn.begin()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        "INSERT INTO reviews (customer_id, service_type, service_id, rating, comment, images, "
+                        "created_at) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                        (customer_id, service_type, service_id, rating, comment, images, created_at)
+                    )
+                    review_id = cursor.lastrowid
+                    cursor.execute(
+                        f"INSERT INTO review_aggregates ({', '.join(_AGGREGATE_COLUMNS[:-1])}) "
+                        "VALUES (%s, %s, 1, %s, %s, %s, %s, %s, %s, %s, %s) "
+                        "ON DUPLICATE KEY UPDATE review_count = review_count + 1, "
+                        "rating_sum = rating_sum + VALUES(rating_sum), "
+                        + ", ".join(f"rating_{star} = rating_{star} + VALUES(rating_{star})" for star in range(1, 6))
+                        + ", weighted_sum = weighted_sum + VALUES(weighted_sum), "
+                        "weighted_weight = weighted_weight + VALUES(weighted_weight)",
+                        (service_type, service_id, rating, *stars, weight * rating, weight)
+                    )
+                    table = RATING_TABLES.get(service_type)
+                    if table is not None:
+                        cursor.execute(_sync_rating_sql(table) + " AND t.id = %s", (service_type, service_id))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+        self.apply(service_type, service_id, rating, created_at)
+        REVIEWS_RECORDED.inc(service_type=service_type)
+        return review_id
+
+    def __len__(self):
+        return len(self._aggregates)
+
+
+def rebuild_aggregates(service_type: str = None) -> int:
+    """Tính lại toàn bộ review_aggregates từ bảng reviews bằng một câu GROUP BY, rồi đồng bộ cột rating"""
+    from database.pools import get_mysql_pool
+
+    # Review thiếu service_type/service_id không gắn với dịch vụ nào (và vi phạm NOT NULL của review_aggregates)
+    where = "WHERE service_type IS NOT NULL AND service_id IS NOT NULL "
+    if service_type:
+        where += "AND service_type = %s "
+    decay_params = (DECAY_EPOCH, _HALF_LIFE_SECONDS, MAX_DECAY_EXPONENT, MAX_DECAY_EXPONENT)
+    params = decay_params * 2 + ((service_type,) if service_type else ())
+    start = time.monotonic()
+    with get_mysql_pool().connection() as conn:
+        conn.begin()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "DELETE FROM review_aggregates" + (" WHERE service_type = %s" if service_type else ""),
+                    (service_type,) if service_type else ()
+                )
+                cursor.execute(
+                    f"INSERT INTO review_aggregates ({', '.join(_AGGREGATE_COLUMNS[:-1])}) "
+                    "SELECT service_type, service_id, COUNT(*), SUM(rating), "
+                    + ", ".join(f"SUM(rating = {star})" for star in range(1, 6))
+                    + f", SUM(rating * {_DECAY_WEIGHT_SQL}), SUM({_DECAY_WEIGHT_SQL}) "
+                    f"FROM reviews {where}GROUP BY service_type, service_id",
+                    params
+                )
+                count = cursor.rowcount
+                for review_type, table in RATING_TABLES.items():
+                    if service_type in (None, review_type):
+                        cursor.execute(_sync_rating_sql(table), (review_type,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    dlog.dlog_i(f"Rebuilt {count} review aggregates in {time.monotonic() - start:.2f}s")
+    review_aggregator.refresh(full=True)
+    return count
+
+
+review_aggregator = ReviewAggregator()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Thống kê đánh giá theo dịch vụ")
+    parser.add_argument("--rebuild", action="store_true", help="Tính lại toàn bộ từ bảng reviews")
+    parser.add_argument("--service-type", default=None, help="Chỉ tính lại một loại dịch vụ")
+    args = parser.parse_args(argv)
+
+    if not args.rebuild:
+        parser.print_help()
+        return 1
+    rebuild_aggregates(args.service_type)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
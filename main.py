@@ -1,5 +1,6 @@
 # app/main.py
 import os
+import sys
 import uvicorn
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
@@ -8,15 +9,21 @@ from starlette.middleware.cors import CORSMiddleware
 
 import dconfig
 import dlog
-from database import milvus_service, mysql_service, minio_service
-from routes import (
-    health_route,
-    chat_route,
-    meta_route,
-    destination_route,
-    tour_route,
-    booking_route
-)
+from common_utils.startup import startup_profile, warm_up, lazy_import
+from database import pools
+from database.dao import dao_provider
+
+with startup_profile.phase("import routes"):
+    from routes import (
+        health_route,
+        readiness_route,
+        metrics_route,
+        chat_route,
+        meta_route,
+        destination_route,
+        tour_route,
+        booking_route
+    )
 
 app = FastAPI(title="Tourism AI Assistant")
 
@@ -42,11 +49,75 @@ try:
 except OSError:
     pass
 
+def _warm_up_pool(get_pool):
+    def _connect():
+        with get_pool().connection():
+            pass
+    return _connect
+
+
+def _warm_up_indexes():
+    from coreAI.retrieval.geo_index import destination_geo_index
+    from coreAI.retrieval.lexical_index import destination_lexical_index
+    from database.review_aggregates import review_aggregator
+
+    destination_geo_index.refresh(full=True)
+    destination_lexical_index.rebuild()
+    review_aggregator.refresh(full=True)
+
+
+def _warm_up_agents():
+    # Import trước các agent (LangChain/LangGraph) để lượt đầu tiên không phải chờ
+    lazy_import("coreAI.agents")
+    lazy_import("coreAI.tourism_workflow")
+
+
+def _warm_up_prompts():
+    from coreAI.prompt_registry import prompt_registry
+
+    prompt_registry.load()
+    prompt_registry.start_watching()
+    if not len(prompt_registry):
+        raise RuntimeError(f"Không nạp được prompt nào từ {prompt_registry.path}")
+
+
+def _warm_up_checkpointer():
+    from coreAI.checkpointer import get_checkpointer
+
+    get_checkpointer()
+
+
+def _warm_up_embedding_cache():
+    from coreAI.retrieval.embedding_cache import get_embedding_cache
+
+    get_embedding_cache()
+
+
+# Thiếu DB hoặc prompt thì không phục vụ được request nào: chưa báo ready tới khi các bước này thành công
+warm_up.register("mysql_pool", _warm_up_pool(pools.get_mysql_pool), required=True)
+warm_up.register("milvus_pool", _warm_up_pool(pools.get_milvus_pool), required=True)
+warm_up.register("prompts", _warm_up_prompts, required=True)
+warm_up.register("agents", _warm_up_agents)
+warm_up.register("indexes", _warm_up_indexes)
+warm_up.register("embedding_cache", _warm_up_embedding_cache)
+warm_up.register("checkpointer", _warm_up_checkpointer)
+
+
+@app.on_event("startup")
+def startup_event():
+    # Warm-up chạy nền, /health/ready trả 503 tới khi xong
+    warm_up.start()
+
+
 @app.on_event("shutdown")
 def shutdown_event():
-    milvus_service.disconnect()
-    mysql_service.disconnect()
-    minio_service.disconnect()
+    dao_provider.reset()
+    pools.close_all()
+    # Chỉ ngắt các service đã thực sự được dùng
+    for module_name in ("database.milvus_service", "database.mysql_service", "database.minio_service"):
+        module = sys.modules.get(module_name)
+        if module is not None:
+            module.disconnect()
 
 @app.get("/")
 async def root():
@@ -54,6 +125,8 @@ async def root():
 
 # Include routers
 app.include_router(health_route.router)
+app.include_router(readiness_route.router)
+app.include_router(metrics_route.router)
 app.include_router(chat_route.router)
 app.include_router(meta_route.router)
 app.include_router(destination_route.router)
@@ -3,12 +3,16 @@ from typing import TypedDict, List, Optional, Annotated
 from datetime import datetime
 import operator
 
+from pydantic import BaseModel, Field
+
 
 class TourismState(TypedDict):
     """State quản lý hội thoại du lịch"""
 
     # Message history
     messages: Annotated[List, operator.add]
+    history_summary: Optional[str]  # Tóm tắt các lượt đã ra khỏi cửa sổ history
+    history_summarized_count: Optional[int]  # Số messages đầu đã được tóm tắt
     human_message: str
     ai_message: str
 
@@ -42,6 +46,8 @@ class TourismState(TypedDict):
     documents: Optional[List[dict]]
     grader_status: Optional[str]
     agent_status: Optional[str]
+    answer_cached: Optional[bool]  # Lượt hiện tại được trả lời từ answer cache
+    answer_cacheable: Optional[bool]  # Lượt hiện tại không phụ thuộc ngữ cảnh trước, được tra/lưu answer cache
 
 
 class DestinationQuery(BaseModel):
@@ -83,11 +89,16 @@ class BookingRequest(BaseModel):
     payment_method: Optional[str] = Field(None, description="Phương thức thanh toán")
 
 
+class ReviewRequest(BaseModel):
+    """Schema đánh giá dịch vụ"""
+    service_type: str = Field(..., description="Loại dịch vụ (destination, tour, hotel)")
+    service_id: int = Field(..., description="Mã dịch vụ")
+    rating: int = Field(..., description="Số sao từ 1 tới 5", ge=1, le=5)
+    comment: Optional[str] = Field(None, description="Nhận xét của khách")
+
+
 class WeatherQuery(BaseModel):
     """Schema tra cứu thời tiết"""
     location: str = Field(..., description="Địa điểm")
     date: Optional[str] = Field(None, description="Ngày cần xem thời tiết (YYYY-MM-DD)")
     days: Optional[int] = Field(7, description="Số ngày dự báo", ge=1, le=14)
-
-
-from pydantic import BaseModel, Field
\ No newline at end of file
@@ -0,0 +1,68 @@
+# app/routes/metrics_route.py
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from common_utils.metrics import registry, render_metrics
+
+router = APIRouter()
+
+
+def _pool_samples():
+    from database.pools import pool_stats
+
+    samples = []
+    for stats in pool_stats():
+        for key in ("size", "idle", "checkouts", "timeouts", "created", "recycled", "wait_avg_ms", "wait_max_ms"):
+            samples.append(({"pool": stats["name"], "stat": key}, stats[key]))
+    return samples
+
+
+def _stats_samples(get_stats):
+    def _collect():
+        return [({"stat": key}, value) for key, value in get_stats().items() if isinstance(value, (int, float))]
+    return _collect
+
+
+def _router_samples():
+    from coreAI.fast_router import fast_router
+
+    stats = fast_router.stats()
+    samples = [({"stat": "total"}, stats["total"]), ({"stat": "fallbacks"}, stats["fallbacks"]),
+               ({"stat": "hit_rate"}, stats["hit_rate"])]
+    samples += [({"stat": "hits", "intent": intent}, count) for intent, count in stats["hits"].items()]
+    return samples
+
+
+def _embedding_cache_stats():
+    from coreAI.retrieval.embedding_cache import get_embedding_cache
+
+    return get_embedding_cache().stats()
+
+
+def _single_flight_samples():
+    from common_utils.single_flight import flight_stats
+
+    samples = []
+    for stats in flight_stats():
+        for key in ("in_flight", "executed", "shared", "cached", "coalescing_ratio"):
+            samples.append(({"flight": stats["name"], "stat": key}, stats[key]))
+    return samples
+
+
+def _answer_cache_stats():
+    from coreAI.answer_cache import answer_cache
+
+    return answer_cache.stats()
+
+
+registry.register_collector("tourism_db_pool", "Trạng thái pool connection", _pool_samples)
+registry.register_collector("tourism_fast_router", "Thống kê fast-path router", _router_samples)
+registry.register_collector("tourism_embedding_cache", "Thống kê embedding cache", _stats_samples(_embedding_cache_stats))
+registry.register_collector("tourism_answer_cache", "Thống kê answer cache", _stats_samples(_answer_cache_stats))
+registry.register_collector("tourism_single_flight", "Thống kê gộp request đồng thời", _single_flight_samples)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Metrics định dạng Prometheus"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
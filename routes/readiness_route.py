@@ -0,0 +1,20 @@
+# app/routes/readiness_route.py
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from common_utils.startup import warm_up, startup_profile
+
+router = APIRouter()
+
+
+@router.get("/health/ready")
+async def ready():
+    """Readiness probe: chỉ trả 200 sau khi warm-up xong"""
+    status = warm_up.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
+@router.get("/health/startup")
+async def startup_report():
+    """Thời gian từng bước khởi động"""
+    return {"ready": warm_up.is_ready(), **startup_profile.report()}
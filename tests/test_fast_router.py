@@ -0,0 +1,50 @@
+# app/tests/test_fast_router.py
+import pytest
+
+from coreAI.fast_router import FastRouter
+from dconfig import config_agents
+
+
+@pytest.fixture(scope="module")
+def router():
+    return FastRouter()
+
+
+@pytest.mark.parametrize("message", [
+    "Giá vé Hội An bao nhiêu?",
+    "Vé Bà Nà Hills bao nhiêu tiền?",
+    "Đi Đà Nẵng bao lâu",
+    "Bao giờ có lễ hội hoa Đà Lạt?",
+    "gia ve hoi an bao nhieu",
+    "mua bao nhieu ve thi duoc giam gia",
+    "di da nang bao lau",
+    "Đi Lu Lu Park mất bao lâu",
+    "Giá phòng 115 nghìn",
+    "Tour 113 người còn chỗ không",
+    "Tổng đài du lịch Việt Nam làm việc mấy giờ",
+])
+def test_price_and_time_questions_are_not_weather(router, message):
+    agent, _ = router.route(message)
+    assert agent != config_agents.AGENT_WEATHER_EMERGENCY
+
+
+@pytest.mark.parametrize("message", ["Cháo", "Cháo lòng ở đâu ngon", "chao long o dau ngon"])
+def test_food_is_not_greeting(router, message):
+    agent, _ = router.route(message)
+    assert agent != config_agents.AGENT_HELLO
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("Xin chào", config_agents.AGENT_HELLO),
+    ("xin chao ban", config_agents.AGENT_HELLO),
+    ("Chào bạn ơi", config_agents.AGENT_HELLO),
+    ("Thời tiết Đà Nẵng hôm nay", config_agents.AGENT_WEATHER_EMERGENCY),
+    ("Huế có bão không", config_agents.AGENT_WEATHER_EMERGENCY),
+    ("thoi tiet da lat", config_agents.AGENT_WEATHER_EMERGENCY),
+    ("Số điện thoại cấp cứu", config_agents.AGENT_WEATHER_EMERGENCY),
+    ("Gọi 115 ở đâu", config_agents.AGENT_WEATHER_EMERGENCY),
+    ("cho toi so 113", config_agents.AGENT_WEATHER_EMERGENCY),
+])
+def test_clear_intents_are_routed(router, message, expected):
+    agent, _ = router.route(message)
+    assert agent == expected
@@ -0,0 +1,102 @@
+# app/tests/test_search_filters.py
+import pytest
+
+from coreAI.retrieval.search_filters import (
+    UNKNOWN_PRICE,
+    attraction_type_key,
+    build_destination_expr,
+    location_matches,
+    normalize_location,
+    parse_price_bounds,
+    resolve_price_range
+)
+
+
+@pytest.mark.parametrize("location, expected", [
+    ("TP. HCM", "ho chi minh"),
+    ("TPHCM", "ho chi minh"),
+    ("Sài Gòn", "ho chi minh"),
+    ("Quận 1, Thành phố Hồ Chí Minh", "ho chi minh"),
+    ("Quảng Nam", "hoi an"),
+    ("Phố cổ Hội An, Quảng Nam", "hoi an"),
+    ("Sa Pa, Lào Cai", "sapa"),
+    ("Đà Nẵng", "da nang"),
+    ("Cà Mau", "ca mau"),
+])
+def test_normalize_location(location, expected):
+    assert normalize_location(location) == expected
+
+
+@pytest.mark.parametrize("wanted, actual", [
+    ("TP. HCM", "Hồ Chí Minh"),
+    ("Sài Gòn", "Quận 3, TP.HCM"),
+    ("Quảng Nam", "Hội An"),
+    ("Hội An", "Quảng Nam"),
+    ("Cà Mau", "Đất Mũi, Cà Mau"),
+])
+def test_location_matches_aliases(wanted, actual):
+    assert location_matches(wanted, actual)
+
+
+@pytest.mark.parametrize("wanted, actual", [
+    ("Đà Nẵng", "Hội An"),
+    ("Hà Nội", "Hà Giang"),
+    ("Huế", "Thuế"),
+])
+def test_location_does_not_match_other_cities(wanted, actual):
+    assert not location_matches(wanted, actual)
+
+
+@pytest.mark.parametrize("price_range, expected", [
+    ("cheap", (0, 100000)),
+    ("Miễn phí", (0, 0)),
+    ("<100k", (0, 100000)),
+    ("dưới 100k", (0, 100000)),
+    ("100-500k", (100000, 500000)),
+    (">500k", (500000, float("inf"))),
+    ("50k", (0, 50000)),
+    ("200.000đ", (0, 200000)),
+    ("1,5tr", (0, 1500000)),
+    ("rẻ nhất có thể", None),
+    (None, None),
+])
+def test_resolve_price_range(price_range, expected):
+    assert resolve_price_range(price_range) == expected
+
+
+@pytest.mark.parametrize("price_info, expected", [
+    ('{"adult": 100000, "child": 50000}', (50000, 100000)),
+    ('{"adult": "100.000đ", "child": "Miễn phí"}', (0, 100000)),
+    ("Miễn phí", (0, 0)),
+    ('{"adult": "1,5tr"}', (1500000, 1500000)),
+    ('{"note": "liên hệ"}', (UNKNOWN_PRICE, UNKNOWN_PRICE)),
+    (None, (UNKNOWN_PRICE, UNKNOWN_PRICE)),
+])
+def test_parse_price_bounds(price_info, expected):
+    assert parse_price_bounds(price_info) == expected
+
+
+@pytest.mark.parametrize("kwargs, expected", [
+    ({}, ""),
+    ({"location": "TP. HCM"}, 'location_norm == "ho chi minh"'),
+    ({"location": "Cà Mau"}, 'location_norm like "%ca mau%"'),
+    ({"attraction_type": "bãi biển"}, 'type_norm == "beach"'),
+    ({"attraction_type": "chỗ nào vui"}, ""),
+    ({"price_range": "<100k"}, "max_price >= 0 and min_price <= 100000"),
+    ({"price_range": ">500k"}, "max_price >= 500000"),
+    ({"exclude_ids": ["3", "x", 7]}, "id not in [3, 7]"),
+    ({"location": "Đà Nẵng", "attraction_type": "beach", "price_range": "free"},
+     'location_norm == "da nang" and type_norm == "beach" and max_price >= 0 and min_price <= 0'),
+])
+def test_build_destination_expr(kwargs, expected):
+    assert build_destination_expr(**kwargs) == expected
+
+
+@pytest.mark.parametrize("attraction_type, expected", [
+    ("Bãi biển", "beach"),
+    ("beach", "beach"),
+    ("Làng nghề", "lang nghe"),
+    (None, ""),
+])
+def test_attraction_type_key(attraction_type, expected):
+    assert attraction_type_key(attraction_type) == expected